@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+複数都市の服装アドバイス一括生成ライブラリ
+N都市ぶんの天気を1回のリクエストにまとめ、JSON形式（構造化出力）で都市ごとのアドバイスを受け取る
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import json
+
+# アドバイスの最大文字数（プロンプトで指定する上限。超えた応答は不正として個別に生成し直す）
+ADVICE_MAX_CHARS = 50
+# 1リクエストの最大トークン数（推論トークン+レスポンストークン）: 1都市ぶん + 追加1都市ごと
+BATCH_BASE_TOKENS = 1000
+BATCH_TOKENS_PER_CITY = 300
+
+SYSTEM_PROMPT = "あなたは天気に基づいた服装アドバイザーです。簡潔で実用的なアドバイスを提供してください。"
+
+# 応答のJSONスキーマ: {"advice": [{"id": 1, "advice": "..."}, ...]}
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "outfit_advice_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "advice": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "advice": {"type": "string"},
+                        },
+                        "required": ["id", "advice"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["advice"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def build_batch_prompt(weather_list):
+    """
+    複数都市の天気情報を1つのプロンプトにまとめる
+
+    Args:
+        weather_list (list): OpenWeatherMapの天気データのリスト
+
+    Returns:
+        str: 番号付きの天気一覧と回答形式の指示
+    """
+    lines = ["各都市の今日の天気情報："]
+    for number, weather_data in enumerate(weather_list, 1):
+        main = weather_data['main']
+        lines.append(
+            f"[{number}] {weather_data.get('name', '')}: 気温 {main['temp']}°C, "
+            f"体感温度 {main['feels_like']}°C, 湿度 {main['humidity']}%, "
+            f"天気 {weather_data['weather'][0]['description']}")
+    lines.append("")
+    lines.append(f"各都市について、今日の服装アドバイスを日本語で簡潔に({ADVICE_MAX_CHARS}文字以内で)提案してください。")
+    lines.append("例：「薄手のジャケットがおすすめです」「傘を忘れずに」など")
+    lines.append("idには上記の番号をそのまま使い、全都市ぶんを1つずつ回答してください。")
+    return "\n".join(lines)
+
+
+def batch_max_tokens(count):
+    """
+    一括生成リクエストの最大トークン数
+
+    Args:
+        count (int): 都市数
+
+    Returns:
+        int: max_completion_tokens に指定する値
+    """
+    return BATCH_BASE_TOKENS + BATCH_TOKENS_PER_CITY * (count - 1)
+
+
+def parse_batch_advice(content, count, max_chars=ADVICE_MAX_CHARS):
+    """
+    一括生成の応答を検証し、都市ごとのアドバイスに分割
+
+    Args:
+        content (str): モデルの応答（JSON文字列）
+        count (int): 問い合わせた都市数
+        max_chars (int): アドバイスの最大文字数
+
+    Returns:
+        dict: 都市の位置（0始まり）→ アドバイス
+              検証に通らなかった都市は含まない（呼び出し側で個別に生成し直す）
+    """
+    try:
+        items = json.loads(content)['advice']
+    except (TypeError, ValueError, KeyError):
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    results = {}
+    duplicated = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        number = item.get('id')
+        advice = item.get('advice')
+        if not isinstance(number, int) or not 1 <= number <= count:
+            continue
+        if not isinstance(advice, str) or not advice.strip() or len(advice.strip()) > max_chars:
+            continue
+        if number - 1 in results:
+            duplicated.add(number - 1)  # 同じ番号に複数の回答: どちらが正しいか分からない
+        results[number - 1] = advice.strip()
+
+    for index in duplicated:
+        del results[index]
+    return results
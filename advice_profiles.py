@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+服装アドバイスのプロンプトプロファイル
+プロンプトの長さ・推論の深さ（reasoning_effort）・最大トークン数の組み合わせを名前で切り替える
+（50文字の回答には推論トークンが応答時間と費用の大半を占めるため、短いプロファイルほど速く安い）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+from advice_batch import SYSTEM_PROMPT, ADVICE_MAX_CHARS
+
+# プロファイル名 → 設定
+#   max_completion_tokens: 推論トークン+レスポンストークンの合計の上限
+#   reasoning_effort: 推論の深さ（minimal, low, medium, high。Noneでモデルの既定）
+ADVICE_PROFILES = {
+    # 従来のプロンプト（箇条書きの天気と回答例つき）
+    'standard': {'max_completion_tokens': 1000, 'reasoning_effort': None},
+    # 1行の天気と短い指示、推論は浅め
+    'compact': {'max_completion_tokens': 400, 'reasoning_effort': 'low'},
+    # systemなしの最短のプロンプト、推論なし（文字数の上限に余裕を持たせて指示）
+    'minimal': {'max_completion_tokens': 160, 'reasoning_effort': 'minimal'},
+}
+REASONING_EFFORTS = ('minimal', 'low', 'medium', 'high')
+
+COMPACT_SYSTEM_PROMPT = f"服装アドバイザー。日本語{ADVICE_MAX_CHARS}文字以内の1文だけで答える。"
+MINIMAL_MAX_CHARS = 40
+
+
+def advice_messages(weather_data, profile='standard'):
+    """
+    1都市ぶんの服装アドバイスを依頼するチャットメッセージを作成
+
+    Args:
+        weather_data (dict): OpenWeatherMapの天気データ
+        profile (str): プロファイル名（ADVICE_PROFILES のキー）
+
+    Returns:
+        list: チャットメッセージ
+    """
+    # 天気データから必要な情報を抽出
+    temperature = weather_data['main']['temp']          # 気温（摂氏）
+    feels_like = weather_data['main']['feels_like']    # 体感温度（摂氏）
+    humidity = weather_data['main']['humidity']        # 湿度（%）
+    weather_desc = weather_data['weather'][0]['description']  # 天気の説明（日本語）
+
+    if profile == 'minimal':
+        return [{"role": "user", "content":
+                 f"{temperature}°C(体感{feels_like}°C) 湿度{humidity}% {weather_desc}。"
+                 f"服装を日本語{MINIMAL_MAX_CHARS}字以内で"}]
+
+    if profile == 'compact':
+        return [
+            {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+            {"role": "user", "content": f"気温{temperature}°C 体感{feels_like}°C 湿度{humidity}% {weather_desc}"}
+        ]
+
+    # OpenAI APIに送るプロンプトを作成
+    prompt = f"""
+今日の天気情報：
+- 気温: {temperature}°C
+- 体感温度: {feels_like}°C
+- 湿度: {humidity}%
+- 天気: {weather_desc}
+
+上記の天気情報を基に、今日の服装アドバイスを日本語で簡潔に({ADVICE_MAX_CHARS}文字以内で)提案してください。
+例：「薄手のジャケットがおすすめです」「傘を忘れずに」など
+"""
+
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def advice_options(profile='standard', max_tokens=0, reasoning_effort=None):
+    """
+    プロファイルの Chat Completions API のパラメータ（.env での上書きを反映）
+
+    Args:
+        profile (str): プロファイル名
+        max_tokens (int): 最大トークン数の上書き（0でプロファイルの値）
+        reasoning_effort (str): 推論の深さの上書き（Noneや空文字でプロファイルの値）
+
+    Returns:
+        dict: max_completion_tokens と（指定があれば）reasoning_effort
+    """
+    settings = ADVICE_PROFILES[profile]
+    options = {'max_completion_tokens': max_tokens or settings['max_completion_tokens']}
+    effort = reasoning_effort or settings['reasoning_effort']
+    if effort:
+        options['reasoning_effort'] = effort
+    return options
+
+
+def advice_variant(profile, options):
+    """
+    アドバイスキャッシュのキーに付ける識別子（プロファイル・推論の深さ・最大トークン数）
+
+    Args:
+        profile (str): プロファイル名
+        options (dict): advice_options() の戻り値
+
+    Returns:
+        str: 例 "compact/low/400"（推論の深さの指定なしは "default"）
+    """
+    return f"{profile}/{options.get('reasoning_effort') or 'default'}/{options['max_completion_tokens']}"
+
+
+def check_profile(profile, reasoning_effort=None):
+    """
+    プロファイル名と推論の深さを検証
+
+    Args:
+        profile (str): プロファイル名
+        reasoning_effort (str): 推論の深さ（Noneや空文字は検証しない）
+
+    Raises:
+        ValueError: 未知のプロファイル・推論の深さ
+    """
+    if profile not in ADVICE_PROFILES:
+        raise ValueError(f"ADVICE_PROFILE must be one of {', '.join(ADVICE_PROFILES)}: {profile}")
+    if reasoning_effort and reasoning_effort not in REASONING_EFFORTS:
+        raise ValueError(f"ADVICE_REASONING_EFFORT must be one of {', '.join(REASONING_EFFORTS)}: "
+                         f"{reasoning_effort}")
+
+
+def meets_spec(advice, max_chars=ADVICE_MAX_CHARS):
+    """
+    アドバイスが仕様（空でない・max_chars 文字以内）を満たすか
+
+    Args:
+        advice (str): モデルの応答
+        max_chars (int): 最大文字数
+
+    Returns:
+        bool: 満たせばTrue
+    """
+    advice = (advice or '').strip()
+    return 0 < len(advice) <= max_chars
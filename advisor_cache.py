@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+天気データ・服装アドバイスのキャッシュライブラリ
+OpenWeatherMapの取得結果とAIの服装アドバイスを有効期限つきでディスクに保存し、プロセスを再起動しても再利用する
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: プロセス間のロックなし（スレッド間のロックのみ）
+    fcntl = None
+
+import metrics
+
+# 既定の保存先と有効期限
+WEATHER_CACHE_PATH = "./.cache/weather_cache.json"
+WEATHER_CACHE_TTL = 600         # この秒数以内なら新鮮なデータとしてそのまま使う（現在の天気は約10分ごとに更新）
+WEATHER_CACHE_STALE_TTL = 3600  # TTL切れ後この秒数までは古いデータを返しつつ裏で取り直す
+
+ADVICE_CACHE_PATH = "./.cache/advice_cache.json"
+ADVICE_CACHE_TTL = 6 * 3600     # アドバイスを再利用する秒数
+ADVICE_CACHE_MAX_ENTRIES = 200  # 保存する件数の上限（超えたら最も長く使われていないものから削除）
+ADVICE_TEMP_STEP = 2.0          # 気温・体感温度をまとめる幅（°C）: 18.3°Cと18.6°Cは同じ扱い
+ADVICE_HUMIDITY_STEP = 10       # 湿度をまとめる幅（%）
+
+
+class JsonFileStore:
+    """
+    小さな辞書をJSONファイルに保存するストア
+    書き込みは一時ファイル経由の置き換えで行い、途中で電源が切れても壊れたファイルを残しません
+    読み直し〜置き換えはロックファイル（flock）で囲み、複数プロセスで共有しても更新が消えません
+    ヒット数などの累計カウンタはメモリに溜めておき、次の書き込みか終了時にまとめて保存します
+    （読み出しのたびにSDカードへ書き込まない）
+    """
+
+    def __init__(self, path):
+        """
+        ストアの初期化
+
+        Args:
+            path (str): 保存先のJSONファイル（ディレクトリが無ければ作成）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._counts = {}       # まだ保存していないカウンタの増分
+        self._deferred = {}     # まだ保存していない変更（名前 → 辞書を変更する関数）
+        self._flush_registered = False
+
+    def load(self):
+        """
+        保存済みの内容を読み込む
+
+        Returns:
+            dict: 保存されている辞書（ファイルが無い・壊れている場合は空の辞書）
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, func):
+        """
+        最新の内容を読み直してから変更を加えて保存（溜めておいたカウンタ・変更も一緒に保存）
+
+        Args:
+            func (callable): 辞書を受け取り、その場で変更する関数
+        """
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)  # 閉じると解放
+                data = self.load()
+                self._apply_pending(data)
+                func(data)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            self._counts.clear()
+            self._deferred.clear()
+
+    def _apply_pending(self, data):
+        """溜めておいたカウンタの増分と変更を辞書に適用"""
+        stats = data.setdefault('stats', {})
+        for name, count in self._counts.items():
+            stats[name] = stats.get(name, 0) + count
+        for func in self._deferred.values():
+            func(data)
+
+    def _register_flush(self):
+        """溜めた内容を終了時に保存するよう登録（ロックを持って呼ぶ）"""
+        if not self._flush_registered:
+            atexit.register(self.flush)
+            self._flush_registered = True
+
+    def increment(self, name):
+        """
+        累計カウンタを1つ加算（メモリ上で加算し、次の書き込みか flush() で保存）
+
+        Args:
+            name (str): カウンタ名（hits, misses など）
+        """
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._register_flush()
+
+    def defer(self, name, func):
+        """
+        急がない変更を登録（次の書き込みか flush() で適用、同じ名前は最後に登録した変更だけ残す）
+
+        Args:
+            name (str): 変更の名前
+            func (callable): 辞書を受け取り、その場で変更する関数
+        """
+        with self._lock:
+            self._deferred[name] = func
+            self._register_flush()
+
+    def flush(self):
+        """
+        溜めておいたカウンタ・変更があれば保存（終了時にも自動で呼ばれる）
+        """
+        with self._lock:
+            pending = bool(self._counts or self._deferred)
+        if pending:
+            self.update(lambda data: None)
+
+    def stats(self):
+        """
+        累計カウンタを取得（まだ保存していない増分も含む）
+
+        Returns:
+            dict: カウンタ名 → 累計値
+        """
+        stats = dict(self.load().get('stats', {}))
+        with self._lock:
+            for name, count in self._counts.items():
+                stats[name] = stats.get(name, 0) + count
+        return stats
+
+
+class WeatherCache:
+    """
+    都市名と単位ごとに天気データを保持するTTLキャッシュ
+    期限切れ直後は古いデータをすぐ返し、裏のスレッドで取り直します（stale-while-revalidate）
+    """
+
+    def __init__(self, path=WEATHER_CACHE_PATH, ttl=WEATHER_CACHE_TTL,
+                 stale_ttl=WEATHER_CACHE_STALE_TTL):
+        """
+        天気キャッシュの初期化
+
+        Args:
+            path (str): 保存先のJSONファイル
+            ttl (float): 新鮮とみなす秒数（0でキャッシュを使わない）
+            stale_ttl (float): TTL切れ後、古いデータを返してよい秒数
+        """
+        self.store = JsonFileStore(path)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._refreshing = {}  # キー → 取り直し中のスレッド
+        self._tasks = {}       # キー → 取り直し中のタスク（get_async() 用）
+
+    @staticmethod
+    def make_key(city, units):
+        """キャッシュのキー（例: "tokyo|metric"）"""
+        return f"{city.strip().lower()}|{units}"
+
+    def get(self, city, units, fetch):
+        """
+        天気データを取得（キャッシュが新鮮ならそのまま、古ければ返しつつ取り直し、無ければ取得）
+
+        Args:
+            city (str): 都市名
+            units (str): 単位（metricなど）
+            fetch (callable): 実際にAPIから取得する関数（失敗時はNoneを返す）
+
+        Returns:
+            dict: 天気データ（取得できなかった場合はNone）
+        """
+        if self.ttl <= 0:
+            return fetch()
+
+        key = self.make_key(city, units)
+        entry = self.store.load().get('entries', {}).get(key)
+        age = time.time() - entry['fetched_at'] if entry else None
+
+        if entry and age < self.ttl:
+            # 新鮮なデータ: 通信なし
+            self._count('hits')
+            return entry['data']
+
+        if entry and age < self.ttl + self.stale_ttl:
+            # 期限切れだが許容範囲: 古いデータで表示を始め、裏で取り直す
+            self._count('stale')
+            self._revalidate(key, fetch)
+            return entry['data']
+
+        # キャッシュなし（または古すぎる）: その場で取得
+        self._count('misses')
+        data = fetch()
+        if data:
+            self._put(key, data)
+        return data
+
+    async def get_async(self, city, units, fetch):
+        """
+        get() のasyncio版（fetch はコルーチン関数、期限切れの取り直しはタスクで行う）
+        （キャッシュファイルは小さいので、読み書きはイベントループ上でそのまま行う）
+
+        Args:
+            city (str): 都市名
+            units (str): 単位（metricなど）
+            fetch (callable): 実際にAPIから取得するコルーチン関数（失敗時はNoneを返す）
+
+        Returns:
+            dict: 天気データ（取得できなかった場合はNone）
+        """
+        if self.ttl <= 0:
+            return await fetch()
+
+        key = self.make_key(city, units)
+        entry = self.store.load().get('entries', {}).get(key)
+        age = time.time() - entry['fetched_at'] if entry else None
+
+        if entry and age < self.ttl:
+            self._count('hits')
+            return entry['data']
+
+        if entry and age < self.ttl + self.stale_ttl:
+            # 期限切れだが許容範囲: 古いデータを返し、取り直しはタスクに任せる
+            self._count('stale')
+            task = self._tasks.get(key)
+            if task is None or task.done():
+                self._tasks[key] = asyncio.create_task(self._revalidate_async(key, fetch))
+            return entry['data']
+
+        self._count('misses')
+        data = await fetch()
+        if data:
+            self._put(key, data)
+        return data
+
+    async def _revalidate_async(self, key, fetch):
+        """タスクでデータを取り直してキャッシュを更新"""
+        data = await fetch()
+        if data:
+            self._put(key, data)
+
+    def wait(self, timeout=None):
+        """
+        裏で実行中の取り直しが終わるまで待つ
+
+        Args:
+            timeout (float): 最大待ち時間（秒、Noneで無制限）
+        """
+        for thread in list(self._refreshing.values()):
+            thread.join(timeout)
+
+    async def wait_async(self):
+        """
+        タスクで実行中の取り直しが終わるまで待つ（get_async() 用）
+        """
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def last_good(self, city, units):
+        """
+        最後に取得できた天気データを期限に関係なく返す（取得に失敗・期限切れになった場合の表示用）
+
+        Args:
+            city (str): 都市名
+            units (str): 単位（metricなど）
+
+        Returns:
+            tuple: (天気データ, 取得からの経過秒数)（保存されていなければ (None, None)）
+        """
+        entry = self.store.load().get('entries', {}).get(self.make_key(city, units))
+        if not entry:
+            return None, None
+        metrics.UPSTREAM_FALLBACKS.inc(upstream="weather")
+        return entry['data'], time.time() - entry['fetched_at']
+
+    def _revalidate(self, key, fetch):
+        """
+        裏のスレッドでデータを取り直してキャッシュを更新
+        （daemonにしないので、cronの1回実行でもプロセス終了前に保存まで完了する）
+        """
+        thread = self._refreshing.get(key)
+        if thread and thread.is_alive():
+            return
+
+        def worker():
+            data = fetch()
+            if data:
+                self._put(key, data)
+
+        thread = threading.Thread(target=worker, name=f"weather-revalidate-{key}")
+        self._refreshing[key] = thread
+        thread.start()
+
+    def _put(self, key, data):
+        """取得したデータを保存"""
+        def update(store):
+            store.setdefault('entries', {})[key] = {'fetched_at': time.time(), 'data': data}
+        self.store.update(update)
+
+    def _count(self, name):
+        """今回の実行と累計の両方でカウンタを加算（累計はまとめて保存）"""
+        setattr(self, name, getattr(self, name) + 1)
+        self.store.increment(name)
+        metrics.WEATHER_CACHE_RESULTS.inc(result={'hits': 'hit', 'misses': 'miss'}.get(name, name))
+
+    def summary(self):
+        """
+        ログ出力用のキャッシュ統計を作成
+
+        Returns:
+            str: 今回と累計のヒット・古いデータ・ミス件数
+        """
+        total = self.store.stats()
+        return (f"天気キャッシュ ヒット {self.hits}, 期限切れ再利用 {self.stale}, ミス {self.misses} "
+                f"（累計 ヒット {total.get('hits', 0)}, 期限切れ再利用 {total.get('stale', 0)}, "
+                f"ミス {total.get('misses', 0)}）")
+
+
+class AdviceCache:
+    """
+    天気の条件（気温・体感温度・湿度を一定幅でまとめた値と天気の説明）ごとに
+    服装アドバイスを保持するLRUキャッシュ
+    ほぼ同じ天気ではAIを呼ばずに前回のアドバイスを再利用します
+    """
+
+    def __init__(self, path=ADVICE_CACHE_PATH, ttl=ADVICE_CACHE_TTL,
+                 max_entries=ADVICE_CACHE_MAX_ENTRIES,
+                 temp_step=ADVICE_TEMP_STEP, humidity_step=ADVICE_HUMIDITY_STEP, variant=''):
+        """
+        アドバイスキャッシュの初期化
+
+        Args:
+            path (str): 保存先のJSONファイル
+            ttl (float): アドバイスを再利用する秒数（0でキャッシュを使わない）
+            max_entries (int): 保存する件数の上限
+            temp_step (float): 気温・体感温度をまとめる幅（°C）
+            humidity_step (int): 湿度をまとめる幅（%）
+            variant (str): アドバイスの作り方の識別子（キーの先頭に付け、プロファイルなどを変えたら別のアドバイスにする）
+        """
+        self.store = JsonFileStore(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.temp_step = temp_step
+        self.humidity_step = humidity_step
+        self.variant = variant
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, weather_data):
+        """
+        天気データからキャッシュのキーを作成
+
+        Args:
+            weather_data (dict): OpenWeatherMapの天気データ
+
+        Returns:
+            str: 例 "t18|f16|h70|曇りがち"（18.0〜19.9°C → t18、variant があれば "compact/low/400|t18|..."）
+        """
+        main = weather_data['main']
+        temp = int(main['temp'] // self.temp_step * self.temp_step)
+        feels_like = int(main['feels_like'] // self.temp_step * self.temp_step)
+        humidity = int(main['humidity'] // self.humidity_step * self.humidity_step)
+        desc = weather_data['weather'][0]['description']
+        key = f"t{temp}|f{feels_like}|h{humidity}|{desc}"
+        return f"{self.variant}|{key}" if self.variant else key
+
+    def get(self, weather_data, generate):
+        """
+        アドバイスを取得（同じ条件のアドバイスが保存されていればAIを呼ばない）
+
+        Args:
+            weather_data (dict): OpenWeatherMapの天気データ
+            generate (callable): 天気データを受け取りアドバイスを生成する関数（失敗時はNone）
+
+        Returns:
+            str: 服装アドバイス（生成できなかった場合はNone）
+        """
+        if self.ttl <= 0:
+            return generate(weather_data)
+
+        advice = self.lookup(weather_data)
+        if advice is None:
+            advice = generate(weather_data)
+            self.store_advice(weather_data, advice)
+        return advice
+
+    def lookup(self, weather_data):
+        """
+        保存済みのアドバイスを探す（ヒット・ミスを集計、複数都市をまとめて生成する場合に使う）
+
+        Args:
+            weather_data (dict): OpenWeatherMapの天気データ
+
+        Returns:
+            str: 服装アドバイス（保存されていない・期限切れの場合はNone）
+        """
+        if self.ttl <= 0:
+            return None
+
+        key = self.make_key(weather_data)
+        now = time.time()
+        entry = self.store.load().get('entries', {}).get(key)
+
+        if entry and now - entry['created_at'] < self.ttl:
+            self.hits += 1
+            metrics.ADVICE_CACHE_RESULTS.inc(result="hit")
+
+            def touch(data):
+                # 最終使用時刻を更新（LRUの削除順に使う、次の保存でまとめて書き込む）
+                item = data.get('entries', {}).get(key)
+                if item:
+                    item['used_at'] = max(item['used_at'], now)
+            self.store.defer(f"used_at|{key}", touch)
+            self.store.increment('hits')
+            return entry['advice']
+
+        self.misses += 1
+        self.store.increment('misses')
+        metrics.ADVICE_CACHE_RESULTS.inc(result="miss")
+        return None
+
+    def store_advice(self, weather_data, advice):
+        """
+        生成したアドバイスを保存（Noneや空文字は保存しない）
+
+        Args:
+            weather_data (dict): OpenWeatherMapの天気データ
+            advice (str): 服装アドバイス
+        """
+        if self.ttl > 0 and advice:
+            self._put(self.make_key(weather_data), advice, weather_data.get('name'))
+
+    def last_good(self, weather_data):
+        """
+        その都市で最後に生成できたアドバイスを期限・天気の条件に関係なく返す
+        （生成に失敗・期限切れになった場合の表示用）
+
+        Args:
+            weather_data (dict): OpenWeatherMapの天気データ
+
+        Returns:
+            str: 服装アドバイス（保存されていなければNone）
+        """
+        entry = self.store.load().get('last', {}).get(weather_data.get('name') or '')
+        if not entry:
+            return None
+        metrics.UPSTREAM_FALLBACKS.inc(upstream="advice")
+        return entry['advice']
+
+    def _put(self, key, advice, city=None):
+        """生成したアドバイスを保存し、上限を超えた分を古い順に削除（都市ごとの最新のアドバイスも記録）"""
+        def update(data):
+            now = time.time()
+            entries = data.setdefault('entries', {})
+            entries[key] = {'advice': advice, 'created_at': now, 'used_at': now}
+            if city:
+                data.setdefault('last', {})[city] = {'advice': advice, 'created_at': now}
+            # 期限切れを削除してから、件数の上限を超えた分を最終使用が古い順に削除
+            for old_key in [k for k, e in entries.items() if now - e['created_at'] >= self.ttl]:
+                del entries[old_key]
+            while len(entries) > self.max_entries:
+                del entries[min(entries, key=lambda k: entries[k]['used_at'])]
+        self.store.update(update)
+
+    def summary(self):
+        """
+        ログ出力用のキャッシュ統計を作成
+
+        Returns:
+            str: 今回と累計のヒット率
+        """
+        total = self.store.stats()
+        hits, misses = total.get('hits', 0), total.get('misses', 0)
+        rate = hits / (hits + misses) * 100 if hits + misses else 0.0
+        return (f"アドバイスキャッシュ ヒット {self.hits}, ミス {self.misses} "
+                f"（累計 ヒット率 {rate:.1f}% = {hits}/{hits + misses}）")
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+天気予報＋服装提案アドバイザー（asyncio版）
+天気取得（httpx）・アドバイス生成（AsyncOpenAI）・スクロール表示を1つのイベントループで並行して動かす
+（スレッドを使わずに、通信の待ち時間の間もフレームを進められる）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import importlib
+from typing import Optional, Dict, Any, List
+
+try:
+    import metrics
+    from weather_outfit_advisor_full import WeatherOutfitAdvisor
+    from local_advice import local_advice
+    from latency_budget import Deadline
+    from weather_client import AsyncWeatherClient, OPENWEATHER_URL
+    from double_buffer import DoubleBuffer
+    from tiled_strip import TiledStrip
+except ImportError as e:
+    print(f"Required library not installed: {e}")
+    print("Please run: pip install -r requirements.txt")
+    sys.exit(1)
+
+logger = logging.getLogger(__name__)
+
+# 1回の呼び出しのタイムアウト（秒）の既定値
+WEATHER_TIMEOUT = 10.0
+ADVICE_TIMEOUT = 30.0
+
+
+class AsyncWeatherOutfitAdvisor:
+    """
+    WeatherOutfitAdvisor（フル版）の設定・キャッシュ・OLED・フォントをそのまま使い、
+    通信と表示をasyncioのコルーチンとして提供するクラス
+    （更新の持ち時間・ヘッジ・サーキットブレーカーもフル版と共有）
+    """
+
+    def __init__(self, advisor: Optional[WeatherOutfitAdvisor] = None):
+        """
+        asyncio版アドバイザーの初期化
+
+        Args:
+            advisor (WeatherOutfitAdvisor): 設定済みのフル版アドバイザー（Noneなら.envから作成）
+        """
+        self.advisor = advisor or WeatherOutfitAdvisor()
+        # 1回の呼び出しのタイムアウトの上限（更新全体の残り時間が短ければそちらで打ち切る）
+        self.weather_timeout = float(os.getenv('WEATHER_TIMEOUT_SEC', str(WEATHER_TIMEOUT)))
+        self.advice_timeout = float(os.getenv('ADVICE_TIMEOUT_SEC', str(ADVICE_TIMEOUT)))
+        self.weather_client = AsyncWeatherClient(
+            self.advisor.weather_api_key, cache=self.advisor.weather_cache,
+            timeout=self.weather_timeout,
+            max_workers=int(os.getenv('WEATHER_FETCH_WORKERS', '4')),
+            url=os.getenv('WEATHER_API_URL', OPENWEATHER_URL),
+            caller=self.advisor.weather_caller
+        )
+        self._openai_task = None  # openaiを読み込んで非同期クライアントを作成するタスク
+        self._refining = set()    # AIのアドバイスを生成し直しているタスク（hybrid）
+
+    def preload_openai(self):
+        """
+        openaiの読み込みを始める（天気取得の通信待ちの間にスレッドで読み込む。ADVICE_ENGINE=local では何もしない）
+        """
+        if self._openai_task is None and self.advisor.advice_engine != 'local':
+            self._openai_task = asyncio.create_task(self._load_openai())
+
+    async def _load_openai(self):
+        """openaiのインポート（数百ms）をスレッドで行い、イベントループを止めずにクライアントを作成"""
+        openai = await asyncio.to_thread(importlib.import_module, 'openai')
+        return openai.AsyncOpenAI(api_key=self.advisor.openai_api_key)
+
+    async def get_openai_client(self):
+        """
+        非同期OpenAI APIクライアント（読み込み中なら完了を待つ）
+
+        Returns:
+            openai.AsyncOpenAI: クライアント
+        """
+        if self._openai_task is None:
+            self._openai_task = asyncio.create_task(self._load_openai())
+        # 呼び出し側（ヘッジで使われなかった方など）が取り消されても、読み込み自体は続ける
+        return await asyncio.shield(self._openai_task)
+
+    async def get_weather_data(self, city: Optional[str] = None,
+                               deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+        """
+        天気データを取得（キャッシュが有効ならAPIを呼ばずに返す）
+
+        Args:
+            city (str): 都市名（省略時はCITY_NAMEの先頭の都市）
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+
+        Returns:
+            dict: 天気データ（取得失敗時は最後に取得できたデータ、それも無ければNone）
+        """
+        city = city or self.advisor.city_name
+        weather_data = await self.weather_client.get(city, deadline)
+        if city in self.weather_client.errors:
+            logger.error(f"Failed to fetch weather data ({city}): {self.weather_client.errors[city]}")
+        return weather_data
+
+    async def get_all_weather_data(self, cities: Optional[List[str]] = None,
+                                   deadline: Optional[Deadline] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        複数都市の天気データを並行して取得
+
+        Args:
+            cities (list): 都市名のリスト（省略時はCITY_NAMEの全都市）
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+
+        Returns:
+            dict: 都市名 → 天気データ（取得失敗は最後に取得できたデータかNone、指定順）
+        """
+        cities = cities or self.advisor.city_names
+        results = await self.weather_client.get_all(cities, deadline)
+        for city, error in self.weather_client.errors.items():
+            if city in results:
+                logger.error(f"Failed to fetch weather data ({city}): {error}")
+        logger.info(self.weather_client.summary(cities))
+        return results
+
+    async def generate_outfit_advice(self, weather_data: Dict[str, Any],
+                                     deadline: Optional[Deadline] = None) -> str:
+        """
+        OpenAI APIを使って天気に基づいた服装アドバイスを生成（同じような天気はキャッシュを再利用）
+
+        Args:
+            weather_data (dict): get_weather_data()から取得した天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+
+        Returns:
+            str: 服装アドバイスの文字列（失敗・期限切れ時はその都市の前回のアドバイスかローカルの表のアドバイス）
+                 ADVICE_ENGINE=hybrid でキャッシュに無い場合は、ローカルの表のアドバイスをすぐに返し、
+                 AIの生成はタスクで行ってキャッシュに保存（次の更新から表示）
+        """
+        if not weather_data:
+            return "天気情報を取得できませんでした。"
+        engine = self.advisor.advice_engine
+        if engine == 'local':
+            return local_advice(weather_data)
+
+        cache = self.advisor.advice_cache
+        advice = cache.lookup(weather_data)
+        if advice is None and engine == 'hybrid':
+            task = asyncio.create_task(self._refine_advice(weather_data))
+            self._refining.add(task)
+            task.add_done_callback(self._refining.discard)
+            return local_advice(weather_data)
+        if advice is None:
+            advice = await self._request_outfit_advice(weather_data, deadline)
+            cache.store_advice(weather_data, advice)
+        if advice is None:
+            return self.advisor._fallback_advice(weather_data)
+        return advice
+
+    async def _refine_advice(self, weather_data: Dict[str, Any]):
+        """AIのアドバイスを生成してキャッシュに保存（ADVICE_ENGINE=hybrid、時間は RUN_BUDGET_SEC で打ち切る）"""
+        deadline = Deadline(self.advisor.run_budget)
+        self.advisor.advice_cache.store_advice(
+            weather_data, await self._request_outfit_advice(weather_data, deadline))
+
+    async def _request_outfit_advice(self, weather_data: Dict[str, Any],
+                                     deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        OpenAI APIを呼び出して服装アドバイスを生成（キャッシュにない場合のみ呼ばれる）
+        フル版と同じく、期限・ヘッジ・サーキットブレーカーつきで呼び出す（advice_caller）
+
+        Args:
+            weather_data (dict): 天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+
+        Returns:
+            str: 服装アドバイス（失敗・期限切れ時はNone）
+        """
+        async def request(timeout):
+            # 1回の呼び出しは ADVICE_TIMEOUT_SEC と全体の残り時間の短い方で打ち切る
+            # （ライブラリの自動リトライは期限を超えるので使わず、再試行はヘッジに任せる）
+            timeout = self.advice_timeout if timeout is None else max(min(timeout, self.advice_timeout), 0.001)
+            start = time.perf_counter()
+            try:
+                client = (await self.get_openai_client()).with_options(timeout=timeout, max_retries=0)
+                response = await asyncio.wait_for(client.chat.completions.create(
+                    model="gpt-5-mini",  # GPT-5の軽量モデル
+                    messages=self.advisor._advice_messages(weather_data),
+                    **self.advisor.advice_options  # 最大トークン数（推論+レスポンス）と推論の深さ
+                ), timeout)
+            except asyncio.TimeoutError:
+                metrics.observe_llm("single", time.perf_counter() - start)
+                logger.error(f"Failed to generate outfit advice: {timeout:.1f}秒以内に応答がありません")
+                return None
+            except Exception as e:
+                logger.error(f"Failed to generate outfit advice: {e}")
+                return None
+
+            elapsed = time.perf_counter() - start
+            usage = response.usage
+            logger.info(f"Token usage - Total: {usage.total_tokens}, "
+                        f"Input: {usage.prompt_tokens}, "
+                        f"Output: {usage.completion_tokens}, "
+                        f"Time: {elapsed:.2f}s")
+            metrics.observe_llm("single", elapsed, usage)
+            advice = response.choices[0].message.content.strip()
+            logger.info(f"Generated outfit advice: {advice}")
+            return advice
+
+        return await self.advisor.advice_caller.call_async(request, deadline)
+
+    async def build_display_texts(self) -> List[str]:
+        """
+        全都市の天気取得→アドバイス生成（都市ごとに並行）→表示テキストの整形
+
+        Returns:
+            list: 都市ごとの表示テキスト（天気を取得できた都市のみ、全都市失敗なら空）
+        """
+        # 天気取得とアドバイス生成で1つの持ち時間を共有（使い切ったら前回のデータで表示）
+        deadline = Deadline(self.advisor.run_budget)
+        all_weather = await self.get_all_weather_data(deadline=deadline)
+        weather_list = [data for data in all_weather.values() if data]
+        if not weather_list:
+            logger.error("Failed to get weather data")
+            return []
+
+        advice_list = await asyncio.gather(*(self.generate_outfit_advice(data, deadline)
+                                             for data in weather_list))
+        logger.info(self.advisor.advice_cache.summary())
+        logger.info(self.advisor.latency_summary(deadline))
+        display_texts = []
+        for weather_data, advice in zip(weather_list, advice_list):
+            display_text = self.advisor.format_display_text(weather_data, advice)
+            logger.info(f"表示テキスト: {display_text}")
+            display_texts.append(display_text)
+        return display_texts
+
+    async def display_scrolling_text(self, text: str, loop_count: int = 1, device=None):
+        """
+        OLEDに横スクロールでテキストを表示（フレームの間はイベントループに処理を譲る）
+        ストリップの用意（キャッシュ・幅の広いテキストのタイル化）とスケジューラの選択はフル版と同じ
+
+        Args:
+            text (str): スクロール表示するテキスト
+            loop_count (int): スクロールループ回数
+            device: 表示先（省略時はフル版アドバイザーのOLED。複数の画面を並行して動かす場合に指定）
+        """
+        advisor = self.advisor
+        device = device or advisor.oled
+        if not device or not advisor.atlas:
+            logger.info(f"OLED利用不可。表示予定テキスト: {text}")
+            return
+
+        packed = advisor._scroll_packed(device)
+        strip, pages, text_width = advisor._prepare_strip(text, packed)
+        # 書き出し（FrameRecorder）では待機せず全速で描画する
+        scheduler = advisor._frame_scheduler(device)
+
+        x = advisor.oled_width
+        loops = 0
+        try:
+            while loops < loop_count:
+                frame = advisor._render_frame(text, x, strip, pages, packed)
+                advisor._send_frame(device, frame, packed)
+
+                x -= await scheduler.advance_async(advisor.scroll_speed)
+                if x + text_width < 0:
+                    x = advisor.oled_width
+                    loops += 1
+        finally:
+            logger.debug(f"フレーム統計: {scheduler.summary()}")
+            if isinstance(strip, TiledStrip):
+                logger.debug(strip.summary())
+            metrics.observe_scroll(scheduler)
+
+    async def run(self, loop_count: int = 3):
+        """
+        天気取得→アドバイス生成→OLED表示を1回実行
+
+        Args:
+            loop_count (int): 都市ごとのスクロール回数
+        """
+        logger.info("Starting Weather Outfit Advisor (asyncio)")
+        self.preload_openai()
+        try:
+            display_texts = await self.build_display_texts()
+            for text in display_texts or ["天気データ取得失敗"]:
+                await self.display_scrolling_text(text, loop_count=loop_count)
+            await self.advisor.weather_cache.wait_async()  # 期限切れデータの取り直しを保存まで終える
+            if self._refining:
+                await asyncio.gather(*self._refining, return_exceptions=True)  # AIのアドバイスを保存まで終える
+        finally:
+            await self.close()
+        metrics.flush()
+        logger.info("天気予報＋服装提案アドバイザー（asyncio版）完了")
+
+    async def run_daemon(self, refresh_interval: float = 600):
+        """
+        常駐モード：スクロール表示を続けながら、同じイベントループの別タスクで天気とアドバイスを更新
+        （新しいテキストはスクロール1周の区切りで切り替え。Ctrl+Cで両方のタスクを取り消して終了）
+
+        Args:
+            refresh_interval (float): 天気・アドバイスを更新する間隔（秒）
+        """
+        logger.info(f"Starting Weather Outfit Advisor (asyncio daemon, 更新間隔 {refresh_interval:.0f}秒)")
+        texts_buffer = DoubleBuffer()
+        self.preload_openai()
+
+        async def refresh():
+            while True:
+                start = time.perf_counter()
+                try:
+                    display_texts = await self.build_display_texts()
+                except Exception as e:
+                    logger.error(f"[バックグラウンド更新]エラー: {e}")
+                    display_texts = []
+                if display_texts:
+                    texts_buffer.publish(display_texts)
+                    logger.info(f"表示テキストを更新（{time.perf_counter() - start:.1f}秒、次の区切りで切り替え）")
+                elif texts_buffer.published == 0:
+                    texts_buffer.publish(["天気データ取得失敗"])
+                await asyncio.sleep(refresh_interval)
+
+        refresher = asyncio.create_task(refresh(), name="advisor-refresh")
+        index = 0
+        try:
+            while True:
+                if texts_buffer.swap():
+                    logger.info(f"表示テキストを切り替え（{texts_buffer.swapped}回目）")
+                display_texts = texts_buffer.front
+                if display_texts is None:
+                    await self.display_scrolling_text("天気を取得中...", loop_count=1)
+                    continue
+                await self.display_scrolling_text(display_texts[index % len(display_texts)], loop_count=1)
+                index += 1
+                metrics.flush()
+        finally:
+            refresher.cancel()
+            await asyncio.gather(refresher, return_exceptions=True)
+            await self.close()
+            logger.info("天気予報＋服装提案アドバイザー（asyncio版・常駐モード）終了")
+
+    async def close(self):
+        """
+        HTTPクライアントを閉じて画面をクリア
+        """
+        await self.weather_client.aclose()
+        task, self._openai_task = self._openai_task, None
+        if task is not None:
+            try:
+                client = await task
+            except Exception:
+                client = None  # 読み込みに失敗した（エラーは呼び出し時にログ出力済み）
+            if client is not None:
+                await client.close()
+        if self.advisor.oled:
+            self.advisor.oled.clear()
+
+
+def main():
+    """
+    asyncio版のエントリーポイント（使い方はフル版と同じ）
+    """
+    parser = argparse.ArgumentParser(description="天気予報＋服装提案掲示板アプリ（asyncio版）")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常駐モード（スクロールを続けながら天気とアドバイスを定期更新）")
+    parser.add_argument('--refresh-sec', type=float,
+                        default=float(os.getenv('DAEMON_REFRESH_SEC', '600')),
+                        help="常駐モードの更新間隔（秒、既定: .envのDAEMON_REFRESH_SEC）")
+    args = parser.parse_args()
+
+    try:
+        advisor = AsyncWeatherOutfitAdvisor()
+        if args.daemon:
+            asyncio.run(advisor.run_daemon(refresh_interval=args.refresh_sec))
+        else:
+            asyncio.run(advisor.run())
+
+    except KeyboardInterrupt:
+        # asyncio.run() が実行中のタスクを取り消してから戻る（画面は close() でクリア済み）
+        logger.info("ユーザーによる割り込みでアプリケーションを終了します")
+
+    except Exception as e:
+        logger.error(f"アプリケーションエラー: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
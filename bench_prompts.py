@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+プロンプトプロファイル ベンチマーク
+決まった天気の組（フィクスチャ）を各プロファイルで問い合わせ、トークン数・応答時間・
+50文字以内の回答の割合を比べて、仕様を満たす最も速いプロファイルを選ぶ
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+
+問い合わせ先:
+  （既定）      ローカルの代替モデル（APIキー不要。トークン数と応答時間は概算）
+  --record FILE 本物のOpenAI APIに問い合わせ、応答を FILE に記録（.envのOPENAI_API_KEYを使用）
+  --replay FILE 記録した応答から集計（通信なし）
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from advice_batch import ADVICE_MAX_CHARS
+from advice_profiles import ADVICE_PROFILES, advice_messages, advice_options, meets_spec
+from local_advice import local_advice
+
+# 天気のフィクスチャ（OpenWeatherMapと同じ形式、天気コードは weather[0].id）
+FIXTURES = [
+    ("真夏日・快晴", 32.4, 35.1, 55, 800, "晴天"),
+    ("夏日・蒸し暑い", 27.8, 31.0, 85, 801, "薄い雲"),
+    ("春・曇り", 18.3, 16.9, 70, 803, "曇りがち"),
+    ("小雨", 21.5, 21.6, 88, 500, "小雨"),
+    ("大雨", 16.2, 15.0, 95, 502, "強い雨"),
+    ("雷雨", 24.0, 25.2, 90, 211, "雷雨"),
+    ("冬・強風", 6.1, 1.8, 45, 802, "雲"),
+    ("雪", -1.5, -6.0, 80, 601, "雪"),
+    ("乾燥した晴れ", 11.0, 9.5, 25, 800, "晴天"),
+    ("霧", 13.7, 13.2, 97, 741, "霧"),
+]
+
+# 代替モデルの推論トークン数（reasoning_effort → トークン数、Noneはモデル既定のmedium相当）
+STAND_IN_REASONING = {'minimal': 0, 'low': 96, 'medium': 320, 'high': 900, None: 320}
+STAND_IN_FIRST_TOKEN = 0.35    # 最初のトークンまでの秒数
+STAND_IN_PROMPT_RATE = 0.0004  # 入力1トークンあたりの秒数
+STAND_IN_TOKEN_RATE = 0.012    # 出力（推論を含む）1トークンあたりの秒数
+
+
+def fixture_weather(fixture):
+    """フィクスチャをOpenWeatherMapの天気データの形にする"""
+    name, temp, feels_like, humidity, code, description = fixture
+    return {
+        'name': name,
+        'main': {'temp': temp, 'feels_like': feels_like, 'humidity': humidity},
+        'weather': [{'id': code, 'description': description}],
+    }
+
+
+def estimate_tokens(text):
+    """トークン数の概算（日本語は1文字1トークン、英数字は4文字で1トークン）"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+class StandInClient:
+    """
+    OpenAI クライアントの代わりにローカルで応答する代替モデル
+    （client.chat.completions.create() と同じ呼び出し方。回答はローカルの表のアドバイス）
+
+    推論トークンは reasoning_effort で決まり、max_completion_tokens を推論が使い切ると
+    回答が途中で切れる・空になる（finish_reason="length"）ところまで再現します
+    """
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_completion_tokens, reasoning_effort=None, **kwargs):
+        """Chat Completions API の代わりに応答を作成（latency は概算の応答時間）"""
+        weather_data = kwargs.pop('weather_data')
+        prompt_tokens = sum(estimate_tokens(message['content']) + 4 for message in messages)
+        reasoning = STAND_IN_REASONING[reasoning_effort]
+        advice = local_advice(weather_data)
+
+        budget = max_completion_tokens - reasoning
+        finish_reason = 'stop'
+        if budget < estimate_tokens(advice):
+            advice = advice[:max(budget, 0)]  # 推論でトークンを使い切り、回答が切れる
+            finish_reason = 'length'
+        reasoning = min(reasoning, max_completion_tokens)
+        completion = reasoning + estimate_tokens(advice)
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(finish_reason=finish_reason,
+                                     message=SimpleNamespace(content=advice))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion,
+                                  total_tokens=prompt_tokens + completion,
+                                  completion_tokens_details=SimpleNamespace(reasoning_tokens=reasoning)),
+            latency=STAND_IN_FIRST_TOKEN + prompt_tokens * STAND_IN_PROMPT_RATE + completion * STAND_IN_TOKEN_RATE,
+        )
+
+
+def run_profiles(client, profiles, repeat, stand_in=False):
+    """
+    各プロファイルで全フィクスチャを問い合わせる
+
+    Args:
+        client: OpenAI クライアント（または StandInClient）
+        profiles (list): プロファイル名のリスト
+        repeat (int): 1フィクスチャあたりの問い合わせ回数
+        stand_in (bool): 代替モデルか（天気データを渡し、概算の応答時間を使う）
+
+    Returns:
+        list: 1問い合わせごとの記録（profile, fixture, content, finish_reason, 各トークン数, latency）
+    """
+    records = []
+    for profile in profiles:
+        options = advice_options(profile)
+        for fixture in FIXTURES:
+            weather_data = fixture_weather(fixture)
+            extra = {'weather_data': weather_data} if stand_in else {}
+            for _ in range(repeat):
+                start = time.perf_counter()
+                try:
+                    response = client.chat.completions.create(
+                        model="gpt-5-mini", messages=advice_messages(weather_data, profile),
+                        **options, **extra)
+                except Exception as e:
+                    print(f"[{profile}] {fixture[0]}: 失敗 {e}", file=sys.stderr)
+                    records.append({'profile': profile, 'fixture': fixture[0], 'error': str(e),
+                                    'latency': time.perf_counter() - start})
+                    continue
+                latency = getattr(response, 'latency', None) if stand_in else None
+                usage = response.usage
+                details = getattr(usage, 'completion_tokens_details', None)
+                records.append({
+                    'profile': profile,
+                    'fixture': fixture[0],
+                    'content': (response.choices[0].message.content or '').strip(),
+                    'finish_reason': response.choices[0].finish_reason,
+                    'prompt_tokens': usage.prompt_tokens,
+                    'completion_tokens': usage.completion_tokens,
+                    'reasoning_tokens': getattr(details, 'reasoning_tokens', None) or 0,
+                    'latency': latency if latency is not None else time.perf_counter() - start,
+                })
+    return records
+
+
+def summarize(records):
+    """
+    プロファイルごとに集計
+
+    Args:
+        records (list): run_profiles() の記録（--replay で読み込んだものも同じ形式）
+
+    Returns:
+        dict: プロファイル名 → 集計（requests, p50_ms, p95_ms, 平均トークン数, spec_rate, truncated_rate）
+    """
+    summary = {}
+    for profile in dict.fromkeys(record['profile'] for record in records):
+        rows = [record for record in records if record['profile'] == profile]
+        ok = [record for record in rows if 'error' not in record]
+        latencies = sorted(record['latency'] for record in ok)
+
+        def mean(key):
+            return statistics.mean(record[key] for record in ok) if ok else None
+
+        summary[profile] = {
+            'requests': len(rows),
+            'errors': len(rows) - len(ok),
+            'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+            'p95_ms': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000 if latencies else None,
+            'prompt_tokens': mean('prompt_tokens'),
+            'completion_tokens': mean('completion_tokens'),
+            'reasoning_tokens': mean('reasoning_tokens'),
+            # エラーも仕様を満たさなかった回答として数える
+            'spec_rate': sum(meets_spec(record.get('content')) for record in ok) / len(rows) if rows else 0.0,
+            'truncated_rate': sum(record.get('finish_reason') == 'length' for record in ok) / len(rows) if rows else 0.0,
+        }
+    return summary
+
+
+def choose_profile(summary, min_spec_rate):
+    """
+    仕様を満たす割合が min_spec_rate 以上のプロファイルのうち、p95の応答時間が最も短いもの
+
+    Returns:
+        str: プロファイル名（満たすものが無ければNone）
+    """
+    candidates = [(s['p95_ms'], profile) for profile, s in summary.items()
+                  if s['p95_ms'] is not None and s['spec_rate'] >= min_spec_rate]
+    return min(candidates)[1] if candidates else None
+
+
+def format_summary(profile, s):
+    """1プロファイルの集計を1行の文字列にする"""
+    def value(key, fmt):
+        return format(s[key], fmt) if s.get(key) is not None else "-"
+
+    return (f"[{profile:8}] p50 {value('p50_ms', '.0f')}ms, p95 {value('p95_ms', '.0f')}ms, "
+            f"トークン 入力{value('prompt_tokens', '.0f')}/出力{value('completion_tokens', '.0f')}"
+            f"（推論{value('reasoning_tokens', '.0f')}）, "
+            f"{ADVICE_MAX_CHARS}文字以内 {s['spec_rate'] * 100:.0f}%, 途中で切れた {s['truncated_rate'] * 100:.0f}%, "
+            f"{s['requests']}回（失敗 {s['errors']}）")
+
+
+def main():
+    """
+    メイン関数：各プロファイルを問い合わせて集計し、表示・保存・おすすめのプロファイルを出力
+    """
+    parser = argparse.ArgumentParser(description="服装アドバイスのプロンプトプロファイルの比較")
+    parser.add_argument('--profiles', nargs='+', choices=list(ADVICE_PROFILES), default=list(ADVICE_PROFILES),
+                        help="比較するプロファイル（既定: すべて）")
+    parser.add_argument('--repeat', type=int, default=1, help="1フィクスチャあたりの問い合わせ回数")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--record', help="本物のAPIに問い合わせ、応答を記録するファイル（JSON Lines）")
+    source.add_argument('--replay', help="記録した応答のファイルから集計（通信なし）")
+    parser.add_argument('--min-spec-rate', type=float, default=0.95,
+                        help="おすすめにする条件: 仕様を満たす回答の割合（既定: 0.95）")
+    parser.add_argument('--json', help="集計結果をJSONで保存するファイル")
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        records = [record for record in records if record['profile'] in args.profiles]
+        print(f"記録した応答から集計: {args.replay}（{len(records)}件）")
+    elif args.record:
+        from dotenv import load_dotenv
+        import openai
+
+        load_dotenv()
+        if not os.getenv('OPENAI_API_KEY'):
+            sys.exit("OPENAI_API_KEY not found in environment variables")
+        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        records = run_profiles(client, args.profiles, args.repeat)
+        with open(args.record, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"OpenAI APIの応答を記録: {args.record}（{len(records)}件）")
+    else:
+        records = run_profiles(StandInClient(), args.profiles, args.repeat, stand_in=True)
+        print("ローカルの代替モデルで計測（トークン数・応答時間は概算。実際の値は --record で計測）")
+
+    summary = summarize(records)
+    for profile, s in summary.items():
+        print(format_summary(profile, s))
+
+    best = choose_profile(summary, args.min_spec_rate)
+    if best:
+        settings = advice_options(best)
+        print(f"おすすめ: ADVICE_PROFILE={best}（{args.min_spec_rate * 100:.0f}%以上が仕様を満たす中でp95が最短、"
+              f"max_completion_tokens={settings['max_completion_tokens']}, "
+              f"reasoning_effort={settings.get('reasoning_effort', '既定')}）")
+    else:
+        print(f"仕様を満たす回答が{args.min_spec_rate * 100:.0f}%以上のプロファイルがありません")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': {'profiles': args.profiles, 'repeat': args.repeat,
+                                  'source': 'replay' if args.replay else 'record' if args.record else 'stand-in'},
+                       'results': summary, 'recommended': best}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
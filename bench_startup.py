@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+起動時間ベンチマーク
+3つのエントリーポイントについて、インポート時間と最初のフレームを表示するまでの時間を計測する
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 計測対象（表示名 → モジュール名）
+TARGETS = {
+    'mvp': 'weather_outfit_advisor',
+    'full': 'weather_outfit_advisor_full',
+    'console': 'weather_outfit_advisor_console',
+}
+# 最初のフレームまでに読み込まれていないことを確認する重いライブラリ
+HEAVY_MODULES = ('openai', 'requests', 'httpx')
+# 最初のフレームとして表示するテキスト
+SAMPLE_TEXT = "Tokyo: 18.3°C 曇りがち"
+
+
+def probe(target, font_path):
+    """
+    子プロセス側の計測: インポート→OLED初期化→最初のフレーム表示までの時間を出力
+
+    Args:
+        target (str): 計測対象（TARGETSのキー）
+        font_path (str): 使用するフォント（Noneなら各エントリーポイントの既定値）
+    """
+    # 実機・APIキーなしで動かすための設定（モック表示、ダミーキー）
+    os.environ['OLED_BACKEND'] = 'mock'
+    os.environ.setdefault('WEATHER_API_KEY', 'benchmark')
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    if font_path:
+        os.environ['FONT_PATH'] = font_path
+
+    start = time.perf_counter()
+    module = importlib.import_module(TARGETS[target])
+    import_done = time.perf_counter()
+
+    first_frame = None
+    if target == 'mvp':
+        # MVP版はOLEDScrollerにモックのシリアルを渡して初期化
+        from oled_pages import RecordingSerial
+        scroller = module.OLEDScroller(
+            font_path=font_path or module.FONT_PATH, font_size=module.FONT_SIZE,
+            serial_interface=RecordingSerial(record=False))
+        strip, _ = scroller.atlas.render_strip(SAMPLE_TEXT, scroller.width, scroller.height, 24)
+        scroller.device.display(strip.crop((0, 0, scroller.width, scroller.height)))
+        first_frame = time.perf_counter()
+    elif target == 'full':
+        advisor = module.WeatherOutfitAdvisor()
+        if advisor.oled and advisor.atlas:
+            advisor.show_message(SAMPLE_TEXT)
+            first_frame = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (import_done - start) * 1000,
+        'first_frame_ms': (first_frame - start) * 1000 if first_frame else None,
+        'heavy_loaded': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def run_target(target, repeat, font_path):
+    """
+    計測対象を新しいプロセスで繰り返し起動し、中央値を求める
+
+    Args:
+        target (str): 計測対象（TARGETSのキー）
+        repeat (int): 起動回数
+        font_path (str): 使用するフォント
+
+    Returns:
+        dict: process_ms（プロセス起動〜終了）, import_ms, first_frame_ms, heavy_loaded
+    """
+    samples = []
+    for _ in range(repeat):
+        command = [sys.executable, os.path.abspath(__file__), '--probe', target]
+        if font_path:
+            command += ['--font', font_path]
+        start = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"{target} の計測に失敗しました:\n{result.stderr}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample['process_ms'] = elapsed
+        samples.append(sample)
+
+    def median(key):
+        values = [s[key] for s in samples if s[key] is not None]
+        return statistics.median(values) if values else None
+
+    return {
+        'process_ms': median('process_ms'),
+        'import_ms': median('import_ms'),
+        'first_frame_ms': median('first_frame_ms'),
+        'heavy_loaded': samples[-1]['heavy_loaded'],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    基準値と比較し、許容範囲を超えて遅くなった項目を列挙
+
+    Args:
+        results (dict): 今回の計測結果
+        baseline (dict): 基準となる計測結果（--json で保存したもの）
+        tolerance (float): 許容する悪化率（0.2 で20%）
+
+    Returns:
+        list: 悪化した項目の説明
+    """
+    regressions = []
+    for target, current in results.items():
+        base = baseline.get(target)
+        if not base:
+            continue
+        for key in ('import_ms', 'first_frame_ms'):
+            if current.get(key) is None or base.get(key) is None:
+                continue
+            if current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{target}.{key}: {base[key]:.1f}ms → {current[key]:.1f}ms")
+        # 重いライブラリが新たに起動時に読み込まれるようになった場合も悪化とみなす
+        added = set(current['heavy_loaded']) - set(base.get('heavy_loaded', []))
+        if added:
+            regressions.append(f"{target}: 起動時に {', '.join(sorted(added))} を読み込むようになりました")
+    return regressions
+
+
+def main():
+    """
+    メイン関数：各エントリーポイントの起動時間を計測して表示・保存・基準値と比較
+    """
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="エントリーポイントの起動時間ベンチマーク")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS),
+                        help="計測対象（既定: すべて）")
+    parser.add_argument('--repeat', type=int, default=5, help="起動回数（中央値を採用）")
+    parser.add_argument('--font', help="使用するフォント（既定: 各エントリーポイントの設定）")
+    parser.add_argument('--json', help="計測結果をJSONで保存するファイル")
+    parser.add_argument('--baseline', help="比較する基準の計測結果（JSON）")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="基準からの許容悪化率（既定: 0.2 = 20%%）")
+    parser.add_argument('--probe', choices=list(TARGETS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 計測用の子プロセスとして起動された場合
+    if args.probe:
+        probe(args.probe, args.font)
+        return
+
+    results = {}
+    for target in args.targets:
+        results[target] = run_target(target, args.repeat, args.font)
+        r = results[target]
+        first_frame = f"{r['first_frame_ms']:.1f}ms" if r['first_frame_ms'] is not None else "-"
+        heavy = ', '.join(r['heavy_loaded']) or "なし"
+        print(f"[{target:7}] プロセス {r['process_ms']:.1f}ms, インポート {r['import_ms']:.1f}ms, "
+              f"最初のフレーム {first_frame}, 起動時に読み込んだ重いライブラリ: {heavy}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    # 基準値との比較（悪化があれば終了コード1）
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("起動時間が悪化しました:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("基準値との比較: 問題なし")
+
+
+if __name__ == "__main__":
+    main()
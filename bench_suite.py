@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+オフライン ベンチマーク
+OpenWeatherMap・OpenAI APIの代替サーバーをローカルで起動し、実機・APIキーなしで
+スクロール表示とアプリ全体の所要時間・FPS・CPU時間・メモリ・I²C送信量を計測する
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 計測シナリオ（名前 → 説明と設定）
+SCENARIOS = {
+    'scroller': {
+        'description': "OLEDScroller.scroll() のみ（通信なし）",
+    },
+    'advisor': {
+        'description': "フル版 1都市（アドバイスはストリーミング表示）",
+        'cities': "Tokyo",
+        'env': {'ADVICE_ENGINE': 'llm', 'ADVICE_STREAM': 'true'},
+    },
+    'advisor_multi': {
+        'description': "フル版 3都市（天気は並行取得、アドバイスは一括生成）",
+        'cities': "Tokyo,Osaka,Sapporo",
+        'env': {'ADVICE_ENGINE': 'llm', 'ADVICE_STREAM': 'false', 'ADVICE_BATCH': 'true'},
+    },
+    'advisor_local': {
+        'description': "フル版 3都市（アドバイスはローカルの表のみ、AIなし）",
+        'cities': "Tokyo,Osaka,Sapporo",
+        'env': {'ADVICE_ENGINE': 'local'},
+    },
+}
+# スクロール表示するテキスト（scroller シナリオ）
+SAMPLE_TEXT = "Tokyo: 18.3°C（体感 16.9°C）曇りがち 湿度 70% | 薄手のコートがおすすめです"
+# 代替サーバーが返すアドバイス
+FAKE_ADVICE = "薄手のコートがおすすめです。傘も忘れずに"
+# 基準値との比較に使う項目（項目名 → Trueなら大きいほど良い）
+COMPARE_KEYS = {
+    'run_ms': False,
+    'fps': True,
+    'cpu_ms_per_frame': False,
+    'peak_rss_kb': False,
+    'i2c_bytes_per_frame': False,
+}
+
+
+class FakeServices:
+    """
+    OpenWeatherMap（/data/2.5/weather）とOpenAI（/v1/chat/completions）の代替HTTPサーバー
+    応答までの待ち時間を指定でき、受け付けたリクエスト数を数えます
+    """
+
+    def __init__(self, weather_latency=0.05, llm_latency=0.8, token_interval=0.03):
+        """
+        代替サーバーを起動（ポートは空いているものを自動で選ぶ）
+
+        Args:
+            weather_latency (float): 天気APIの応答までの秒数
+            llm_latency (float): OpenAI APIの最初の応答（トークン）までの秒数
+            token_interval (float): 1文字ごとの生成間隔（秒、ストリーミングでない場合は合計を待つ）
+        """
+        self.weather_latency = weather_latency
+        self.llm_latency = llm_latency
+        self.token_interval = token_interval
+        self.counts = {'weather': 0, 'chat': 0}
+        self._lock = threading.Lock()
+
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-aliveで接続を使い回せるようにする
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.endswith('/data/2.5/weather'):
+                    self.send_error(404)
+                    return
+                services._count('weather')
+                time.sleep(services.weather_latency)
+                city = parse_qs(url.query).get('q', ['Tokyo'])[0]
+                self._send_json(fake_weather(city))
+
+            def do_POST(self):
+                if not urlparse(self.path).path.endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                services._count('chat')
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                time.sleep(services.llm_latency)
+                if request.get('stream'):
+                    self._send_stream(request)
+                    return
+                if 'response_format' in request:
+                    # 一括生成: プロンプトの [番号] の数だけ回答する
+                    prompt = request['messages'][-1]['content']
+                    count = len(re.findall(r'^\[\d+\]', prompt, re.M))
+                    content = json.dumps({'advice': [{'id': number, 'advice': FAKE_ADVICE}
+                                                     for number in range(1, count + 1)]},
+                                         ensure_ascii=False)
+                else:
+                    content = FAKE_ADVICE
+                time.sleep(services.token_interval * len(FAKE_ADVICE))
+                self._send_json(fake_completion(content))
+
+            def _send_json(self, obj):
+                body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, request):
+                # Server-Sent Events（chunked転送）で1文字ずつ返す
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                def send(payload):
+                    data = f"data: {payload}\n\n".encode('utf-8')
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                def chunk(delta, finish_reason=None):
+                    return json.dumps({
+                        'id': 'bench', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'bench',
+                        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                    }, ensure_ascii=False)
+
+                send(chunk({'role': 'assistant', 'content': ''}))
+                for char in FAKE_ADVICE:
+                    send(chunk({'content': char}))
+                    time.sleep(services.token_interval)
+                send(chunk({}, 'stop'))
+                if (request.get('stream_options') or {}).get('include_usage'):
+                    send(json.dumps({'id': 'bench', 'object': 'chat.completion.chunk', 'created': 0,
+                                     'model': 'bench', 'choices': [], 'usage': fake_usage(FAKE_ADVICE)}))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass  # アクセスログは計測結果に混ぜない
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='fake-services', daemon=True).start()
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        self.weather_url = f"{base}/data/2.5/weather"
+        self.openai_base_url = f"{base}/v1"
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        """受け付けたリクエスト数（weather, chat）の写し"""
+        with self._lock:
+            return dict(self.counts)
+
+    def close(self):
+        """代替サーバーを停止"""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fake_weather(city):
+    """
+    都市名から決まる天気データ（OpenWeatherMapと同じ形式、同じ都市なら毎回同じ値）
+
+    Args:
+        city (str): 都市名
+
+    Returns:
+        dict: 天気データ
+    """
+    seed = sum(map(ord, city))
+    temp = 5 + seed % 25 + 0.3
+    return {
+        'name': city,
+        'main': {'temp': temp, 'feels_like': temp - 1.4, 'humidity': 40 + seed % 50},
+        'weather': [{'description': "曇りがち"}],
+    }
+
+
+def fake_usage(content):
+    """代替サーバーのトークン数（文字数から概算した固定値）"""
+    completion = 200 + len(content)
+    return {'prompt_tokens': 120, 'completion_tokens': completion, 'total_tokens': 120 + completion,
+            'completion_tokens_details': {'reasoning_tokens': 200}}
+
+
+def fake_completion(content):
+    """Chat Completions API（ストリーミングなし）の応答"""
+    return {
+        'id': 'bench', 'object': 'chat.completion', 'created': 0, 'model': 'bench',
+        'choices': [{'index': 0, 'finish_reason': 'stop',
+                     'message': {'role': 'assistant', 'content': content}}],
+        'usage': fake_usage(content),
+    }
+
+
+def peak_rss_kb():
+    """このプロセスの最大メモリ使用量（KiB、取得できない環境ではNone）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOSはバイト単位
+
+
+def frame_totals():
+    """
+    metricsに記録されたフレーム数と、1フレームあたりの画像作成・display()時間
+
+    Returns:
+        dict: frames, render_ms, display_ms
+    """
+    import metrics
+
+    frames = sum(metrics.FRAMES_TOTAL.get(result=result) for result in ('ok', 'late'))
+    render_sum, render_count = metrics.FRAME_RENDER_SECONDS.totals()
+    display_sum, display_count = metrics.FRAME_DISPLAY_SECONDS.totals()
+    return {
+        'frames': frames,
+        'render_ms': render_sum / render_count * 1000 if render_count else None,
+        'display_ms': display_sum / display_count * 1000 if display_count else None,
+    }
+
+
+def probe_scroller(options):
+    """
+    子プロセス側の計測: OLEDScroller でサンプルテキストをスクロール表示
+
+    Args:
+        options (dict): 計測条件（font, font_size, device, speed, frame_delay, loops）
+
+    Returns:
+        dict: 計測結果
+    """
+    import metrics
+    from oled_pages import RecordingSerial
+    from scroll_oled import OLEDScroller
+
+    serial = RecordingSerial(record=False)
+    device = None
+    if options['device'] == 'dummy':
+        from luma.core.device import dummy
+        device = dummy(width=128, height=64, mode='1', serial_interface=serial)
+    scroller = OLEDScroller(font_path=options['font'], font_size=options['font_size'],
+                            serial_interface=serial, device=device)
+    serial.reset()  # 初期化コマンドは含めない
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    scroller.scroll(SAMPLE_TEXT, speed=options['speed'], delay=options['frame_delay'],
+                    loops=options['loops'])
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    result = frame_totals()
+    result.update(run_ms=elapsed * 1000, cpu_ms=cpu * 1000, fps=metrics.SCROLL_FPS.get(),
+                  i2c_bytes=serial.total_bytes)
+    return result
+
+
+def probe_advisor(options):
+    """
+    子プロセス側の計測: フル版の WeatherOutfitAdvisor を初期化から終了まで実行
+    （接続先・設定は親プロセスが環境変数で指定済み）
+
+    Args:
+        options (dict): 計測条件（loops）
+
+    Returns:
+        dict: 計測結果
+    """
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    import weather_outfit_advisor_full
+    import metrics
+    import_done = time.perf_counter()
+
+    advisor = weather_outfit_advisor_full.WeatherOutfitAdvisor()
+    serial = advisor.oled_serial
+    if serial is not None:
+        serial.reset()  # 初期化コマンドは含めない
+    advisor.run(loop_count=options['loops'])
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    result = frame_totals()
+    result.update(run_ms=elapsed * 1000, import_ms=(import_done - start) * 1000, cpu_ms=cpu * 1000,
+                  fps=metrics.SCROLL_FPS.get(),
+                  i2c_bytes=serial.total_bytes if serial is not None else None)
+    return result
+
+
+def probe(scenario, options):
+    """
+    子プロセス側の計測を実行し、結果をJSONで1行出力
+
+    Args:
+        scenario (str): シナリオ名（SCENARIOSのキー）
+        options (dict): 計測条件
+    """
+    if scenario == 'scroller':
+        result = probe_scroller(options)
+    else:
+        result = probe_advisor(options)
+
+    frames = result['frames']
+    # CPU時間はプロセス全体（advisor系は通信・JSON解析を含む）をフレーム数で割った値
+    result['cpu_ms_per_frame'] = result['cpu_ms'] / frames if frames else None
+    result['i2c_bytes_per_frame'] = (result['i2c_bytes'] / frames
+                                     if frames and result['i2c_bytes'] is not None else None)
+    result['peak_rss_kb'] = peak_rss_kb()
+    print(json.dumps(result))
+
+
+def scenario_env(scenario, options, services, workdir):
+    """
+    子プロセスの環境変数（実機・本物のAPI・.envの設定を使わないようにする）
+
+    Args:
+        scenario (str): シナリオ名
+        options (dict): 計測条件
+        services (FakeServices): 代替サーバー
+        workdir (str): キャッシュ・ログの置き場所
+
+    Returns:
+        dict: 環境変数
+    """
+    env = dict(os.environ)
+    env.update({
+        'OLED_BACKEND': 'dummy' if options['device'] == 'dummy' else 'mock',
+        'OLED_DELTA': 'true',
+        'WEATHER_API_KEY': 'benchmark',
+        'OPENAI_API_KEY': 'benchmark',
+        'WEATHER_API_URL': services.weather_url,
+        'OPENAI_BASE_URL': services.openai_base_url,
+        'CITY_NAME': SCENARIOS[scenario].get('cities', 'Tokyo'),
+        # キャッシュは毎回空にして、通信・生成の時間を必ず含める
+        'WEATHER_CACHE_PATH': os.path.join(workdir, 'weather_cache.json'),
+        'WEATHER_CACHE_TTL_SEC': '0',
+        'WEATHER_CACHE_STALE_SEC': '0',
+        'ADVICE_CACHE_PATH': os.path.join(workdir, 'advice_cache.json'),
+        'ADVICE_CACHE_TTL_SEC': '0',
+        'STRIP_CACHE_KB': '0',
+        # 代替サーバーの応答時間は一定なので、p95で出すヘッジは計測を揺らすだけ（期限と遮断は有効のまま）
+        'LATENCY_STATS_PATH': os.path.join(workdir, 'latency_stats.json'),
+        'HEDGE_REQUESTS': 'false',
+        'ADVICE_BATCH_COMPARE': 'false',
+        'FONT_PATH': options['font'],
+        'FONT_SIZE': str(options['font_size']),
+        'SCROLL_SPEED_PX': str(options['speed']),
+        'FRAME_DELAY_SEC': str(options['frame_delay']),
+        'SCROLL_PRERENDER': 'true',
+        'SCROLL_PACKED': 'true',
+        'METRICS_TEXTFILE': '',
+        'METRICS_PORT': '0',
+    })
+    env.update(SCENARIOS[scenario].get('env', {}))
+    return env
+
+
+def run_scenario(scenario, options, services, repeat):
+    """
+    シナリオを新しいプロセスで繰り返し実行し、中央値を求める
+
+    Args:
+        scenario (str): シナリオ名
+        options (dict): 計測条件
+        services (FakeServices): 代替サーバー
+        repeat (int): 実行回数
+
+    Returns:
+        dict: 各項目の中央値と、1回あたりのリクエスト数
+    """
+    samples = []
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        for _ in range(repeat):
+            before = services.snapshot()
+            command = [sys.executable, os.path.abspath(__file__), '--probe', scenario,
+                       '--probe-options', json.dumps(options)]
+            # 作業ディレクトリを一時ディレクトリにして、ログファイルやキャッシュを残さない
+            result = subprocess.run(command, capture_output=True, text=True, cwd=workdir,
+                                    env=scenario_env(scenario, options, services, workdir))
+            if result.returncode != 0:
+                raise RuntimeError(f"{scenario} の計測に失敗しました:\n{result.stderr}")
+            sample = json.loads(result.stdout.strip().splitlines()[-1])
+            after = services.snapshot()
+            sample['weather_requests'] = after['weather'] - before['weather']
+            sample['llm_requests'] = after['chat'] - before['chat']
+            samples.append(sample)
+
+    summary = {}
+    for key in samples[0]:
+        values = [s[key] for s in samples if s[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """
+    基準値と比較し、許容範囲を超えて悪化した項目を列挙
+
+    Args:
+        results (dict): 今回の計測結果（シナリオ名 → 結果）
+        baseline (dict): 基準となる計測結果（--json で保存したもの）
+        tolerance (float): 許容する悪化率（0.2 で20%）
+
+    Returns:
+        list: 悪化した項目の説明
+    """
+    base_results = baseline.get('results', {})
+    regressions = []
+    for scenario, current in results.items():
+        base = base_results.get(scenario)
+        if not base:
+            continue
+        for key, higher_is_better in COMPARE_KEYS.items():
+            now, before = current.get(key), base.get(key)
+            if now is None or before is None:
+                continue
+            if higher_is_better:
+                worse = now < before * (1 - tolerance)
+            else:
+                worse = now > before * (1 + tolerance)
+            if worse:
+                regressions.append(f"{scenario}.{key}: {before:.2f} → {now:.2f}")
+    return regressions
+
+
+def format_result(scenario, r):
+    """1シナリオの結果を1行の文字列にする"""
+    def value(key, fmt):
+        return format(r[key], fmt) if r.get(key) is not None else "-"
+
+    return (f"[{scenario:13}] 全体 {value('run_ms', '.0f')}ms, {value('frames', '.0f')}フレーム "
+            f"{value('fps', '.1f')}fps, CPU {value('cpu_ms_per_frame', '.3f')}ms/フレーム "
+            f"（描画 {value('render_ms', '.3f')}ms, display {value('display_ms', '.3f')}ms）, "
+            f"I²C {value('i2c_bytes_per_frame', '.0f')}バイト/フレーム, "
+            f"最大メモリ {value('peak_rss_kb', '.0f')}KiB, "
+            f"リクエスト 天気{value('weather_requests', '.0f')}/AI{value('llm_requests', '.0f')}")
+
+
+def main():
+    """
+    メイン関数：代替サーバーを起動して各シナリオを計測し、表示・保存・基準値と比較
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="実機・APIキーなしのオフライン ベンチマーク")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="計測するシナリオ（既定: すべて）")
+    parser.add_argument('--repeat', type=int, default=3, help="実行回数（中央値を採用）")
+    parser.add_argument('--font', default=os.path.join(here, 'assets', 'fonts', 'NotoSansCJKjp-Regular.otf'),
+                        help="使用するフォント")
+    parser.add_argument('--font-size', type=int, default=14, help="フォントサイズ")
+    parser.add_argument('--device', choices=['ssd1306', 'dummy'], default='ssd1306',
+                        help="表示デバイス（ssd1306: ドライバを通して送信内容を集計, "
+                             "dummy: lumaのダミーデバイス）")
+    parser.add_argument('--speed', type=int, default=4, help="スクロール速度（ピクセル/フレーム）")
+    parser.add_argument('--frame-delay', type=float, default=0.02, help="フレーム周期（秒）")
+    parser.add_argument('--loops', type=int, default=1, help="スクロールのループ回数")
+    parser.add_argument('--weather-latency-ms', type=float, default=50, help="天気APIの応答時間")
+    parser.add_argument('--llm-latency-ms', type=float, default=800,
+                        help="OpenAI APIの最初の応答までの時間")
+    parser.add_argument('--token-interval-ms', type=float, default=30, help="1文字ごとの生成間隔")
+    parser.add_argument('--json', help="計測結果をJSONで保存するファイル")
+    parser.add_argument('--baseline', help="比較する基準の計測結果（JSON）")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="基準からの許容悪化率（既定: 0.2 = 20%%）")
+    parser.add_argument('--probe', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--probe-options', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 計測用の子プロセスとして起動された場合
+    if args.probe:
+        probe(args.probe, json.loads(args.probe_options))
+        return
+
+    options = {
+        'font': os.path.abspath(args.font),
+        'font_size': args.font_size,
+        'device': args.device,
+        'speed': args.speed,
+        'frame_delay': args.frame_delay,
+        'loops': args.loops,
+    }
+    services = FakeServices(weather_latency=args.weather_latency_ms / 1000,
+                            llm_latency=args.llm_latency_ms / 1000,
+                            token_interval=args.token_interval_ms / 1000)
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            results[scenario] = run_scenario(scenario, options, services, args.repeat)
+            print(format_result(scenario, results[scenario]))
+    finally:
+        services.close()
+
+    if args.json:
+        config = dict(options, repeat=args.repeat, weather_latency_ms=args.weather_latency_ms,
+                      llm_latency_ms=args.llm_latency_ms, token_interval_ms=args.token_interval_ms)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    # 基準値との比較（悪化があれば終了コード1）
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("性能が悪化しました:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("基準値との比較: 問題なし")
+
+
+if __name__ == "__main__":
+    main()
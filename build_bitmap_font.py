@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+ビットマップフォント作成ツール
+NotoSansCJKjp などのOTFを指定サイズで事前描画し、起動時にメモリマップで読み込めるファイルを作成
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# === 収録する文字 ===
+# OpenWeatherMap（lang=ja）の天気の説明と、表示テキストで使う記号
+WEATHER_VOCABULARY = (
+    "晴天 薄い雲 雲 曇りがち 厚い雲 小雨 適度な雨 強い雨 非常に激しい雨 極端な雨 "
+    "霧雨 にわか雨 雷雨 雪 小雪 大雪 みぞれ 霧 もや 煙 砂塵 火山灰 突風 竜巻 "
+    "°℃％｜：・、。「」！？ー〜"
+)
+# 動作確認用のサンプル（起動時間・メモリ計測で描画する）
+SAMPLE_TEXT = "Tokyo: 18.3°C 曇りがち | 薄手のジャケットと折りたたみ傘がおすすめです"
+
+
+def jis_chars():
+    """
+    JIS X 0208（第1・第2水準漢字、仮名、記号）の全文字を列挙
+
+    Returns:
+        list: 文字のリスト（約6900文字）
+    """
+    chars = []
+    # EUC-JPの2バイト領域（0xA1〜0xFE × 0xA1〜0xFE）がJIS X 0208に対応
+    for high in range(0xA1, 0xFF):
+        for low in range(0xA1, 0xFF):
+            try:
+                chars.append(bytes([high, low]).decode("euc_jp"))
+            except UnicodeDecodeError:
+                pass  # 未定義の区点
+    return chars
+
+
+def build_charset():
+    """
+    ビットマップフォントに収録する文字集合を作成
+
+    Returns:
+        set: ASCII印字可能文字 + JIS X 0208 + 天気用語
+    """
+    chars = {chr(code) for code in range(0x20, 0x7F)}
+    chars.update(jis_chars())
+    chars.update(WEATHER_VOCABULARY)
+    return chars
+
+
+def probe(mode, font_path, font_size, bitmap_path):
+    """
+    フォントを読み込んでサンプルを描画し、所要時間と最大メモリ使用量を出力（計測用の子プロセス）
+
+    Args:
+        mode (str): "otf"（FreeTypeのみ）または "bitmap"（ビットマップフォント優先）
+        font_path (str): OTFのパス
+        font_size (int): フォントサイズ
+        bitmap_path (str): ビットマップフォントのパス
+    """
+    start = time.perf_counter()
+    from glyph_atlas import GlyphAtlas, BitmapFont
+    bitmap_font = BitmapFont(bitmap_path) if mode == "bitmap" else None
+    atlas = GlyphAtlas(font_path, font_size, bitmap_font=bitmap_font)
+    atlas.render_strip(SAMPLE_TEXT, 128, 64, 25)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss はLinuxではKiB単位
+    rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'mode': mode, 'seconds': elapsed, 'max_rss_kib': rss_kib,
+                      'freetype_loaded': atlas._font is not None}))
+
+
+def measure(font_path, font_size, bitmap_path, repeat=3):
+    """
+    OTFのみ／ビットマップフォント使用時の起動時間とメモリを別プロセスで計測して表示
+
+    Args:
+        font_path (str): OTFのパス
+        font_size (int): フォントサイズ
+        bitmap_path (str): ビットマップフォントのパス
+        repeat (int): 計測回数（最小値を採用）
+    """
+    for mode in ("otf", "bitmap"):
+        results = []
+        for _ in range(repeat):
+            # 毎回新しいプロセスで計測（キャッシュ済みの状態を持ち越さない）
+            output = subprocess.run(
+                [sys.executable, __file__, "--probe", mode, "--font", font_path,
+                 "--size", str(font_size), "--output", bitmap_path],
+                check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        best = min(results, key=lambda r: r['seconds'])
+        print(f"[{mode:6}] 読み込み+描画 {best['seconds'] * 1000:.1f}ms, "
+              f"最大RSS {best['max_rss_kib'] / 1024:.1f}MiB, "
+              f"FreeType使用: {'あり' if best['freetype_loaded'] else 'なし'}")
+
+
+def main():
+    """
+    メイン関数：コマンドライン引数に応じてビットマップフォントの作成・計測を実行
+    """
+    load_dotenv()
+
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="OLED表示用ビットマップフォントを作成")
+    parser.add_argument("--font", default=os.getenv('FONT_PATH', './assets/fonts/NotoSansCJKjp-Regular.otf'),
+                        help="元のフォントファイル（既定: .envのFONT_PATH）")
+    parser.add_argument("--size", type=int, default=int(os.getenv('FONT_SIZE', '14')),
+                        help="フォントサイズ（既定: .envのFONT_SIZE）")
+    parser.add_argument("--output", help="出力ファイル（既定: フォント名-サイズ.bmf）")
+    parser.add_argument("--measure", action="store_true",
+                        help="作成後、OTFのみの場合と起動時間・メモリを比較")
+    parser.add_argument("--probe", choices=["otf", "bitmap"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from glyph_atlas import bitmap_font_path, write_bitmap_font
+    output = args.output or bitmap_font_path(args.font, args.size)
+
+    # 計測用の子プロセスとして起動された場合
+    if args.probe:
+        probe(args.probe, args.font, args.size, output)
+        return
+
+    # フォントの読み込み
+    from PIL import ImageFont
+    try:
+        font = ImageFont.truetype(args.font, args.size)
+    except IOError as e:
+        print(f"[フォント読み込み]エラー: {e}")
+        print(f"ヒント: {args.font} にフォントを配置")
+        sys.exit(1)
+
+    # ビットマップフォントの作成
+    start = time.perf_counter()
+    count = write_bitmap_font(output, font, build_charset())
+    print(f"作成完了: {output}（{count}文字, {os.path.getsize(output) / 1024:.0f}KiB, "
+          f"{time.perf_counter() - start:.1f}秒）")
+
+    if args.measure:
+        measure(args.font, args.size, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+ダブルバッファライブラリ
+バックグラウンドのスレッドが用意した新しい値を、表示側の区切りのよいタイミングで一度に入れ替える
+（少しずつ届くテキストを表示側へ渡す StreamingText も含む）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import threading
+import time
+
+
+class DoubleBuffer:
+    """
+    表示中の値（front）と次に表示する値（back）を持つダブルバッファ
+    書き込み側は publish() で back を差し替えるだけで、表示側が swap() するまで front は変わりません
+    """
+
+    def __init__(self):
+        """
+        ダブルバッファの初期化（front・backとも空）
+        """
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._front = None
+        self._back = None
+        self.published = 0  # publish() された回数
+        self.swapped = 0    # swap() で実際に入れ替えた回数
+
+    @property
+    def front(self):
+        """表示中の値（まだ一度も入れ替えていなければNone）"""
+        return self._front
+
+    def publish(self, value):
+        """
+        次に表示する値を登録（表示側が入れ替える前に再度呼ばれたら新しい方で上書き）
+
+        Args:
+            value: 次に表示する値（None以外）
+        """
+        with self._lock:
+            self._back = value
+            self.published += 1
+        self._ready.set()
+
+    def swap(self):
+        """
+        新しい値が登録されていれば表示中の値と入れ替える（表示側の区切りで呼ぶ）
+
+        Returns:
+            bool: 入れ替えた場合True
+        """
+        with self._lock:
+            if self._back is None:
+                return False
+            self._front, self._back = self._back, None
+            self.swapped += 1
+            return True
+
+    def wait_ready(self, timeout=None):
+        """
+        最初の値が登録されるまで待つ
+
+        Args:
+            timeout (float): 最大待ち時間（秒、Noneで無制限）
+
+        Returns:
+            bool: 値が登録済みならTrue
+        """
+        return self._ready.wait(timeout)
+
+
+class StreamingText:
+    """
+    バックグラウンドのスレッドから少しずつ届くテキスト（AIのストリーミング応答など）
+    書き込み側が append() で追加し、表示側は snapshot() で毎フレーム現在の内容を確認します
+    """
+
+    def __init__(self):
+        """
+        ストリーミングテキストの初期化（作成時刻をリクエスト開始時刻とする）
+        """
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._text = ""
+        self.error = None
+        self.started_at = time.perf_counter()
+        self.first_token_at = None  # 最初の文字が届いた時刻
+        self.finished_at = None     # 終了した時刻
+
+    @property
+    def text(self):
+        """これまでに届いたテキスト"""
+        with self._lock:
+            return self._text
+
+    def append(self, chunk):
+        """
+        届いた文字を追加
+
+        Args:
+            chunk (str): 追加するテキスト
+        """
+        with self._lock:
+            if self.first_token_at is None and chunk:
+                self.first_token_at = time.perf_counter()
+            self._text += chunk
+
+    def finish(self, error=None):
+        """
+        テキストの受信を終了
+
+        Args:
+            error (Exception): 途中で失敗した場合の例外
+        """
+        with self._lock:
+            self.error = error
+            self.finished_at = time.perf_counter()
+        self._done.set()
+
+    def snapshot(self):
+        """
+        現在の内容を取得
+
+        Returns:
+            tuple: (これまでに届いたテキスト, 受信が終了していればTrue)
+        """
+        with self._lock:
+            return self._text, self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        受信が終了するまで待つ
+
+        Args:
+            timeout (float): 最大待ち時間（秒、Noneで無制限）
+
+        Returns:
+            bool: 終了していればTrue
+        """
+        return self._done.wait(timeout)
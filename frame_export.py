@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+フレーム書き出しライブラリ
+OLEDの代わりに表示される1ビットのフレームをそのまま受け取り、
+アニメーションGIF・PNG連番・SSD1306のページ形式の生データとしてファイルに書き出す
+（画面なしでの表示確認と、I²C転送を含まない描画速度の計測に使う）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import argparse
+import atexit
+import os
+import time
+
+from PIL import Image
+
+from oled_pages import image_to_pages
+
+# 書き出し形式
+#   gif: アニメーションGIF（1ファイル、閉じるときにまとめて保存するので全フレームをメモリに保持）
+#   png: PNG連番（ディレクトリに frame_000000.png, ... を1枚ずつ保存）
+#   raw: SSD1306のページ形式（1フレーム 幅×高さ/8 バイト、ヘッダーなしで連結）
+FRAME_FORMATS = ('gif', 'png', 'raw')
+
+
+def guess_format(path):
+    """
+    出力先のパスから書き出し形式を決める
+
+    Args:
+        path (str): 出力先（.gif → gif, .raw/.bin → raw, それ以外はPNG連番のディレクトリ）
+
+    Returns:
+        str: 書き出し形式
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gif':
+        return 'gif'
+    if ext in ('.raw', '.bin'):
+        return 'raw'
+    return 'png'
+
+
+class FrameRecorder:
+    """
+    画面のない表示デバイス（luma.oledのデバイスと同じ display()・clear()・contrast() を持つ）
+    表示されたフレームを数え、出力先が指定されていればファイルに書き出します
+    これを表示先にすると、スクロール表示はフレーム周期を待たずに全速で進みます
+    """
+
+    def __init__(self, path=None, width=128, height=64, frame_period=0.05, fmt=None):
+        """
+        フレーム書き出しの初期化
+
+        Args:
+            path (str): 出力先（Noneならファイルに書かず、フレーム数と最後の画像だけ保持）
+            width (int): 画面幅
+            height (int): 画面高さ（8の倍数）
+            frame_period (float): 実機でのフレーム周期（秒、GIFの表示間隔に使う）
+            fmt (str): 書き出し形式（FRAME_FORMATS、Noneなら path の拡張子から決める）
+        """
+        self.path = path
+        self.format = (fmt or guess_format(path)) if path else None
+        if self.format is not None and self.format not in FRAME_FORMATS:
+            raise ValueError(f"書き出し形式は {FRAME_FORMATS} のいずれか（指定: {self.format}）")
+        self.width = width
+        self.height = height
+        self.size = (width, height)
+        self.mode = "1"
+        self.frame_period = frame_period
+        self.frames = 0         # display() されたフレーム数
+        self.bytes_written = 0  # raw形式で書き出したバイト数
+        self.image = None       # 最後に表示された画像
+        self._gif_frames = []
+        self._raw = None
+        self._closed = False
+
+        if self.format == 'png':
+            os.makedirs(path, exist_ok=True)
+        elif self.format in ('gif', 'raw'):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self.format == 'raw':
+                self._raw = open(path, 'wb')
+        # luma.oledのデバイスと同じく、終了時に後片付け（GIFの保存）を行う
+        atexit.register(self.close)
+
+    def display(self, image):
+        """
+        1フレームを受け取る（待機はしない）
+
+        Args:
+            image (PIL.Image): 画面サイズの画像
+        """
+        if image.size != self.size:
+            raise ValueError(f"画像サイズ {image.size} が画面サイズ {self.size} と異なります")
+        if image.mode != "1":
+            image = image.convert("1")
+        self.image = image
+
+        if self.format == 'gif':
+            self._gif_frames.append(image)
+        elif self.format == 'png':
+            image.save(os.path.join(self.path, f"frame_{self.frames:06d}.png"))
+        elif self.format == 'raw':
+            # 実機のGDDRAMに送るのと同じバイト列（ページ0の全列, ページ1の全列, ...）
+            data = image_to_pages(image)
+            self._raw.write(data)
+            self.bytes_written += len(data)
+        self.frames += 1
+
+    def clear(self):
+        """
+        画面をクリア（最後の画像を全消灯にするだけで、フレームとしては書き出さない）
+        """
+        self.image = Image.new("1", self.size)
+
+    def contrast(self, level):
+        """コントラスト設定（画面がないので何もしない）"""
+
+    def cleanup(self):
+        """後片付け（close() と同じ）"""
+        self.close()
+
+    def close(self):
+        """
+        書き出しを終了（GIFはここでファイルに保存、2回目以降は何もしない）
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)  # 大量に書き出す場合に終了処理が溜まらないように
+        if self.format == 'gif' and self._gif_frames:
+            first, *rest = self._gif_frames
+            first.save(self.path, save_all=True, append_images=rest,
+                       duration=max(10, round(self.frame_period * 1000)), loop=0)
+            self._gif_frames = []
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+
+    def summary(self):
+        """
+        ログ出力用の書き出し結果の要約
+
+        Returns:
+            str: フレーム数と出力先
+        """
+        if self.format is None:
+            return f"{self.frames}フレーム（ファイル出力なし）"
+        return f"{self.frames}フレーム → {self.path}（{self.format}）"
+
+
+def main():
+    """
+    テキストファイルの各行をスクロール表示のフレームとして書き出し、描画速度を表示
+    （大量のアドバイス文の表示確認や、I²C転送を除いた描画性能の計測に使う）
+    """
+    from scroll_oled import OLEDScroller, FONT_PATH, FONT_SIZE, WIDTH, HEIGHT
+
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="スクロール表示のフレームをファイルに書き出す")
+    parser.add_argument('texts', help="表示するテキストのファイル（1行1テキスト、空行は無視）")
+    parser.add_argument('--out', help="出力先ディレクトリ（省略時はファイルに書かず速度だけ計測）")
+    parser.add_argument('--format', choices=FRAME_FORMATS, default='gif', help="書き出し形式")
+    parser.add_argument('--font', default=FONT_PATH, help="使用するフォント")
+    parser.add_argument('--font-size', type=int, default=FONT_SIZE, help="フォントサイズ")
+    parser.add_argument('--width', type=int, default=WIDTH, help="画面幅")
+    parser.add_argument('--height', type=int, default=HEIGHT, help="画面高さ")
+    parser.add_argument('--speed', type=int, default=2, help="スクロール速度（ピクセル/フレーム）")
+    parser.add_argument('--frame-delay', type=float, default=0.05, help="実機でのフレーム周期（GIFの表示間隔）")
+    parser.add_argument('--y-pos', type=int, default=24, help="テキストのY座標")
+    args = parser.parse_args()
+
+    with open(args.texts, encoding='utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+
+    recorder = FrameRecorder(width=args.width, height=args.height, frame_period=args.frame_delay)
+    scroller = OLEDScroller(font_path=args.font, font_size=args.font_size,
+                            width=args.width, height=args.height, device=recorder)
+    extension = {'gif': '.gif', 'png': '', 'raw': '.raw'}[args.format]
+
+    frames = 0
+    start = time.perf_counter()
+    for number, text in enumerate(texts, 1):
+        if args.out:
+            # テキストごとに別ファイル（PNG連番は別ディレクトリ）に書き出す
+            path = os.path.join(args.out, f"{number:05d}{extension}")
+            scroller.device = FrameRecorder(path, args.width, args.height, args.frame_delay, args.format)
+        else:
+            scroller.device = FrameRecorder(None, args.width, args.height, args.frame_delay)
+        scroller.scroll(text, speed=args.speed, delay=args.frame_delay, loops=1,
+                        y_pos=args.y_pos, verbose=False)
+        scroller.device.close()
+        frames += scroller.device.frames
+    elapsed = time.perf_counter() - start
+
+    rate = frames / elapsed if elapsed > 0 else 0.0
+    print(f"{len(texts)}テキスト, {frames}フレーム, {elapsed:.2f}秒（{rate:.0f}フレーム/秒）")
+    print(scroller.atlas.summary())
+    if args.out:
+        print(f"出力先: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+フレームスケジューラ
+絶対期限（monotonic時計）でフレームを刻み、処理の重さに関係なく一定のスクロール速度を保つ
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import asyncio
+import time
+
+# advance_async() でイベントループに譲らず、wait() で正確に待つ残り時間（秒）
+ASYNC_SLEEP_MARGIN = 0.002
+
+
+class FrameScheduler:
+    """
+    フレームごとの絶対期限を目標に待機するスケジューラ
+    描画・転送時間を含めてフレーム周期を一定に保ち、遅れたときはフレームを飛ばして追いつく
+    """
+
+    def __init__(self, frame_period, realtime=True):
+        """
+        スケジューラの初期化
+
+        Args:
+            frame_period (float): フレーム周期（秒、例: 0.05 で20fps）
+            realtime (bool): Falseなら待機せずに次のフレームへ進む（画面のない書き出し・計測用）
+                             毎回1フレームずつ進めるので、実時間でなくフレーム単位で同じ動きになる
+        """
+        self.frame_period = frame_period
+        self.realtime = realtime
+        self.start()
+
+    def start(self):
+        """
+        計測と期限をリセットして、現在時刻を最初のフレームの期限にする
+        """
+        self._start = time.monotonic()
+        self._deadline = self._start  # 現在のフレームの期限
+        self.frames = 0               # 実際に表示したフレーム数
+        self.late_frames = 0          # 期限に間に合わなかったフレーム数
+        self.skipped_frames = 0       # 遅れを取り戻すために飛ばしたフレーム数
+        self.max_jitter = 0.0         # 期限と実際の開始時刻のずれの最大値（秒）
+
+    def wait(self):
+        """
+        次のフレームの期限まで待機する
+
+        Returns:
+            int: 進めるべきフレーム数（通常1、遅れた場合は飛ばした分を加えた値）
+                 スクロール位置は「速度 × この値」だけ進めると見た目の速度が一定になる
+        """
+        self.frames += 1
+        next_deadline = self._deadline + self.frame_period
+        if not self.realtime:
+            # 待機しない: 期限は記録上だけ進め、遅延・スキップとしては数えない
+            self._deadline = next_deadline
+            return 1
+
+        now = time.monotonic()
+        steps = 1
+
+        if now > next_deadline:
+            # 期限超過: 過ぎてしまった期限はまとめて飛ばす（ずれを蓄積させない）
+            self.late_frames += 1
+            missed = int((now - next_deadline) // self.frame_period)
+            if missed:
+                self.skipped_frames += missed
+                steps += missed
+                next_deadline += missed * self.frame_period
+        else:
+            time.sleep(next_deadline - now)
+
+        # 期限からのずれ（ジッタ）を記録
+        jitter = abs(time.monotonic() - next_deadline)
+        self.max_jitter = max(self.max_jitter, jitter)
+
+        self._deadline = next_deadline
+        return steps
+
+    def stats(self):
+        """
+        フレーム統計を取得
+
+        Returns:
+            dict: fps（実測フレームレート）、frames、late_frames、skipped_frames、
+                  max_jitter_ms を含む辞書
+        """
+        elapsed = time.monotonic() - self._start
+        return {
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'frames': self.frames,
+            'late_frames': self.late_frames,
+            'skipped_frames': self.skipped_frames,
+            'max_jitter_ms': self.max_jitter * 1000,
+        }
+
+    def summary(self):
+        """
+        ログ出力用の統計文字列を作成
+
+        Returns:
+            str: 統計の要約（例: "実測 19.9fps, 遅延 2, スキップ 1, 最大ジッタ 3.1ms"）
+        """
+        s = self.stats()
+        return (f"実測 {s['fps']:.1f}fps（目標 {1 / self.frame_period:.1f}fps）, "
+                f"遅延 {s['late_frames']}, スキップ {s['skipped_frames']}, "
+                f"最大ジッタ {s['max_jitter_ms']:.1f}ms")
+
+    def advance(self, speed):
+        """
+        次のフレームの期限まで待機し、スクロール位置を進めるピクセル数を返す
+
+        Args:
+            speed (int): 1フレームあたりのスクロール量（ピクセル）
+
+        Returns:
+            int: 進めるピクセル数（速度 × 進めるフレーム数）
+        """
+        self._begin_wait()
+        return self._step(speed)
+
+    async def advance_async(self, speed):
+        """
+        advance() のasyncio版（期限まではイベントループに処理を譲って待つ）
+
+        Args:
+            speed (int): 1フレームあたりのスクロール量（ピクセル）
+
+        Returns:
+            int: 進めるピクセル数
+        """
+        self._begin_wait()
+        if self.realtime:
+            # イベントループのタイマーは少し遅れて起きるので、期限の少し前まで譲り、残りは wait() で待つ
+            delay = self._deadline + self.frame_period - time.monotonic() - ASYNC_SLEEP_MARGIN
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)  # 全速で描画する場合も、フレームごとに他のタスクへ処理を譲る
+        return self._step(speed)
+
+    def _begin_wait(self):
+        """フレームの処理を終えて待機に入る直前に呼ばれる（周期を調整するサブクラス用）"""
+
+    def _step(self, speed):
+        """期限まで待機し（過ぎていれば待たない）、進めるピクセル数を返す"""
+        return speed * self.wait()
+
+
+class AdaptiveFrameScheduler(FrameScheduler):
+    """
+    スクロール速度（ピクセル/秒）を一定に保つよう、フレーム周期と1フレームの移動量を調整するスケジューラ
+    描画・転送が重くなったら期限を守れる周期まで下げて1フレームの移動量を増やし（止まって見えるより
+    カクつきの少ない低フレームレートを優先）、軽くなったら元の周期へ戻します
+    """
+
+    def __init__(self, frame_period, velocity, max_period=0.2, headroom=0.7,
+                 smoothing=0.2, realtime=True):
+        """
+        スケジューラの初期化
+
+        Args:
+            frame_period (float): 最短のフレーム周期（秒、負荷が軽いときの周期）
+            velocity (float): 保つスクロール速度（ピクセル/秒）
+            max_period (float): 最長のフレーム周期（秒、これ以上はフレームレートを下げない）
+            headroom (float): 1フレームの処理時間が周期に占める割合の目標（0.7なら3割の余裕を残す）
+            smoothing (float): 処理時間の移動平均の重み（大きいほど変化にすばやく追従）
+            realtime (bool): Falseなら待機せずに次のフレームへ進む（周期の調整もしない）
+        """
+        self.base_period = frame_period
+        self.velocity = velocity
+        self.max_period = max(max_period, frame_period)
+        self.headroom = headroom
+        self.smoothing = smoothing
+        super().__init__(frame_period, realtime=realtime)
+
+    def start(self):
+        """
+        計測と期限・周期の調整状態をリセット
+        """
+        super().start()
+        self.frame_period = self.base_period
+        self._woke = self._start  # 前回の待機から戻った時刻（ここから wait() までが処理時間）
+        self._carry = 0.0         # 整数ピクセルに丸めた残り（次のフレームに繰り越す）
+        self.frame_cost = 0.0     # 1フレームの処理時間の移動平均（秒）
+        self.decisions = []       # 周期を変えた記録 [(経過秒, 旧周期, 新周期), ...]
+
+    def _adapt(self, cost):
+        """
+        処理時間の移動平均から次のフレーム周期を決める
+        （20%以上変わるときだけ変更し、細かく揺れないようにする）
+        """
+        if self.frame_cost:
+            self.frame_cost += self.smoothing * (cost - self.frame_cost)
+        else:
+            self.frame_cost = cost
+        target = min(max(self.frame_cost / self.headroom, self.base_period), self.max_period)
+        if abs(target - self.frame_period) > 0.2 * self.frame_period:
+            self.decisions.append((time.monotonic() - self._start, self.frame_period, target))
+            self.frame_period = target
+
+    def _begin_wait(self):
+        """前回の待機から戻ってからの処理時間で周期を調整"""
+        if self.realtime:
+            self._adapt(time.monotonic() - self._woke)
+
+    def _step(self, speed):
+        """
+        期限まで待機し、前回の期限からの経過時間 × スクロール速度 のピクセル数を返す
+        （speed は使わない。端数は次のフレームに繰り越す）
+        """
+        previous = self._deadline
+        self.wait()
+        self._woke = time.monotonic()
+
+        pixels = self.velocity * (self._deadline - previous) + self._carry
+        step = int(pixels)
+        self._carry = pixels - step
+        return step
+
+    def summary(self):
+        """
+        ログ出力用の統計文字列を作成（周期を変えた回数と現在の1フレームの移動量を含む）
+
+        Returns:
+            str: 統計の要約
+        """
+        return (f"{super().summary()}, 速度 {self.velocity:.0f}px/秒, "
+                f"処理 {self.frame_cost * 1000:.1f}ms/フレーム, "
+                f"移動量 {self.velocity * self.frame_period:.1f}px/フレーム, 周期変更 {len(self.decisions)}回")
+
+    def decision_log(self):
+        """
+        周期を変えた記録をログ出力用に整形
+
+        Returns:
+            list: 例 ["+3.2秒: 20.0fps → 12.5fps（4.0px/フレーム）", ...]
+        """
+        return [f"+{at:.1f}秒: {1 / old:.1f}fps → {1 / new:.1f}fps（{self.velocity * new:.1f}px/フレーム）"
+                for at, old, new in self.decisions]
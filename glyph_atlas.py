@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+グリフアトラス（文字画像キャッシュ）ライブラリ
+1文字ずつ描画した1ビットのグリフを再利用し、ストリップ画像を文字の貼り付けだけで組み立てる
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import bisect
+import mmap
+import os
+import struct
+from collections import OrderedDict, namedtuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# キャッシュの上限（バイト）。日本語グリフ1文字は14pxで約40バイト+管理情報
+GLYPH_CACHE_BYTES = 256 * 1024
+# 1グリフあたりの管理情報の概算（Imageオブジェクトやタプルのぶん）
+GLYPH_OVERHEAD_BYTES = 200
+
+# image: 1ビットのグリフ画像（空白文字はNone）
+# left, top: 描画原点からのグリフ左上のずれ、advance: 次の文字までの送り幅
+Glyph = namedtuple('Glyph', ['image', 'left', 'top', 'advance'])
+
+# ビットマップフォントファイルの形式（リトルエンディアン）
+#   ヘッダー: マジック(8) フォントサイズ(u16) 予約(u16) 文字数(u32)
+#   文字コード表: u32 × 文字数（昇順、二分探索用）
+#   グリフ情報: (データ位置 u32, left i16, top i16, 幅 u16, 高さ u16, 送り幅 f32) × 文字数
+#   グリフ画像: モード"1"の tobytes() を連結したもの
+BITMAP_FONT_MAGIC = b"OLEDBMF1"
+BITMAP_FONT_HEADER = struct.Struct("<8sHHI")
+BITMAP_FONT_ENTRY = struct.Struct("<IhhHHf")
+
+
+def render_glyph(font, char):
+    """
+    FreeTypeで1文字を1ビット画像に描画
+
+    Args:
+        font (ImageFont.FreeTypeFont): 描画に使うフォント
+        char (str): 1文字
+
+    Returns:
+        Glyph: グリフ画像と配置情報
+    """
+    # 1ビット描画時の境界ボックス（描画原点からの相対位置）
+    left, top, right, bottom = ImageDraw.Draw(Image.new("1", (1, 1))).textbbox(
+        (0, 0), char, font=font)
+    advance = font.getlength(char)
+
+    if right <= left or bottom <= top:
+        return Glyph(None, 0, 0, advance)  # スペースなど描画する画素がない文字
+
+    image = Image.new("1", (right - left, bottom - top))
+    ImageDraw.Draw(image).text((-left, -top), char, font=font, fill=255)
+    return Glyph(image, left, top, advance)
+
+
+def bitmap_font_path(font_path, font_size):
+    """
+    フォントファイルに対応するビットマップフォントの既定パスを作成
+
+    Args:
+        font_path (str): 元のフォントファイルのパス
+        font_size (int): フォントサイズ
+
+    Returns:
+        str: 例 "./assets/fonts/NotoSansCJKjp-Regular-14.bmf"
+    """
+    return f"{os.path.splitext(font_path)[0]}-{font_size}.bmf"
+
+
+def write_bitmap_font(path, font, chars):
+    """
+    指定した文字をFreeTypeで描画し、ビットマップフォントファイルに保存
+
+    Args:
+        path (str): 出力ファイルのパス
+        font (ImageFont.FreeTypeFont): 描画に使うフォント
+        chars (iterable): 収録する文字
+
+    Returns:
+        int: 収録した文字数
+    """
+    codes = sorted({ord(c) for c in chars})
+    entries = []
+    bitmaps = bytearray()
+    for code in codes:
+        glyph = render_glyph(font, chr(code))
+        if glyph.image is None:
+            entries.append(BITMAP_FONT_ENTRY.pack(len(bitmaps), 0, 0, 0, 0, glyph.advance))
+        else:
+            entries.append(BITMAP_FONT_ENTRY.pack(
+                len(bitmaps), glyph.left, glyph.top,
+                glyph.image.width, glyph.image.height, glyph.advance))
+            bitmaps += glyph.image.tobytes()
+
+    # 一時ファイルに書いてから置き換え（書き込み途中のファイルを読ませない）
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(BITMAP_FONT_HEADER.pack(BITMAP_FONT_MAGIC, font.size, 0, len(codes)))
+        f.write(struct.pack(f"<{len(codes)}I", *codes))
+        f.write(b"".join(entries))
+        f.write(bitmaps)
+    os.replace(tmp_path, path)
+    return len(codes)
+
+
+class BitmapFont:
+    """
+    事前描画済みのビットマップフォント（build_bitmap_font.py で作成）
+    ファイルをメモリマップして使うので、読み込みは一瞬で、使った文字のぶんしかメモリを消費しません
+    """
+
+    def __init__(self, path):
+        """
+        ビットマップフォントファイルを開く
+
+        Args:
+            path (str): ビットマップフォントファイルのパス
+
+        Raises:
+            OSError: ファイルが存在しない・読めない場合
+            ValueError: ファイル形式が正しくない場合
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.font_size, _, count = BITMAP_FONT_HEADER.unpack_from(self._map, 0)
+        if magic != BITMAP_FONT_MAGIC:
+            raise ValueError(f"ビットマップフォントの形式が不正です: {path}")
+
+        codes_start = BITMAP_FONT_HEADER.size
+        self._entries_start = codes_start + count * 4
+        self._bitmaps_start = self._entries_start + count * BITMAP_FONT_ENTRY.size
+        # 文字コード表はmmap上をそのまま二分探索する（全体を読み込まない）
+        self._codes = memoryview(self._map)[codes_start:self._entries_start].cast("I")
+
+    def __len__(self):
+        return len(self._codes)
+
+    def glyph(self, char):
+        """
+        収録済みのグリフを取得
+
+        Args:
+            char (str): 1文字
+
+        Returns:
+            Glyph: グリフ（収録されていない文字はNone）
+        """
+        code = ord(char)
+        index = bisect.bisect_left(self._codes, code)
+        if index >= len(self._codes) or self._codes[index] != code:
+            return None
+
+        offset, left, top, width, height, advance = BITMAP_FONT_ENTRY.unpack_from(
+            self._map, self._entries_start + index * BITMAP_FONT_ENTRY.size)
+        if not width:
+            return Glyph(None, 0, 0, advance)
+
+        start = self._bitmaps_start + offset
+        size = (width + 7) // 8 * height
+        image = Image.frombytes("1", (width, height), self._map[start:start + size])
+        return Glyph(image, left, top, advance)
+
+
+class GlyphAtlas:
+    """
+    (フォント, サイズ, 文字) ごとに描画済みグリフを保持するLRUキャッシュ
+    よく使う仮名・漢字は一度だけFreeTypeで描画し、以降は画像の貼り付けだけで済ませます
+    ビットマップフォントがあればそこから取り出し、収録外の文字だけFreeTypeで描画します
+    """
+
+    def __init__(self, font_path, font_size, max_bytes=GLYPH_CACHE_BYTES, bitmap_font=None):
+        """
+        グリフアトラスの初期化
+
+        Args:
+            font_path (str): フォントファイルのパス
+            font_size (int): フォントサイズ
+            max_bytes (int): キャッシュの上限バイト数（超えたら古いグリフから削除）
+            bitmap_font (BitmapFont): 事前描画済みフォント（Noneなら全文字FreeTypeで描画）
+        """
+        self.font_path = font_path
+        self.font_size = font_size
+        self.max_bytes = max_bytes
+        self.bitmap_font = bitmap_font
+        self._font = None
+        self._glyphs = OrderedDict()  # (font_path, font_size, 文字) -> (Glyph, バイト数)
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def font(self):
+        """FreeTypeフォント（初回アクセス時に読み込み、IOErrorはそのまま送出）"""
+        if self._font is None:
+            self._font = ImageFont.truetype(self.font_path, self.font_size)
+        return self._font
+
+    def glyph(self, char):
+        """
+        1文字ぶんのグリフを取得（キャッシュになければ描画して登録）
+
+        Args:
+            char (str): 1文字
+
+        Returns:
+            Glyph: グリフ画像と配置情報
+        """
+        key = (self.font_path, self.font_size, char)
+        entry = self._glyphs.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._glyphs.move_to_end(key)  # 最近使ったものを末尾へ（LRU）
+            return entry[0]
+
+        self.misses += 1
+        glyph = self.bitmap_font.glyph(char) if self.bitmap_font is not None else None
+        if glyph is None:
+            glyph = self._render_glyph(char)
+        size = GLYPH_OVERHEAD_BYTES
+        if glyph.image is not None:
+            size += (glyph.image.width + 7) // 8 * glyph.image.height
+
+        self._glyphs[key] = (glyph, size)
+        self.bytes_used += size
+
+        # 上限を超えたら、最も長く使われていないグリフから削除
+        while self.bytes_used > self.max_bytes and len(self._glyphs) > 1:
+            _, (_, old_size) = self._glyphs.popitem(last=False)
+            self.bytes_used -= old_size
+            self.evictions += 1
+        return glyph
+
+    def _render_glyph(self, char):
+        """
+        FreeTypeで1文字を描画（ビットマップフォントに無い文字のフォールバック）
+        """
+        try:
+            return render_glyph(self.font, char)
+        except IOError:
+            if self.bitmap_font is None:
+                raise
+            # フォントファイルが無くてもビットマップフォントだけで表示を続ける（空白扱い）
+            return Glyph(None, 0, 0, self.font_size / 2)
+
+    def layout(self, text):
+        """
+        テキストの各文字のグリフと描画位置を計算
+
+        Args:
+            text (str): 配置するテキスト
+
+        Returns:
+            tuple: ([(x, Glyph), ...], テキスト幅)
+                   xはテキスト先頭からの描画原点のX座標
+        """
+        placed = []
+        pen = 0.0
+        right = 0
+        for char in text:
+            glyph = self.glyph(char)
+            x = round(pen)
+            placed.append((x, glyph))
+            if glyph.image is not None:
+                right = max(right, x + glyph.left + glyph.image.width)
+            pen += glyph.advance
+        return placed, max(right, round(pen))
+
+    def render_strip(self, text, width, height, y_pos, layout=None):
+        """
+        テキストを横長の1ビット画像（ストリップ）にグリフの貼り付けで組み立てる
+
+        テキストの前後に画面幅ぶんの余白を付けておくことで、
+        ストリップから画面幅を切り出すだけで「右端から入って左端へ抜ける」全フレームを作れる
+
+        Args:
+            text (str): 描画するテキスト
+            width (int): 画面幅（余白の幅として使用）
+            height (int): 画面高さ
+            y_pos (int): テキストのY座標
+            layout (tuple): layout(text) の結果（計算済みなら渡すと再計算しない）
+
+        Returns:
+            tuple: (ストリップ画像, テキスト幅)
+                   画面左端のX座標がxのフレームは strip.crop((width - x, 0, width * 2 - x, height))
+        """
+        placed, text_width = layout or self.layout(text)
+
+        # [余白(画面幅)][テキスト][余白(画面幅)] の横長画像に、グリフを1文字ずつ貼り付け
+        strip = Image.new("1", (width + text_width + width, height))
+        for x, glyph in placed:
+            if glyph.image is not None:
+                # グリフ自身をマスクにして白で塗る（重なった画素は消さない）
+                strip.paste(255, (width + x + glyph.left, y_pos + glyph.top), glyph.image)
+        return strip, text_width
+
+    def summary(self):
+        """
+        ログ出力用のキャッシュ統計を作成
+
+        Returns:
+            str: ヒット率・登録数・使用メモリの要約
+        """
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return (f"グリフキャッシュ ヒット {self.hits}, ミス {self.misses}（ヒット率 {rate:.1f}%）, "
+                f"{len(self._glyphs)}文字, {self.bytes_used / 1024:.1f}KiB / "
+                f"{self.max_bytes / 1024:.0f}KiB, 削除 {self.evictions}")
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+レイテンシ予算ライブラリ
+1回の更新（天気取得→アドバイス生成）全体の持ち時間を決め、遅い呼び出しには2本目のリクエストを
+並行して出し（ヘッジ）、失敗が続く接続先はしばらく呼ばない（サーキットブレーカー）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import asyncio
+import queue
+import threading
+import time
+
+import metrics
+
+# 既定の保存先と設定
+LATENCY_STATS_PATH = "./.cache/latency_stats.json"
+RUN_BUDGET = 20.0          # 1回の更新全体の持ち時間（秒）
+HEDGE_QUANTILE = 0.95      # この分位の応答時間を過ぎても返ってこなければ2本目を出す
+HEDGE_MIN_DELAY = 0.05     # 2本目を出すまでの最短の待ち時間（秒）
+LATENCY_WINDOW = 50        # 分位の計算に使う直近の応答時間の件数
+CIRCUIT_FAILURES = 3       # 続けてこの回数失敗したら呼び出しを止める
+CIRCUIT_RESET = 60.0       # 止めてからこの秒数が過ぎたら1回だけ試す
+
+
+class Deadline:
+    """
+    1回の更新全体の期限（monotonic時計）
+    各呼び出しは remaining() を自分のタイムアウトにするので、何段呼んでも合計が予算を超えません
+    """
+
+    def __init__(self, budget=RUN_BUDGET):
+        """
+        期限の初期化
+
+        Args:
+            budget (float): 持ち時間（秒、0以下で期限なし）
+        """
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget if budget > 0 else None
+
+    def remaining(self):
+        """
+        残り時間
+
+        Returns:
+            float: 残り秒数（期限切れは0、期限なしはNone）
+        """
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        """期限切れかどうか"""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def elapsed(self):
+        """開始からの経過秒数"""
+        return time.monotonic() - self.started_at
+
+
+class LatencyTracker:
+    """
+    接続先ごとの直近の応答時間を保持し、分位（p95など）を求める
+    ファイルに保存するので、cronで毎回起動しても前回までの応答時間からヘッジの待ち時間を決められます
+    """
+
+    def __init__(self, name, store=None, window=LATENCY_WINDOW, initial=1.0):
+        """
+        応答時間の記録の初期化
+
+        Args:
+            name (str): 接続先の名前（weather, advice など）
+            store (JsonFileStore): 保存先（Noneならこのプロセス内だけで保持）
+            window (int): 保持する件数
+            initial (float): 記録が無いときに分位の代わりに使う秒数
+        """
+        self.name = name
+        self.store = store
+        self.window = window
+        self.initial = initial
+        self._lock = threading.Lock()
+        self.samples = list(store.load().get('latency', {}).get(name, [])) if store else []
+
+    def observe(self, seconds):
+        """
+        成功した呼び出しの応答時間を記録
+
+        Args:
+            seconds (float): 応答時間（秒）
+        """
+        with self._lock:
+            self.samples = (self.samples + [round(seconds, 4)])[-self.window:]
+            samples = list(self.samples)
+        if self.store is not None:
+            def update(data):
+                data.setdefault('latency', {})[self.name] = samples
+            self.store.update(update)
+
+    def quantile(self, q):
+        """
+        応答時間の分位
+
+        Args:
+            q (float): 分位（0.95でp95）
+
+        Returns:
+            float: 分位の秒数（記録が無ければ initial）
+        """
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return self.initial
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CircuitBreaker:
+    """
+    続けて失敗した接続先への呼び出しを一定時間止めるサーキットブレーカー
+    closed（通常）→ 失敗が続くと open（呼ばずに失敗扱い）→ 時間が過ぎると half-open（1回だけ試す）
+    """
+
+    def __init__(self, name, failures=CIRCUIT_FAILURES, reset_timeout=CIRCUIT_RESET):
+        """
+        サーキットブレーカーの初期化
+
+        Args:
+            name (str): 接続先の名前（ログ用）
+            failures (int): open にする連続失敗回数（0で無効）
+            reset_timeout (float): open から1回試すまでの秒数
+        """
+        self.name = name
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.consecutive = 0     # 連続失敗回数
+        self.opened_at = None    # open にした時刻（closed ならNone）
+        self._trial = False      # half-open で試している呼び出しがあるか
+        self.rejected = 0        # open のため呼ばなかった回数
+
+    @property
+    def state(self):
+        """現在の状態（closed, open, half-open）"""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self):
+        """
+        呼び出してよいか（half-open では同時に1回だけ許可）
+
+        Returns:
+            bool: 呼び出してよければTrue
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success):
+        """
+        呼び出しの結果を記録
+
+        Args:
+            success (bool): 成功したか
+        """
+        with self._lock:
+            self._trial = False
+            if success:
+                self.consecutive = 0
+                self.opened_at = None
+                return
+            self.consecutive += 1
+            if self.failures > 0 and (self.consecutive >= self.failures or self.opened_at is not None):
+                # 規定回数の失敗、または half-open の試行の失敗: もう一度しばらく止める
+                self.opened_at = time.monotonic()
+
+
+class HedgedCaller:
+    """
+    1つの接続先への呼び出しを、期限・ヘッジ・サーキットブレーカーつきで行うクラス
+
+    呼び出しは call(timeout) → 結果（失敗時はNone）の関数で渡します。p95を過ぎても返らなければ
+    同じ呼び出しをもう1本出して先に返った方を使い、1本目がすぐ失敗した場合も残り時間で2本目を出します。
+    期限を過ぎたらNoneを返す（遅れて返った結果は捨てる）ので、呼び出し側は最後に成功したデータで表示できます
+    """
+
+    def __init__(self, name, tracker, breaker=None, quantile=HEDGE_QUANTILE,
+                 min_delay=HEDGE_MIN_DELAY, hedge=True):
+        """
+        呼び出し側の初期化
+
+        Args:
+            name (str): 接続先の名前（ログ・メトリクス用）
+            tracker (LatencyTracker): 応答時間の記録（ヘッジの待ち時間の計算に使う）
+            breaker (CircuitBreaker): サーキットブレーカー（Noneなら使わない）
+            quantile (float): この分位の応答時間を過ぎたら2本目を出す
+            min_delay (float): 2本目を出すまでの最短の待ち時間（秒）
+            hedge (bool): Falseなら2本目を出さない（期限とサーキットブレーカーのみ）
+        """
+        self.name = name
+        self.tracker = tracker
+        self.breaker = breaker
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.hedge = hedge
+        self.calls = 0       # call() の回数
+        self.hedged = 0      # 2本目を出した回数
+        self.hedge_wins = 0  # 2本目の結果を使った回数
+        self.timeouts = 0    # 期限切れで諦めた回数
+        self.rejected = 0    # サーキットブレーカーで呼ばなかった回数
+
+    def hedge_delay(self):
+        """2本目を出すまでの待ち時間（秒、直近の応答時間の分位）"""
+        return max(self.tracker.quantile(self.quantile), self.min_delay)
+
+    def call(self, func, deadline=None):
+        """
+        期限までに結果を取得（必要ならヘッジ）
+
+        Args:
+            func (callable): タイムアウト（秒、Noneで既定）を受け取り結果を返す関数（失敗時はNone）
+            deadline (Deadline): 全体の期限（Noneなら期限なし）
+
+        Returns:
+            結果（期限切れ・失敗・サーキットブレーカーで呼ばなかった場合はNone）
+        """
+        if not self.admit(deadline):
+            return None
+
+        results = queue.Queue()
+
+        def attempt(index):
+            timeout = deadline.remaining() if deadline is not None else None
+            start = time.monotonic()
+            try:
+                value = func(timeout)
+            except Exception:
+                value = None
+            results.put((index, value, time.monotonic() - start))
+
+        def launch(index):
+            # 期限後に返った呼び出しを待たずに終われるよう daemon スレッドで実行
+            threading.Thread(target=attempt, args=(index,), daemon=True,
+                             name=f"{self.name}-call-{index}").start()
+
+        launch(0)
+        running = 1
+        attempts = 1
+        max_attempts = 2 if self.hedge else 1
+        hedge_at = time.monotonic() + self.hedge_delay()
+
+        while running:
+            wait = deadline.remaining() if deadline is not None else None
+            if attempts < max_attempts:
+                until_hedge = max(0.0, hedge_at - time.monotonic())
+                wait = until_hedge if wait is None else min(wait, until_hedge)
+            try:
+                index, value, elapsed = results.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and deadline.expired:
+                    break
+                # p95を過ぎても返らない: 同じ呼び出しをもう1本出す
+                launch(attempts)
+                attempts += 1
+                running += 1
+                self.hedged += 1
+                continue
+
+            running -= 1
+            if value is not None:
+                self.settle(elapsed, hedge_win=index > 0)
+                return value
+            if attempts < max_attempts and not (deadline is not None and deadline.expired):
+                # すぐに失敗した: 2本目を待ち時間なしで出す
+                launch(attempts)
+                attempts += 1
+                running += 1
+                self.hedged += 1
+
+        self.settle(None, timed_out=running > 0)
+        return None
+
+    async def call_async(self, func, deadline=None):
+        """
+        call() のasyncio版（同じ期限・ヘッジ・サーキットブレーカー・応答時間の記録を使う）
+        使われなかった方の呼び出しは取り消します
+
+        Args:
+            func (callable): タイムアウト（秒、Noneで既定）を受け取り、結果（失敗時はNone）を返すコルーチン関数
+            deadline (Deadline): 全体の期限（Noneなら期限なし）
+
+        Returns:
+            結果（期限切れ・失敗・サーキットブレーカーで呼ばなかった場合はNone）
+        """
+        if not self.admit(deadline):
+            return None
+
+        async def attempt(index):
+            timeout = deadline.remaining() if deadline is not None else None
+            start = time.monotonic()
+            try:
+                value = await func(timeout)
+            except Exception:
+                value = None
+            return index, value, time.monotonic() - start
+
+        running = {asyncio.ensure_future(attempt(0))}
+        attempts = 1
+        max_attempts = 2 if self.hedge else 1
+        hedge_at = time.monotonic() + self.hedge_delay()
+        try:
+            while running:
+                wait = deadline.remaining() if deadline is not None else None
+                if attempts < max_attempts:
+                    until_hedge = max(0.0, hedge_at - time.monotonic())
+                    wait = until_hedge if wait is None else min(wait, until_hedge)
+                done, running = await asyncio.wait(running, timeout=wait,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if deadline is not None and deadline.expired:
+                        break
+                    # p95を過ぎても返らない: 同じ呼び出しをもう1本出す
+                    running.add(asyncio.ensure_future(attempt(attempts)))
+                    attempts += 1
+                    self.hedged += 1
+                    continue
+
+                for task in done:
+                    index, value, elapsed = task.result()
+                    if value is not None:
+                        self.settle(elapsed, hedge_win=index > 0)
+                        return value
+                if attempts < max_attempts and not (deadline is not None and deadline.expired):
+                    # すぐに失敗した: 2本目を待ち時間なしで出す
+                    running.add(asyncio.ensure_future(attempt(attempts)))
+                    attempts += 1
+                    self.hedged += 1
+        finally:
+            for task in running:
+                task.cancel()
+
+        self.settle(None, timed_out=bool(running))
+        return None
+
+    def admit(self, deadline=None):
+        """
+        呼び出してよいか確認（期限切れ・サーキットブレーカーで遮断中ならFalse）
+        call() を使わずに自分で呼び出す場合（ストリーミング応答など）は、先にこれを呼び、
+        結果を settle() で記録します
+
+        Args:
+            deadline (Deadline): 全体の期限（Noneなら期限なし）
+
+        Returns:
+            bool: 呼び出してよければTrue
+        """
+        self.calls += 1
+        if deadline is not None and deadline.expired:
+            self.timeouts += 1
+            metrics.UPSTREAM_CALLS.inc(upstream=self.name, outcome="budget")
+            return False
+        if self.breaker is not None and not self.breaker.allow():
+            self.rejected += 1
+            metrics.UPSTREAM_CALLS.inc(upstream=self.name, outcome="circuit_open")
+            return False
+        return True
+
+    def settle(self, elapsed, timed_out=False, hedge_win=False):
+        """
+        admit() で許可した呼び出しの結果を記録（応答時間・サーキットブレーカー・メトリクス）
+
+        Args:
+            elapsed (float): 成功した呼び出しの応答時間（秒、失敗はNone）
+            timed_out (bool): 失敗の原因が期限切れか
+            hedge_win (bool): 2本目の結果を使ったか
+        """
+        if self.breaker is not None:
+            self.breaker.record(elapsed is not None)
+        if elapsed is not None:
+            self.tracker.observe(elapsed)
+            if hedge_win:
+                self.hedge_wins += 1
+            metrics.UPSTREAM_CALLS.inc(upstream=self.name, outcome="hedge" if hedge_win else "ok")
+        elif timed_out:
+            self.timeouts += 1
+            metrics.UPSTREAM_CALLS.inc(upstream=self.name, outcome="budget")
+        else:
+            metrics.UPSTREAM_CALLS.inc(upstream=self.name, outcome="error")
+
+    def summary(self):
+        """
+        ログ出力用の統計を作成
+
+        Returns:
+            str: 呼び出し・ヘッジ・期限切れの回数とサーキットブレーカーの状態
+        """
+        text = (f"{self.name}: 呼び出し {self.calls}, ヘッジ {self.hedged}（採用 {self.hedge_wins}）, "
+                f"期限切れ {self.timeouts}, p{self.quantile * 100:.0f} {self.hedge_delay() * 1000:.0f}ms")
+        if self.breaker is not None:
+            text += f", 遮断 {self.rejected}（{self.breaker.state}）"
+        return text
+
+
+def hedged_caller(name, store=None, initial=1.0, hedge=True, quantile=HEDGE_QUANTILE,
+                  failures=CIRCUIT_FAILURES, reset_timeout=CIRCUIT_RESET):
+    """
+    応答時間の記録とサーキットブレーカーを揃えて HedgedCaller を作成
+
+    Args:
+        name (str): 接続先の名前
+        store (JsonFileStore): 応答時間の保存先（Noneならプロセス内のみ）
+        initial (float): 応答時間の記録が無いときのヘッジの待ち時間（秒）
+        hedge (bool): 2本目のリクエストを出すか
+        quantile (float): ヘッジの待ち時間に使う分位
+        failures (int): サーキットブレーカーを open にする連続失敗回数（0で無効）
+        reset_timeout (float): open から1回試すまでの秒数
+
+    Returns:
+        HedgedCaller: 呼び出し側
+    """
+    return HedgedCaller(name, LatencyTracker(name, store, initial=initial),
+                        CircuitBreaker(name, failures, reset_timeout) if failures > 0 else None,
+                        quantile=quantile, hedge=hedge)
+
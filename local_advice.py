@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+ローカル服装アドバイスライブラリ
+気温帯・体感温度の差・湿度・天気コードの小さな表を引くだけで服装アドバイスを作る（通信なし・1ミリ秒未満）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import bisect
+
+from advice_batch import ADVICE_MAX_CHARS
+
+# 気温帯（°C）の境界と、各帯の服装（境界ちょうどは上の帯）
+TEMP_BOUNDS = (5, 10, 15, 20, 25, 30)
+TEMP_ADVICE = (
+    "厚手のコートにマフラー・手袋を",  # 5°C未満
+    "コートとニットで暖かく",          # 5〜10°C
+    "ジャケットなど上着が必要",        # 10〜15°C
+    "薄手の上着かカーディガンを",      # 15〜20°C
+    "長袖シャツで快適",                # 20〜25°C
+    "半袖で過ごしやすい",              # 25〜30°C
+    "半袖・帽子・水分補給を",          # 30°C以上
+)
+
+# 体感温度 − 気温（°C）の境界と、各帯の補足
+FEELS_BOUNDS = (-3, 3)
+FEELS_ADVICE = (
+    "体感は寒め、一枚多めに",    # 風などで3°Cを超えて低く感じる
+    None,
+    "体感は暑め、通気性重視で",  # 湿気などで3°C以上高く感じる
+)
+
+# 湿度（%）の境界と、各帯の補足（蒸し暑さは気温が HUMID_MIN_TEMP 以上のときだけ）
+HUMIDITY_BOUNDS = (31, 80)
+HUMIDITY_ADVICE = (
+    "乾燥に注意",
+    None,
+    "蒸し暑いので汗対策を",
+)
+HUMID_MIN_TEMP = 20
+
+# OpenWeatherMapの天気コード（weather[0].id）の範囲 [開始, 終了) と補足
+# https://openweathermap.org/weather-conditions
+CONDITION_ADVICE = (
+    (200, 300, "雷雨に注意、傘は必須"),
+    (300, 400, "折りたたみ傘があると安心"),
+    (500, 502, "傘を忘れずに"),
+    (502, 511, "大雨、レインコートと防水靴を"),
+    (511, 512, "凍る雨、滑りにくい靴で"),
+    (512, 600, "にわか雨、傘を忘れずに"),
+    (600, 700, "雪、防水で滑りにくい靴を"),
+    (700, 800, "視界が悪いので足元に注意"),
+    (800, 801, "日差し対策も"),  # 快晴（半袖の気温帯のみ、30°C以上は服装に含む）
+)
+_CONDITION_STARTS = [start for start, _, _ in CONDITION_ADVICE]
+CLEAR_SKY_BAND = 5  # 「日差し対策も」を付ける気温帯（25〜30°C）
+
+
+def _condition_advice(code, band):
+    """天気コードの補足（該当なしはNone）"""
+    index = bisect.bisect_right(_CONDITION_STARTS, code) - 1
+    if index < 0:
+        return None
+    start, end, advice = CONDITION_ADVICE[index]
+    if code >= end:
+        return None
+    if start == 800 and band != CLEAR_SKY_BAND:
+        return None
+    return advice
+
+
+def local_advice(weather_data, max_chars=ADVICE_MAX_CHARS):
+    """
+    天気データから服装アドバイスを作成（同じ入力には常に同じアドバイス）
+
+    気温帯の服装を基本に、天気（雨・雪など）、体感温度の差、湿度の順に、
+    max_chars に収まる範囲で補足を加えます
+
+    Args:
+        weather_data (dict): OpenWeatherMapの天気データ
+        max_chars (int): アドバイスの最大文字数
+
+    Returns:
+        str: 服装アドバイス（例: 22°C・雨なら "長袖シャツで快適。傘を忘れずに"）
+    """
+    main = weather_data['main']
+    temp = main['temp']
+    band = bisect.bisect_right(TEMP_BOUNDS, temp)
+    weather = (weather_data.get('weather') or [{}])[0]
+
+    parts = [TEMP_ADVICE[band]]
+    extras = [
+        _condition_advice(weather.get('id', 0), band),
+        FEELS_ADVICE[bisect.bisect_right(FEELS_BOUNDS, main['feels_like'] - temp)],
+        HUMIDITY_ADVICE[bisect.bisect_right(HUMIDITY_BOUNDS, main['humidity'])],
+    ]
+    if extras[2] == HUMIDITY_ADVICE[2] and temp < HUMID_MIN_TEMP:
+        extras[2] = None
+
+    length = len(parts[0])
+    for extra in extras:
+        # 区切りの「。」を含めて上限に収まるものだけ追加（優先度の高い順）
+        if extra and length + 1 + len(extra) <= max_chars:
+            parts.append(extra)
+            length += 1 + len(extra)
+    return "。".join(parts)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+メトリクス計測ライブラリ
+天気取得・AI生成・フレーム描画・OLED転送の所要時間をヒストグラムで集計し、
+Prometheusのテキスト形式でファイル出力またはローカルHTTPで公開する（追加ライブラリ不要）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import atexit
+import bisect
+import os
+import threading
+
+# ヒストグラムの区切り（上限値）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)           # 通信（秒）
+FRAME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)  # 1フレーム（秒）
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000)                          # トークン数
+
+
+def _format_value(value):
+    """Prometheusのテキスト形式の数値表記"""
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs):
+    """ラベルを {name="value",...} の形に整形（値の \\ " 改行はエスケープ）"""
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """
+    メトリクスの共通部分（名前・説明・ラベル名と、ラベル値ごとの値の保持）
+    """
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}  # ラベル値のタプル → 値
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name}: ラベルは {self.label_names} を指定してください（指定: {tuple(labels)}）")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        """
+        Prometheusのテキスト形式で出力
+
+        Returns:
+            list: 出力する行
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(list(zip(self.label_names, key)), value))
+        return lines
+
+    def _render_value(self, pairs, value):
+        return [f"{self.name}{_format_labels(pairs)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """増えるだけのカウンタ（フレーム遅延回数など）"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        カウンタを加算
+
+        Args:
+            amount (float): 加算する値
+            **labels: ラベル値
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """現在の値（未記録なら0）"""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+
+class Gauge(_Metric):
+    """最新の値を保持するゲージ（実測FPSなど）"""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """
+        値を設定
+
+        Args:
+            value (float): 設定する値
+            **labels: ラベル値
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        """現在の値（未設定ならNone）"""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key)
+
+
+class Histogram(_Metric):
+    """値の分布を区切りごとの件数で集計するヒストグラム（所要時間など）"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        値を1つ記録
+
+        Args:
+            value (float): 記録する値（秒・トークン数など）
+            **labels: ラベル値
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # value 以上の最小の区切り
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def totals(self, **labels):
+        """
+        記録した値の合計と件数
+
+        Returns:
+            tuple: (合計, 件数)（未記録なら (0.0, 0)）
+        """
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            return (entry[1], entry[2]) if entry else (0.0, 0)
+
+    def _render_value(self, pairs, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} "
+                         f"{cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    メトリクスの登録先（テキストファイル出力・HTTP公開の設定も保持）
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.textfile = None
+        self.server = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        """カウンタを登録（同名があればそれを返す）"""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        """ゲージを登録（同名があればそれを返す）"""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, buckets, labels=()):
+        """ヒストグラムを登録（同名があればそれを返す）"""
+        return self._register(Histogram(name, documentation, buckets, labels))
+
+    def render(self):
+        """
+        登録済みの全メトリクスをPrometheusのテキスト形式で出力
+
+        Returns:
+            str: テキスト形式のメトリクス
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        """
+        メトリクスをファイルに書き出す（node_exporterのtextfileコレクター向け）
+        一時ファイルに書いてから置き換えるので、読み込み途中のファイルを見せません
+
+        Args:
+            path (str): 出力先（Noneなら start_exporter() で指定したファイル、未指定なら何もしない）
+        """
+        path = path or self.textfile
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port, addr="127.0.0.1"):
+        """
+        /metrics でメトリクスを返すHTTPサーバーをバックグラウンドで起動
+
+        Args:
+            port (int): 待ち受けポート
+            addr (str): 待ち受けアドレス（既定はローカルのみ）
+
+        Returns:
+            ThreadingHTTPServer: 起動したサーバー
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # アクセスログはアプリのログに混ぜない
+
+        self.server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        return self.server
+
+
+# アプリ全体で共有する登録先
+REGISTRY = MetricsRegistry()
+
+# === アプリのメトリクス ===
+WEATHER_FETCH_SECONDS = REGISTRY.histogram(
+    "weather_fetch_seconds", "OpenWeatherMap APIの取得時間（秒、キャッシュから返した場合は含まない）",
+    LATENCY_BUCKETS, labels=("outcome",))
+WEATHER_CACHE_RESULTS = REGISTRY.counter(
+    "weather_cache_results_total", "天気キャッシュの結果（hit, stale, miss）", labels=("result",))
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "OpenAI APIの応答時間（秒、ストリーミングは最後のチャンクまで）",
+    LATENCY_BUCKETS, labels=("kind",))
+LLM_TOKENS = REGISTRY.histogram(
+    "llm_tokens", "1リクエストあたりのトークン数（prompt, completion, reasoning）",
+    TOKEN_BUCKETS, labels=("kind", "type"))
+ADVICE_CACHE_RESULTS = REGISTRY.counter(
+    "advice_cache_results_total", "アドバイスキャッシュの結果（hit, miss）", labels=("result",))
+UPSTREAM_CALLS = REGISTRY.counter(
+    "upstream_calls_total", "期限・ヘッジつきの呼び出しの結果（ok, hedge, error, budget, circuit_open）",
+    labels=("upstream", "outcome"))
+UPSTREAM_FALLBACKS = REGISTRY.counter(
+    "upstream_fallbacks_total", "取得できず最後に成功したデータを表示した回数", labels=("upstream",))
+FRAME_RENDER_SECONDS = REGISTRY.histogram(
+    "frame_render_seconds", "1フレームの画像作成時間（秒、OLED転送は含まない）", FRAME_BUCKETS)
+FRAME_DISPLAY_SECONDS = REGISTRY.histogram(
+    "frame_display_seconds", "1フレームのdisplay()時間（秒、ページ変換とI²C転送）", FRAME_BUCKETS)
+FRAMES_TOTAL = REGISTRY.counter(
+    "frames_total", "表示したフレーム数（result=ok, late, skipped）", labels=("result",))
+SCROLL_FPS = REGISTRY.gauge("scroll_fps", "直近のスクロール表示の実測FPS")
+SCROLL_TARGET_FPS = REGISTRY.gauge("scroll_target_fps", "直近のスクロール表示の目標FPS")
+
+
+def observe_llm(kind, seconds, usage=None):
+    """
+    OpenAI APIの1リクエストぶんの応答時間とトークン数を記録
+
+    Args:
+        kind (str): リクエストの種類（single, batch, stream）
+        seconds (float): 応答時間（秒）
+        usage: APIの応答の usage（Noneならトークン数は記録しない）
+    """
+    LLM_REQUEST_SECONDS.observe(seconds, kind=kind)
+    if usage is None:
+        return
+    LLM_TOKENS.observe(usage.prompt_tokens, kind=kind, type="prompt")
+    LLM_TOKENS.observe(usage.completion_tokens, kind=kind, type="completion")
+    details = getattr(usage, 'completion_tokens_details', None)
+    reasoning = getattr(details, 'reasoning_tokens', None)
+    if reasoning is not None:
+        LLM_TOKENS.observe(reasoning, kind=kind, type="reasoning")
+
+
+def observe_scroll(scheduler):
+    """
+    スクロール表示1回ぶんのフレーム統計を記録
+
+    Args:
+        scheduler (FrameScheduler): スクロール表示に使ったスケジューラ
+    """
+    stats = scheduler.stats()
+    SCROLL_FPS.set(stats['fps'])
+    SCROLL_TARGET_FPS.set(1 / scheduler.frame_period)
+    FRAMES_TOTAL.inc(stats['frames'] - stats['late_frames'], result="ok")
+    FRAMES_TOTAL.inc(stats['late_frames'], result="late")
+    FRAMES_TOTAL.inc(stats['skipped_frames'], result="skipped")
+
+
+def start_exporter(textfile=None, port=0, addr="127.0.0.1"):
+    """
+    メトリクスの公開を開始（.envの METRICS_TEXTFILE・METRICS_PORT から呼び出す）
+
+    Args:
+        textfile (str): 書き出すファイル（flush() と終了時に更新、Noneなら書き出さない）
+        port (int): HTTPで公開するポート（0なら公開しない）
+        addr (str): HTTPの待ち受けアドレス
+    """
+    if textfile:
+        REGISTRY.textfile = textfile
+        atexit.register(flush)
+    if port and REGISTRY.server is None:
+        REGISTRY.start_http_server(port, addr)
+
+
+def flush():
+    """
+    テキストファイルの出力先が設定されていれば書き出す（失敗しても処理は止めない）
+    """
+    try:
+        REGISTRY.write_textfile()
+    except OSError:
+        pass
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+SSD1306 ページ単位転送ライブラリ
+前回送信したページバッファと比較し、変化したページ・列範囲だけをI²Cで送信する
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+from PIL import Image
+
+# SSD1306のアドレス指定コマンド（水平アドレッシングモード時に有効）
+SSD1306_COLUMNADDR = 0x21  # 列アドレス範囲（開始, 終了）
+SSD1306_PAGEADDR = 0x22    # ページアドレス範囲（開始, 終了）
+
+# SSD1306 ハードウェアスクロール
+HW_SCROLL_LEFT = 0x27        # 左方向の水平スクロール設定
+HW_SCROLL_ACTIVATE = 0x2F    # スクロール開始
+HW_SCROLL_DEACTIVATE = 0x2E  # スクロール停止（停止後はGDDRAMの書き直しが必要）
+
+
+def image_to_pages(image):
+    """
+    1ビット画像をSSD1306のページ形式（縦8ピクセル=1バイト）に変換
+
+    SSD1306のGDDRAMは「ページ（8行ぶん）× 列」の並びで、1バイトの最下位ビットが上端の画素。
+    画像を時計回りに90度回転してから tobytes() すると、列ごとに
+    「下の画素が上位ビット」のバイト列が得られるので、ページ順を並べ替えるだけで済む
+    （luma.oled の画素ごとのPythonループを使わずに変換できる）
+
+    Args:
+        image (PIL.Image): モード"1"の画像（高さは8の倍数）
+
+    Returns:
+        bytes: ページ0の全列, ページ1の全列, ... の順に並んだバイト列（幅×高さ/8 バイト）
+    """
+    pages = image.height // 8
+    raw = image.transpose(Image.Transpose.ROTATE_270).tobytes()
+    # raw は列ごとに [ページ(pages-1), ..., ページ0] の順なので、ページごとに間引いて並べ直す
+    return b"".join(raw[pages - 1 - page::pages] for page in range(pages))
+
+
+class PackedStrip:
+    """
+    スクロール用ストリップをSSD1306のページ形式に一括変換して保持するクラス
+    フレームごとの画像切り出し・ページ変換をせず、バッファのスライス（コピーなし）をそのまま送信できます
+    """
+
+    def __init__(self, strip):
+        """
+        ページ形式ストリップの初期化
+
+        Args:
+            strip (PIL.Image): モード"1"のストリップ画像（高さは8の倍数）
+        """
+        self.width = strip.width
+        self.height = strip.height
+        self.pages = strip.height // 8
+        # ページ0の全列, ページ1の全列, ... の順（1ページ = ストリップ幅バイト）
+        self.buffer = image_to_pages(strip)
+        self._view = memoryview(self.buffer)
+
+    @classmethod
+    def from_pages(cls, buffer, width, height):
+        """
+        変換済みのページ形式バイト列から作成（ストリップキャッシュのメモリマップなど）
+
+        Args:
+            buffer: ページ形式のバイト列（bytes・mmap・memoryview、コピーせずに参照する）
+            width (int): ストリップ幅
+            height (int): ストリップ高さ（8の倍数）
+
+        Returns:
+            PackedStrip: ページ形式ストリップ
+        """
+        packed = cls.__new__(cls)
+        packed.width = width
+        packed.height = height
+        packed.pages = height // 8
+        packed.buffer = buffer
+        packed._view = memoryview(buffer)
+        return packed
+
+    def to_image(self):
+        """
+        モード"1"のストリップ画像に戻す（image_to_pages の逆変換、画像で受け取る表示先用）
+
+        Returns:
+            PIL.Image: ストリップ画像
+        """
+        # 列ごとに [ページ(pages-1), ..., ページ0] の並びに戻し、回転前の向きに戻す
+        raw = bytearray(len(self._view))
+        for page in range(self.pages):
+            raw[self.pages - 1 - page::self.pages] = self._view[page * self.width:(page + 1) * self.width]
+        rotated = Image.frombytes("1", (self.height, self.width), bytes(raw))
+        return rotated.transpose(Image.Transpose.ROTATE_90)
+
+    def window(self, offset, width):
+        """
+        ストリップの offset 列目から width 列ぶん（1画面）をページごとに取り出す
+
+        Args:
+            offset (int): 画面左端に来るストリップの列
+            width (int): 画面幅
+
+        Returns:
+            list: ページ0から順に、各ページ width バイトの memoryview（バッファのコピーなし）
+        """
+        view = self._view
+        rows = []
+        for page in range(self.pages):
+            start = page * self.width + offset
+            rows.append(view[start:start + width])
+        return rows
+
+
+def send_pages(device, rows, colstart=0):
+    """
+    ページごとのバイト列を全画面ぶん送信（luma.oledのページ変換を通さない）
+
+    水平アドレッシングモードでは、書き込み範囲を全画面にしてから続けてデータを送ると
+    ページ0の全列, ページ1の全列, ... の順に書き込まれるので、ページごとにそのまま送るだけで済む
+
+    Args:
+        device: SSD1306デバイス（command()・data() を持つもの）
+        rows (list): PackedStrip.window() が返すページごとのバイト列
+        colstart (int): 列オフセット（64x48などのパネル用）
+
+    Returns:
+        int: 送信したバイト数（コマンド+データ）
+    """
+    width = len(rows[0])
+    device.command(SSD1306_COLUMNADDR, colstart, colstart + width - 1,
+                   SSD1306_PAGEADDR, 0, len(rows) - 1)
+    for row in rows:
+        device.data(row)
+    return 6 + width * len(rows)
+
+
+def hardware_scroll_offsets(text_width, width):
+    """
+    ハードウェアスクロールで1周ずつ表示する、画面幅ぶんの区間のストリップ上の開始列
+
+    画面幅に収まるテキストは、末尾を画面右端にそろえた1区間だけ（パネルが回し続けても途切れない）。
+    収まらないテキストは、先頭から画面幅ごとに区切った区間（最後の区間の余りは後ろの余白）
+
+    Args:
+        text_width (int): テキスト幅
+        width (int): 画面幅（ストリップの前後の余白の幅）
+
+    Returns:
+        list: 区間ごとの開始列（GlyphAtlas.render_strip() のストリップの列）
+    """
+    if text_width <= width:
+        return [text_width]
+    return list(range(width, width + text_width, width))
+
+
+def start_hardware_scroll(device, rows, page_start, interval, colstart=0):
+    """
+    スクロールを止めてから画面幅ぶんのページを書き込み、左方向のハードウェアスクロールを開始
+
+    データシートはスクロール中のGDDRAMへのアクセスを禁止している（内容が壊れることがある）ため、
+    書き込みは必ず停止（0x2E）してから行い、書き終えてからスクロールを設定・開始（0x27, 0x2F）する
+
+    Args:
+        device: SSD1306デバイス（command()・data() を持つもの）
+        rows (list): page_start ページから順に、各ページ画面幅バイトのバイト列
+        page_start (int): 書き込み・スクロールする最初のページ
+        interval (int): スクロール間隔の設定値（データシートの表の値）
+        colstart (int): 列オフセット（64x48などのパネル用）
+
+    Returns:
+        int: 送信したバイト数（コマンド+データ）
+    """
+    width = len(rows[0])
+    page_end = page_start + len(rows) - 1
+    data = b"".join(rows)
+    device.command(HW_SCROLL_DEACTIVATE)
+    device.command(SSD1306_COLUMNADDR, colstart, colstart + width - 1,
+                   SSD1306_PAGEADDR, page_start, page_end)
+    device.data(list(data))
+    device.command(HW_SCROLL_LEFT, 0x00, page_start, interval, page_end, 0x00, 0xFF)
+    device.command(HW_SCROLL_ACTIVATE)
+    return 1 + 6 + len(data) + 7 + 1
+
+
+class DeltaDisplay:
+    """
+    SSD1306デバイスの差分転送ラッパー
+    表示中の内容をページバッファとして保持し、変化した部分だけを送信します
+    （display()以外の操作はそのまま元のデバイスに委譲）
+    """
+
+    def __init__(self, device):
+        """
+        差分転送ラッパーの初期化
+
+        Args:
+            device (luma.oled.device.ssd1306): 初期化済みのSSD1306デバイス
+        """
+        self.device = device
+        self.width = device.width
+        self.height = device.height
+        self.pages = device.height // 8
+        self._colstart = getattr(device, '_colstart', 0)  # 64x48などは列オフセットあり
+        # luma.oled は初期化時に画面をクリアしているので、全消灯状態から開始
+        self._sent = bytearray(self.width * self.pages)
+        self.reset_stats()
+
+    def __getattr__(self, name):
+        # contrast(), cleanup() などは元のデバイスに委譲
+        return getattr(self.device, name)
+
+    def reset_stats(self):
+        """
+        転送量の統計をリセット
+        """
+        self.frames = 0
+        self.bytes_sent = 0   # 実際に送信したバイト数（コマンド+データ）
+        self.bytes_full = 0   # 全画面転送した場合のバイト数
+
+    def display(self, image):
+        """
+        画像を表示（前回から変化したページ・列範囲だけを送信）
+
+        Args:
+            image (PIL.Image): 画面サイズのモード"1"画像
+        """
+        buf = memoryview(image_to_pages(self.device.preprocess(image)))
+        width = self.width
+        self.display_pages([buf[page * width:(page + 1) * width] for page in range(self.pages)])
+
+    def display_pages(self, rows):
+        """
+        ページ形式のバイト列を表示（前回から変化したページ・列範囲だけを送信）
+
+        Args:
+            rows (list): ページ0から順に、各ページ画面幅バイトのバイト列
+                         （PackedStrip.window() の戻り値をそのまま渡せる）
+        """
+        width = self.width
+        sent = 0
+
+        for page, row in enumerate(rows):
+            start = page * width
+            end = start + width
+            if row == self._sent[start:end]:
+                continue  # このページは変化なし
+
+            # 変化した列の範囲（左端・右端）を求める
+            first = 0
+            while row[first] == self._sent[start + first]:
+                first += 1
+            last = width - 1
+            while row[last] == self._sent[start + last]:
+                last -= 1
+
+            # 列・ページの書き込み範囲を指定してから、その範囲のデータだけ送る
+            self.device.command(SSD1306_COLUMNADDR, self._colstart + first, self._colstart + last,
+                                SSD1306_PAGEADDR, page, page)
+            self.device.data(list(row[first:last + 1]))
+            self._sent[start + first:start + last + 1] = row[first:last + 1]
+            sent += 6 + (last + 1 - first)
+
+        self.frames += 1
+        self.bytes_sent += sent
+        self.bytes_full += 6 + width * self.pages  # 全画面転送時: コマンド6バイト + 全データ
+
+    def clear(self):
+        """
+        画面をクリア（ページバッファも全消灯にそろえる）
+        """
+        self.device.clear()
+        self._sent = bytearray(self.width * self.pages)
+
+    def summary(self):
+        """
+        ログ出力用の転送量統計を作成
+
+        Returns:
+            str: 1フレームあたりの送信バイト数と削減量の要約
+        """
+        if not self.frames:
+            return "送信フレームなし"
+        per_frame = self.bytes_sent / self.frames
+        full = self.bytes_full / self.frames
+        return (f"I²C送信 平均 {per_frame:.0f}バイト/フレーム "
+                f"（全画面 {full:.0f}バイト, 削減 {full - per_frame:.0f}バイト/フレーム）")
+
+
+class RecordingSerial:
+    """
+    SSD1306へ送るコマンド・データを記録するシリアルインターフェース
+    実機なしでの動作確認やCIでのテスト、I²C転送量の計測に使います
+    """
+
+    def __init__(self, wrapped=None, record=True):
+        """
+        記録用シリアルインターフェースの初期化
+
+        Args:
+            wrapped: 実際に送信するシリアルインターフェース（Noneなら送信しない）
+                     例: luma.core.interface.serial.i2c(port=1, address=0x3C)
+            record (bool): Trueで送信内容をすべて記録（Falseはバイト数の集計のみ）
+        """
+        self.wrapped = wrapped
+        self.record = record
+        self.reset()
+
+    def reset(self):
+        """
+        記録と集計をリセット
+        """
+        self.log = []            # [('command', (0x21, ...)), ('data', b'...'), ...]
+        self.command_bytes = 0
+        self.data_bytes = 0
+
+    def command(self, *cmd):
+        """
+        コマンドを記録（wrappedがあれば転送）
+        """
+        self.command_bytes += len(cmd)
+        if self.record:
+            self.log.append(('command', tuple(cmd)))
+        if self.wrapped is not None:
+            self.wrapped.command(*cmd)
+
+    def data(self, data):
+        """
+        データを記録（wrappedがあれば転送）
+        """
+        self.data_bytes += len(data)
+        if self.record:
+            self.log.append(('data', bytes(data)))
+        if self.wrapped is not None:
+            self.wrapped.data(data)
+
+    def cleanup(self):
+        """
+        後片付け（wrappedがあればそのcleanupを呼ぶ）
+        """
+        if self.wrapped is not None:
+            self.wrapped.cleanup()
+
+    @property
+    def total_bytes(self):
+        """送信したコマンド・データの合計バイト数"""
+        return self.command_bytes + self.data_bytes
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+描画プロセスライブラリ
+スクロール表示のフレームループを別プロセスで動かし、共有メモリに置いたストリップを表示する
+（天気取得・AI応答・JSON解析・ログ出力とGILを取り合わないので、通信中もフレームの間隔が乱れない）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import logging
+import multiprocessing
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from frame_export import FrameRecorder
+from frame_scheduler import FrameScheduler, AdaptiveFrameScheduler
+from oled_pages import DeltaDisplay, PackedStrip, RecordingSerial, send_pages
+
+logger = logging.getLogger(__name__)
+
+# 共有メモリの大きさ（128×64なら256KiBで幅32768pxのストリップまで）
+RENDER_SHM_BYTES = 256 * 1024
+
+# 共有メモリの形式（リトルエンディアン、先頭から）
+#   ヘッダー（表示側プロセスが書く）: 番号(u64) ストリップ幅(u32) 高さ(u16) 予約(u16) テキスト幅(u32) データ長(u32)
+#   状態（描画プロセスが書く）: 表示中の番号(u64) 完了した周回(u64) フレーム数(u64) 遅延(u64)
+#                               スキップ(u64) 最大ジッタ(μs, u64)
+#   データ: ページ形式のストリップ
+# 番号は書き込み中は奇数、書き終えたら偶数（読む側は前後で番号が同じ偶数なら書き込みと重なっていない）
+SHM_HEADER = struct.Struct("<QIHHII")
+SHM_STATUS = struct.Struct("<QQQQQQ")
+SHM_STATUS_OFFSET = SHM_HEADER.size
+SHM_DATA_OFFSET = SHM_STATUS_OFFSET + SHM_STATUS.size
+
+
+class SharedStrip:
+    """
+    ページ形式のストリップを1つ置いておく共有メモリ
+    表示側プロセスが publish() で書き込み、描画プロセスが read() で番号の変化を見て読み出します
+    """
+
+    def __init__(self, name=None, size=RENDER_SHM_BYTES):
+        """
+        共有メモリの作成（nameを指定した場合は作成済みのものに接続）
+
+        Args:
+            name (str): 接続する共有メモリの名前（Noneで新規作成）
+            size (int): 新規作成時の大きさ（バイト）
+        """
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=SHM_DATA_OFFSET + size)
+            self.shm.buf[:SHM_DATA_OFFSET] = bytes(SHM_DATA_OFFSET)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = self.shm.size - SHM_DATA_OFFSET
+
+    @property
+    def sequence(self):
+        """最後に書き込まれたストリップの番号（0なら未登録、奇数なら書き込み中）"""
+        return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+    def publish(self, packed, text_width):
+        """
+        ストリップを書き込み、番号を進める（書き込み側は1プロセスだけ）
+
+        Args:
+            packed (PackedStrip): ページ形式のストリップ
+                                  （TiledStrip ならタイル幅ずつ直接書き込み、全幅をメモリに確保しない）
+            text_width (int): テキスト幅
+
+        Returns:
+            int: 書き込んだストリップの番号
+
+        Raises:
+            ValueError: ストリップが共有メモリに収まらない場合
+        """
+        width = packed.width
+        length = width * packed.pages
+        if length > self.capacity:
+            raise ValueError(f"ストリップ（{length}バイト）が共有メモリ（{self.capacity}バイト）に収まりません")
+        buf = self.shm.buf
+        sequence = self.sequence
+        struct.pack_into("<Q", buf, 0, sequence + 1)  # 書き込み中（奇数）
+        if isinstance(packed, PackedStrip):
+            buf[SHM_DATA_OFFSET:SHM_DATA_OFFSET + length] = packed.buffer
+        else:
+            step = packed.tile_width
+            for offset in range(0, width, step):
+                for page, row in enumerate(packed.window(offset, min(step, width - offset))):
+                    start = SHM_DATA_OFFSET + page * width + offset
+                    buf[start:start + len(row)] = row
+        SHM_HEADER.pack_into(buf, 0, sequence + 1, width, packed.height, 0, text_width, length)
+        struct.pack_into("<Q", buf, 0, sequence + 2)  # 書き込み完了（偶数）
+        return sequence + 2
+
+    def read(self):
+        """
+        最新のストリップをコピーして読み出す（書き込みと重なったら読み直す）
+
+        Returns:
+            tuple: (番号, PackedStrip, テキスト幅)（まだ何も登録されていなければNone）
+        """
+        buf = self.shm.buf
+        while True:
+            sequence, width, height, _, text_width, length = SHM_HEADER.unpack_from(buf, 0)
+            if sequence == 0:
+                return None
+            if sequence % 2:
+                time.sleep(0.0005)
+                continue
+            data = bytes(buf[SHM_DATA_OFFSET:SHM_DATA_OFFSET + length])
+            if self.sequence == sequence:
+                return sequence, PackedStrip.from_pages(data, width, height), text_width
+
+    def status(self):
+        """
+        描画プロセスの状態を取得
+
+        Returns:
+            dict: shown（表示中の番号）、loops、frames、late_frames、skipped_frames、max_jitter_ms
+        """
+        shown, loops, frames, late, skipped, jitter_us = SHM_STATUS.unpack_from(self.shm.buf, SHM_STATUS_OFFSET)
+        return {'shown': shown, 'loops': loops, 'frames': frames, 'late_frames': late,
+                'skipped_frames': skipped, 'max_jitter_ms': jitter_us / 1000}
+
+    def write_status(self, shown, loops, scheduler):
+        """描画プロセスの状態を書き込む（描画プロセスだけが呼ぶ）"""
+        SHM_STATUS.pack_into(self.shm.buf, SHM_STATUS_OFFSET, shown, loops, scheduler.frames,
+                             scheduler.late_frames, scheduler.skipped_frames,
+                             int(scheduler.max_jitter * 1_000_000))
+
+    def close(self, unlink=False):
+        """
+        共有メモリを閉じる
+
+        Args:
+            unlink (bool): Trueなら共有メモリ自体も削除（作成した側が最後に呼ぶ）
+        """
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def open_device(config):
+    """
+    描画プロセス側で表示デバイスを開く（.envの OLED_BACKEND などと同じ設定）
+
+    Args:
+        config (dict): backend, width, height, address, delta（exportでは export_path, frame_delay）
+
+    Returns:
+        表示デバイス（luma.oledのデバイス、差分転送ありならDeltaDisplay、exportならFrameRecorder）
+    """
+    width, height = config['width'], config['height']
+    if config['backend'] == 'export':
+        # 画面なし: フレームをファイルに書き出す（I²C・luma.oledは不要）
+        return FrameRecorder(config.get('export_path'), width, height, config['frame_delay'])
+
+    from luma.core.interface.serial import i2c
+    from luma.oled.device import ssd1306
+
+    if config['backend'] in ('mock', 'dummy'):
+        serial = RecordingSerial(record=False)
+    else:
+        serial = i2c(port=1, address=config['address'])
+    if config['backend'] == 'dummy':
+        from luma.core.device import dummy
+        device = dummy(width=width, height=height, mode='1', serial_interface=serial)
+    else:
+        device = ssd1306(serial, width=width, height=height)
+    if config['delta']:
+        device = DeltaDisplay(device)
+    device.contrast(255)
+    return device
+
+
+def render_main(name, config, stop):
+    """
+    描画プロセスの本体: 共有メモリのストリップをスクロール表示し続ける
+    新しいストリップはスクロール1周の区切りで切り替えます（通信中も表示中のストリップを流し続ける）
+
+    Args:
+        name (str): 共有メモリの名前
+        config (dict): open_device() の設定に加えて frame_delay, speed, velocity, max_frame_delay
+        stop (multiprocessing.Event): セットされたら画面をクリアして終了
+    """
+    shared = SharedStrip(name)
+    device = open_device(config)
+    width = config['width']
+    packed_device = isinstance(device, DeltaDisplay) or config['backend'] not in ('dummy', 'export')
+    # 書き出し先が FrameRecorder なら待機せず全速で描画する（表示側プロセスで描画する場合と同じ）
+    headless = isinstance(device, FrameRecorder)
+
+    if config['velocity'] > 0:
+        scheduler = AdaptiveFrameScheduler(config['frame_delay'], config['velocity'],
+                                           max_period=config['max_frame_delay'], realtime=not headless)
+    else:
+        scheduler = FrameScheduler(config['frame_delay'], realtime=not headless)
+
+    shown = 0
+    pages = None
+    image = None  # 画像で受け取るデバイス用のストリップ画像（切り替え時に一度だけ作成）
+    text_width = 0
+    x = width
+    loops = 0
+    try:
+        while not stop.is_set():
+            if pages is None or x == width:
+                # 1周の区切り（または最初）: 新しいストリップが登録されていれば切り替え
+                if shared.sequence != shown:
+                    latest = shared.read()
+                    if latest is not None:
+                        shown, pages, text_width = latest
+                        image = None if packed_device else pages.to_image()
+                        shared.write_status(shown, loops, scheduler)
+                if pages is None:
+                    stop.wait(0.05)
+                    scheduler.start()
+                    continue
+
+            if isinstance(device, DeltaDisplay):
+                device.display_pages(pages.window(width - x, width))
+            elif packed_device:
+                send_pages(device, pages.window(width - x, width), getattr(device, '_colstart', 0))
+            else:
+                device.display(image.crop((width - x, 0, width * 2 - x, config['height'])))
+
+            x -= scheduler.advance(config['speed'])
+            if x + text_width < 0:
+                x = width
+                loops += 1
+                shared.write_status(shown, loops, scheduler)
+    except KeyboardInterrupt:
+        pass  # Ctrl+Cは表示側プロセスが処理する（stopで終了を指示される）
+    finally:
+        shared.write_status(shown, loops, scheduler)
+        device.clear()
+        if headless:
+            device.close()  # GIFはここで保存
+        shared.close()
+
+
+class RenderProcess:
+    """
+    描画プロセスの起動・ストリップの受け渡し・停止をまとめたクラス（表示側プロセスで使う）
+    """
+
+    def __init__(self, config, size=RENDER_SHM_BYTES):
+        """
+        共有メモリを作成し、描画プロセスを起動
+
+        Args:
+            config (dict): render_main() に渡す設定
+            size (int): 共有メモリの大きさ（バイト）
+        """
+        # 親プロセスのスレッド・I²Cの状態を引き継がないよう、新しいインタプリタで起動する
+        context = multiprocessing.get_context('spawn')
+        self.shared = SharedStrip(size=size)
+        self._stop = context.Event()
+        self.process = context.Process(target=render_main, name="oled-render",
+                                       args=(self.shared.name, config, self._stop), daemon=True)
+        self.process.start()
+        self.published = 0
+
+    def publish(self, packed, text_width):
+        """
+        次に表示するストリップを登録（描画プロセスはスクロール1周の区切りで切り替える）
+
+        Args:
+            packed (PackedStrip): ページ形式のストリップ（TiledStrip も可）
+            text_width (int): テキスト幅
+
+        Returns:
+            int: 登録したストリップの番号
+        """
+        self.published = self.shared.publish(packed, text_width)
+        return self.published
+
+    def wait_shown(self, sequence, stop=None, timeout=None):
+        """
+        描画プロセスが指定した番号のストリップを表示し始めるまで待つ
+
+        Args:
+            sequence (int): publish() が返した番号
+            stop (threading.Event): セットされたら待つのをやめる
+            timeout (float): 最大待ち時間（秒、Noneで無制限）
+
+        Returns:
+            bool: 表示が始まった場合True
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.shared.status()['shown'] < sequence:
+            if not self.process.is_alive() or (stop is not None and stop.is_set()):
+                return False
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def summary(self):
+        """
+        ログ出力用の描画プロセスのフレーム統計
+
+        Returns:
+            str: 周回数・フレーム数・遅延・最大ジッタの要約
+        """
+        s = self.shared.status()
+        return (f"描画プロセス {s['loops']}周, {s['frames']}フレーム, 遅延 {s['late_frames']}, "
+                f"スキップ {s['skipped_frames']}, 最大ジッタ {s['max_jitter_ms']:.1f}ms")
+
+    def stop(self, timeout=5.0):
+        """
+        描画プロセスを停止して（画面をクリア）、共有メモリを削除
+
+        Args:
+            timeout (float): 終了を待つ最大時間（秒、過ぎたら強制終了）
+        """
+        self._stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.shared.close(unlink=True)
+
+
+class JitterProbe:
+    """
+    一定間隔で眠って起きるまでの遅れを測るスレッド
+    表示側プロセスで動かすと、通信やJSON解析によるGILの取り合いでどれだけ遅れるかがわかります
+    （描画プロセスのジッタと比べて、フレームループが影響を受けていないことを確認する）
+    """
+
+    def __init__(self, period=0.05):
+        """
+        計測スレッドの初期化と開始
+
+        Args:
+            period (float): 眠る間隔（秒、フレーム周期と同じにすると比べやすい）
+        """
+        self.period = period
+        self._lock = threading.Lock()  # 計測スレッドの記録と summary() のリセットが重ならないように
+        self.samples = 0
+        self.max_delay = 0.0
+        self.total_delay = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="jitter-probe", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """眠った時間と実際の経過時間の差を記録"""
+        while not self._stop.is_set():
+            start = time.monotonic()
+            time.sleep(self.period)
+            delay = time.monotonic() - start - self.period
+            with self._lock:
+                self.samples += 1
+                self.total_delay += delay
+                self.max_delay = max(self.max_delay, delay)
+
+    def summary(self):
+        """
+        ログ出力用の遅れの統計（取得後にリセットして、次の区間を測る）
+
+        Returns:
+            str: 平均・最大の遅れの要約
+        """
+        with self._lock:
+            samples, total_delay, max_delay = self.samples, self.total_delay, self.max_delay
+            self.samples = 0
+            self.total_delay = 0.0
+            self.max_delay = 0.0
+        average = total_delay / samples if samples else 0.0
+        return (f"表示側プロセス 平均ジッタ {average * 1000:.1f}ms, 最大ジッタ {max_delay * 1000:.1f}ms"
+                f"（{samples}回）")
+
+    def stop(self):
+        """計測を終了"""
+        self._stop.set()
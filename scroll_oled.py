@@ -10,7 +10,16 @@ import time
 
 from luma.core.interface.serial import i2c
 from luma.oled.device import ssd1306
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
+
+import metrics
+from frame_export import FrameRecorder
+from frame_scheduler import FrameScheduler, AdaptiveFrameScheduler
+from glyph_atlas import GlyphAtlas, BitmapFont, GLYPH_CACHE_BYTES, bitmap_font_path
+from tiled_strip import TiledStrip, TILED_STRIP_THRESHOLD
+from strip_cache import StripCache, strip_key, STRIP_CACHE_PATH, STRIP_CACHE_BYTES
+from oled_pages import (DeltaDisplay, PackedStrip, send_pages,
+                        hardware_scroll_offsets, start_hardware_scroll, HW_SCROLL_DEACTIVATE)
 
 # ========================================
 # 設定定数
@@ -21,12 +30,23 @@ WIDTH = 128
 HEIGHT = 64
 I2C_ADDRESS = 0x3C
 
+# SSD1306 ハードウェアスクロール
+# スクロール間隔（フレーム数）→ コマンドに指定する値（データシートの表）
+HW_SCROLL_INTERVALS = {2: 0b111, 3: 0b100, 4: 0b101, 5: 0b000,
+                       25: 0b110, 64: 0b001, 128: 0b010, 256: 0b011}
+# パネルのフレームレート（luma.oledの初期設定での概算値、個体差あり）
+# ハードウェアスクロールのループ回数ぶんの表示時間を計算するために使う
+HW_PANEL_FPS = 87.6
+
 
 class OLEDScroller:
     """OLED横スクロール表示クラス"""
 
     def __init__(self, font_path=FONT_PATH, font_size=FONT_SIZE,
-                 width=WIDTH, height=HEIGHT, address=I2C_ADDRESS):
+                 width=WIDTH, height=HEIGHT, address=I2C_ADDRESS, delta=True,
+                 serial_interface=None, glyph_cache_bytes=GLYPH_CACHE_BYTES,
+                 bitmap_font=None, device=None, strip_cache=STRIP_CACHE_PATH,
+                 strip_cache_bytes=STRIP_CACHE_BYTES, max_strip_width=TILED_STRIP_THRESHOLD):
         """
         OLEDデバイスとフォントを初期化
 
@@ -36,66 +56,292 @@ class OLEDScroller:
             width (int): 画面幅（128）
             height (int): 画面高さ（64または32）
             address (int): I²Cアドレス（0x3Cまたは0x3D）
+            delta (bool): Trueで変化したページ・列だけを送信（Falseは毎回全画面送信）
+            serial_interface: 使用するシリアルインターフェース（Noneで実機のI²C）
+                              oled_pages.RecordingSerial を渡すと実機なしで送信内容を確認できる
+            glyph_cache_bytes (int): グリフキャッシュの上限バイト数
+            bitmap_font (str): 事前描画済みビットマップフォントのパス
+                               （Noneで「フォント名-サイズ.bmf」を探す。無ければOTFのみ使用）
+            device: 初期化済みのlumaデバイス（Noneで serial_interface にSSD1306を作成）
+                    luma.core.device.dummy を渡すとSSD1306ドライバを通さずに計測できる
+                    frame_export.FrameRecorder を渡すとフレームをファイルに書き出す（待機なし）
+            strip_cache (str): 描画済みストリップの保存先ディレクトリ（Noneで保存しない）
+            strip_cache_bytes (int): ストリップキャッシュの上限バイト数
+            max_strip_width (int): これより幅の広いストリップはタイル分割で描画（メモリ使用量を一定に保つ）
         """
         self.width = width
         self.height = height
+        self.frame_stats = None  # 直近のscroll()のフレーム統計
+        # 同じテキストは再起動後もメモリマップするだけで表示できるよう、ストリップをディスクに保存
+        self.strip_cache = StripCache(strip_cache, strip_cache_bytes) if strip_cache else None
+        self.max_strip_width = max_strip_width
 
         # I²C・デバイス初期化
         try:
-            serial = i2c(port=1, address=address)
-            self.device = ssd1306(serial, width=width, height=height)
+            if device is None:
+                serial = serial_interface or i2c(port=1, address=address)
+                device = ssd1306(serial, width=width, height=height)
+            self.device = device
+            if delta and not isinstance(device, FrameRecorder):
+                # 前回送信した内容と比較して差分だけ転送（テキスト行以外のページは送らない）
+                self.device = DeltaDisplay(self.device)
             self.device.contrast(255)
         except Exception as e:
             print(f"[OLED初期化]エラー: {e}")
             print("ヒント: i2cdetect -y 1 でデバイスを確認")
             sys.exit(1)
 
-        # フォント読み込み
+        # ビットマップフォント読み込み（メモリマップするだけなので一瞬で終わる）
+        bitmap_path = bitmap_font or bitmap_font_path(font_path, font_size)
+        font = None
         try:
-            self.font = ImageFont.truetype(font_path, font_size)
+            font = BitmapFont(bitmap_path)
+            if font.font_size != font_size:
+                print(f"[ビットマップフォント]サイズ不一致のため不使用: {bitmap_path}")
+                font = None
+        except (OSError, ValueError):
+            pass  # 未作成ならOTFのみで描画
+
+        # フォント読み込み（描画済みグリフはアトラスにキャッシュして再利用）
+        # ビットマップフォントがあれば、OTFは収録外の文字が出たときに初めて読み込む
+        self.atlas = GlyphAtlas(font_path, font_size, max_bytes=glyph_cache_bytes,
+                                bitmap_font=font)
+        try:
+            if font is None:
+                self.atlas.font  # OTFを読み込んで存在を確認
         except IOError as e:
             print(f"[フォント読み込み]エラー: {e}")
             print(f"ヒント: {font_path} にフォントを配置")
             sys.exit(1)
 
-    def scroll(self, text, speed=2, delay=0.1, loops=None, y_pos=24):
+    def scroll(self, text, speed=2, delay=0.1, loops=None, y_pos=24, prerender=True, verbose=True,
+               packed=True, velocity=None, max_delay=0.2):
         """
         テキストを右から左へスクロール表示
 
         Args:
             text (str): 表示するテキスト
             speed (int): スクロール速度（ピクセル/フレーム）
-            delay (float): フレーム間隔（秒）
+            delay (float): フレーム周期（秒、描画・転送時間を含む）
             loops (int): ループ回数（Noneで無限）
             y_pos (int): テキストのY座標
+            prerender (bool): Trueでストリップを1回だけ描画して切り出す（Falseは毎フレーム描画）
+            verbose (bool): Falseなら終了時の統計を表示しない（大量のテキストを書き出す場合など）
+            packed (bool): Trueでストリップをページ形式に一括変換し、フレームはそのスライスを直接送信
+                           （prerender=True でSSD1306に送る場合のみ。画像の切り出し・ページ変換を省く）
+            velocity (float): スクロール速度（ピクセル/秒）。指定すると speed の代わりにこの速度を保ち、
+                              負荷に応じてフレーム周期を delay〜max_delay の間で調整する（Noneで固定）
+            max_delay (float): velocity 指定時の最長フレーム周期（秒）
         """
-        # テキスト幅を計算
-        bbox = ImageDraw.Draw(Image.new("1", (1, 1))).textbbox((0, 0), text, font=self.font)
-        text_width = bbox[2] - bbox[0]
+        # ページ形式のまま送れるのはSSD1306（回転なし）と差分転送ラッパーのみ
+        # （FrameRecorder・lumaのダミーデバイスは画像で受け取る）
+        packed = packed and prerender and self._accepts_pages()
+        if prerender:
+            # ストリップを一度だけ用意し、フレームはそこからの切り出しで作る
+            # （保存済みならメモリマップするだけ、無ければキャッシュ済みグリフから組み立てて保存）
+            strip, pages, text_width = self._prepare_strip(text, y_pos, packed)
+        else:
+            # テキスト幅を計算
+            bbox = ImageDraw.Draw(Image.new("1", (1, 1))).textbbox((0, 0), text, font=self.atlas.font)
+            text_width = bbox[2] - bbox[0]
 
         x = self.width
         loop_count = 0
 
+        # フレーム描画時間の計測用（表示転送は含まない）
+        render_total = 0.0
+        render_max = 0.0
+        frames = 0
+
+        # 絶対期限でフレームを刻む（描画・転送時間に関係なく速度を一定に保つ）
+        # 書き出し先が FrameRecorder なら待機せず全速で描画する
+        # velocity 指定時は、重くなったらフレームレートを下げて1フレームの移動量を増やす
+        realtime = not isinstance(self.device, FrameRecorder)
+        if velocity:
+            scheduler = AdaptiveFrameScheduler(delay, velocity, max_period=max_delay, realtime=realtime)
+        else:
+            scheduler = FrameScheduler(delay, realtime=realtime)
+        if isinstance(self.device, DeltaDisplay):
+            self.device.reset_stats()
+
         try:
             while True:
                 # 画像作成・描画
-                image = Image.new("1", (self.width, self.height))
-                ImageDraw.Draw(image).text((x, y_pos), text, font=self.font, fill=255)
-                self.device.display(image)
+                render_start = time.perf_counter()
+                if packed:
+                    # ページ形式のストリップからスライスするだけ（コピー・変換なし）
+                    rows = pages.window(self.width - x, self.width)
+                elif prerender:
+                    offset = self.width - x
+                    image = strip.crop((offset, 0, offset + self.width, self.height))
+                else:
+                    image = Image.new("1", (self.width, self.height))
+                    ImageDraw.Draw(image).text((x, y_pos), text, font=self.atlas.font, fill=255)
+                render_time = time.perf_counter() - render_start
+                render_total += render_time
+                render_max = max(render_max, render_time)
+                frames += 1
+                metrics.FRAME_RENDER_SECONDS.observe(render_time)
+
+                display_start = time.perf_counter()
+                if not packed:
+                    self.device.display(image)
+                elif isinstance(self.device, DeltaDisplay):
+                    self.device.display_pages(rows)
+                else:
+                    send_pages(self.device, rows, getattr(self.device, '_colstart', 0))
+                metrics.FRAME_DISPLAY_SECONDS.observe(time.perf_counter() - display_start)
 
-                # 位置更新
-                x -= speed
+                # 次フレームの期限まで待機して位置更新（遅れた場合は飛ばしたフレーム分まとめて進める）
+                x -= scheduler.advance(speed)
                 if x + text_width < 0:
                     x = self.width
                     loop_count += 1
                     if loops is not None and loop_count >= loops:
                         break
 
-                time.sleep(delay)
-
         except KeyboardInterrupt:
             self.device.clear()
 
+        self.frame_stats = scheduler.stats()
+        metrics.observe_scroll(scheduler)
+        if not verbose:
+            return
+        print(f"[フレーム統計] {scheduler.summary()}")
+        if velocity:
+            for decision in scheduler.decision_log():
+                print(f"[速度調整] {decision}")
+        if isinstance(self.device, DeltaDisplay):
+            print(f"[転送量] {self.device.summary()}")
+        if isinstance(self.device, FrameRecorder):
+            print(f"[書き出し] {self.device.summary()}")
+
+        # 1フレームあたりの描画時間を報告（prerender=True/Falseで比較可能）
+        if frames:
+            mode = "ページ形式スライス" if packed else "ストリップ切り出し" if prerender else "毎フレーム描画"
+            print(f"[描画時間] {mode}: 平均 {render_total / frames * 1000:.3f}ms, "
+                  f"最大 {render_max * 1000:.3f}ms（{frames}フレーム）")
+        print(f"[グリフ] {self.atlas.summary()}")
+        if self.strip_cache is not None:
+            print(f"[ストリップ] {self.strip_cache.summary()}")
+        if prerender and isinstance(strip, TiledStrip):
+            print(f"[ストリップ] {strip.summary()}")
+
+    def _prepare_strip(self, text, y_pos, packed):
+        """
+        スクロール用ストリップを用意（ストリップキャッシュにあればFreeType・グリフの処理なし）
+
+        Args:
+            text (str): 表示するテキスト
+            y_pos (int): テキストのY座標
+            packed (bool): Trueならページ形式、Falseなら画像のストリップを使う
+
+        Returns:
+            tuple: (ストリップ画像 または None, PackedStrip または None, テキスト幅)
+                   長いテキストは両方とも同じ TiledStrip（必要な部分だけ描画）
+        """
+        key = None
+        if self.strip_cache is not None:
+            key = strip_key(text, self.atlas.font_path, self.atlas.font_size,
+                            self.width, self.height, y_pos)
+            cached = self.strip_cache.get(key)
+            if cached is not None:
+                pages, text_width = cached
+                if packed:
+                    return None, pages, text_width
+                return pages.to_image(), None, text_width
+
+        layout = self.atlas.layout(text)
+        if self.width * 2 + layout[1] > self.max_strip_width:
+            # 全幅のストリップは確保せず、表示位置の周辺だけタイルに描画（キャッシュにも保存しない）
+            tiled = TiledStrip(self.atlas, text, self.width, self.height, y_pos, layout=layout)
+            return tiled, tiled if packed else None, tiled.text_width
+
+        strip, text_width = self.atlas.render_strip(text, self.width, self.height, y_pos, layout=layout)
+        pages = PackedStrip(strip) if packed or key else None
+        if key:
+            self.strip_cache.put(key, pages, text_width)
+        return strip, pages if packed else None, text_width
+
+    def _accepts_pages(self):
+        """
+        表示先がページ形式のバイト列をそのまま受け取れるか
+
+        Returns:
+            bool: SSD1306（回転なし）または差分転送ラッパーならTrue
+        """
+        if isinstance(self.device, DeltaDisplay):
+            # 差分転送ラッパーは元のデバイスの command()・data() で送るので、回転がなければよい
+            return getattr(self.device.device, 'rotate', 0) == 0
+        return isinstance(self.device, ssd1306) and self.device.rotate == 0
+
+    def hardware_scroll(self, text, loops=None, y_pos=24, interval_frames=2,
+                        panel_fps=HW_PANEL_FPS):
+        """
+        SSD1306内蔵のスクロール機能でテキストを右から左へスクロール表示
+
+        画面幅ぶんのテキストをGDDRAMに書き込み、あとはパネル自身が1列ずつ左へ送る
+        （左端から出た列は右端に戻る）。CPUとI²Cの負荷はほぼゼロ。
+        データシートはスクロール中のGDDRAMへのアクセスを禁止しているため、現れる列を
+        スクロール中に書き足すことはできない。画面幅を超えるテキストは画面幅ごとの区間に分け、
+        区間ごとに「停止→書き込み→開始」して1周ずつ流す（書き込みは1周に1回だけ）
+
+        Args:
+            text (str): 表示するテキスト
+            loops (int): ループ回数（Noneで無限。1ループ = 全区間を1周ずつ）
+            y_pos (int): テキストのY座標
+            interval_frames (int): 1列スクロールする間隔（パネルのフレーム数: 2,3,4,5,25,64,128,256）
+            panel_fps (float): パネルのフレームレート（1周の表示時間の計算に使用）
+        """
+        if interval_frames not in HW_SCROLL_INTERVALS:
+            raise ValueError(f"interval_frames は {sorted(HW_SCROLL_INTERVALS)} のいずれか")
+
+        width = self.width
+        strip, text_width = self.atlas.render_strip(text, width, self.height, y_pos)
+        # テキストが載っているページだけを書き込み・スクロール対象にする
+        bbox = strip.getbbox()
+        if bbox is None:
+            return
+        page_start = bbox[1] // 8
+        page_end = (bbox[3] - 1) // 8
+        interval = HW_SCROLL_INTERVALS[interval_frames]
+        step_rate = panel_fps / interval_frames  # 1秒あたりのスクロール列数
+        rotation = width / step_rate              # 画面幅ぶん（1周）流れる時間
+        packed = PackedStrip(strip)
+        offsets = hardware_scroll_offsets(text_width, width)
+        colstart = getattr(self.device, '_colstart', 0)
+        sent = 0
+
+        def show(offset):
+            rows = packed.window(offset, width)[page_start:page_end + 1]
+            return start_hardware_scroll(self.device, rows, page_start, interval, colstart)
+
+        self.device.command(HW_SCROLL_DEACTIVATE)
+        self.device.clear()  # テキストのページ以外を消しておく
+        try:
+            if len(offsets) == 1:
+                # 画面幅に収まるテキストは1回書き込めば、あとはパネルが回し続ける
+                sent += show(offsets[0])
+                if loops is None:
+                    while True:
+                        time.sleep(3600)
+                time.sleep(loops * rotation)
+            else:
+                count = 0
+                while loops is None or count < loops:
+                    for offset in offsets:
+                        sent += show(offset)
+                        time.sleep(rotation)  # 1周するまでGDDRAMに触れず待つ
+                    count += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.device.command(HW_SCROLL_DEACTIVATE)
+            self.device.clear()  # 停止後はGDDRAMの書き直しが必要
+
+        print(f"[ハードウェアスクロール] {len(offsets)}区間, 送信 {sent}バイト, "
+              f"速度 {step_rate:.1f}px/秒")
+
     def clear(self):
         """画面をクリア"""
         self.device.clear()
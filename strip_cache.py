@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+ストリップキャッシュライブラリ
+描画済みのスクロール用ストリップをSSD1306のページ形式でディスクに保存し、
+再起動後もメモリマップするだけで（FreeTypeの描画なしで）最初のフレームを表示できるようにする
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+from oled_pages import PackedStrip
+
+# 既定の保存先と上限
+STRIP_CACHE_PATH = "./.cache/strips"
+STRIP_CACHE_BYTES = 4 * 1024 * 1024  # 128×64で数百文字のテキストなら1件10〜20KiB程度
+
+# ストリップファイルの形式（リトルエンディアン）
+#   ヘッダー: マジック(8) ストリップ幅(u32) 高さ(u16) 予約(u16) テキスト幅(u32)
+#   データ: ページ形式のバイト列（ページ0の全列, ページ1の全列, ...）
+STRIP_MAGIC = b"OLEDSTR1"
+STRIP_HEADER = struct.Struct("<8sIHHI")
+STRIP_SUFFIX = ".strip"
+
+
+def strip_key(text, font_path, font_size, width, height, y_pos):
+    """
+    ストリップのキャッシュキーを作成
+
+    Args:
+        text (str): 表示するテキスト
+        font_path (str): フォントファイルのパス
+        font_size (int): フォントサイズ
+        width (int): 画面幅
+        height (int): 画面高さ
+        y_pos (int): テキストのY座標
+
+    Returns:
+        str: SHA-256の16進文字列（ファイル名に使う）
+    """
+    source = "\0".join([text, os.path.basename(font_path), str(font_size),
+                        f"{width}x{height}", str(y_pos)])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class StripCache:
+    """
+    ページ形式のストリップを1件1ファイルで保存するディスクキャッシュ
+    合計サイズが上限を超えたら、最も長く使われていない（更新時刻が古い）ファイルから削除します
+    """
+
+    def __init__(self, path=STRIP_CACHE_PATH, max_bytes=STRIP_CACHE_BYTES):
+        """
+        ストリップキャッシュの初期化
+
+        Args:
+            path (str): 保存先ディレクトリ（無ければ保存時に作成）
+            max_bytes (int): 保存するファイルの合計サイズの上限（0でキャッシュを使わない）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _file(self, key):
+        """キーに対応するファイルのパス"""
+        return os.path.join(self.path, key + STRIP_SUFFIX)
+
+    def get(self, key):
+        """
+        保存済みのストリップをメモリマップで取得
+
+        Args:
+            key (str): strip_key() で作成したキー
+
+        Returns:
+            tuple: (PackedStrip, テキスト幅)（保存されていない・壊れている場合はNone）
+        """
+        if self.max_bytes <= 0:
+            return None
+        path = self._file(key)
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, width, height, _, text_width = STRIP_HEADER.unpack_from(data, 0)
+            if magic != STRIP_MAGIC or len(data) != STRIP_HEADER.size + width * (height // 8):
+                raise ValueError(f"ストリップファイルの形式が不正です: {path}")
+            os.utime(path)  # 使用したので更新時刻を新しくする（LRUの順序）
+        except (OSError, ValueError, struct.error):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        pages = memoryview(data)[STRIP_HEADER.size:]
+        return PackedStrip.from_pages(pages, width, height), text_width
+
+    def put(self, key, packed, text_width):
+        """
+        ストリップを保存（上限を超えたら古いものから削除）
+
+        Args:
+            key (str): strip_key() で作成したキー
+            packed (PackedStrip): ページ形式のストリップ
+            text_width (int): テキスト幅
+        """
+        if self.max_bytes <= 0:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            path = self._file(key)
+            # 一時ファイルに書いてから置き換え（書き込み途中のファイルを読ませない）
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(STRIP_HEADER.pack(STRIP_MAGIC, packed.width, packed.height, 0, text_width))
+                f.write(packed.buffer)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError:
+            pass  # 保存できなくても表示は続ける（次回また描画するだけ）
+
+    def _evict(self):
+        """合計サイズが上限以下になるまで、更新時刻の古いファイルから削除"""
+        files = []
+        total = 0
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(STRIP_SUFFIX):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        # 最新の1件（今保存したもの）は残す
+        files.sort()
+        for _, size, path in files[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)  # メモリマップ中のファイルも削除できる（閉じるまで内容は残る）
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def summary(self):
+        """
+        ログ出力用のキャッシュ統計を作成
+
+        Returns:
+            str: ヒット数・ミス数・削除数の要約
+        """
+        return (f"ストリップキャッシュ ヒット {self.hits}, ミス {self.misses}, "
+                f"削除 {self.evictions}（上限 {self.max_bytes / 1024:.0f}KiB）")
@@ -0,0 +1,45 @@
+"""
+テスト共通の設定
+リポジトリ直下のモジュールを読み込めるようにし、時刻を手動で進める時計を用意する
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """
+    time モジュールの代わりに差し込む時計（sleep() は待たずに時刻を進めるだけ）
+    monotonic()・time()・perf_counter() はすべて同じ時刻を返す
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []  # sleep() に渡された秒数
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += max(seconds, 0.0)
+
+    def advance(self, seconds):
+        """処理にかかった時間のぶん時刻を進める"""
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_clock():
+    """時刻0から始まる手動の時計（各テストで monkeypatch.setattr(モジュール, 'time', fake_clock)）"""
+    return FakeClock()
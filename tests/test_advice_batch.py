@@ -0,0 +1,72 @@
+"""
+advice_batch のテスト（一括生成の応答の検証）
+"""
+
+import json
+
+from advice_batch import (ADVICE_MAX_CHARS, BATCH_BASE_TOKENS, BATCH_TOKENS_PER_CITY,
+                          batch_max_tokens, build_batch_prompt, parse_batch_advice)
+
+
+def response(*items):
+    return json.dumps({'advice': [{'id': number, 'advice': advice} for number, advice in items]},
+                      ensure_ascii=False)
+
+
+def test_parse_valid_response():
+    content = response((1, "薄手の上着を"), (2, " 傘を忘れずに "))
+    assert parse_batch_advice(content, 2) == {0: "薄手の上着を", 1: "傘を忘れずに"}
+
+
+def test_parse_keeps_valid_cities_only():
+    content = response((1, "薄手の上着を"), (3, "範囲外"), (2, "あ" * (ADVICE_MAX_CHARS + 1)))
+    # 範囲外の番号・長すぎるアドバイスの都市は含めない（呼び出し側で個別に生成し直す）
+    assert parse_batch_advice(content, 2) == {0: "薄手の上着を"}
+
+
+def test_parse_rejects_wrong_types():
+    content = json.dumps({'advice': [
+        {'id': "1", 'advice': "文字列の番号"},
+        {'id': 2, 'advice': 5},
+        {'id': 3, 'advice': "   "},
+        "項目ではない",
+        {'id': 4, 'advice': "正しい"},
+    ]}, ensure_ascii=False)
+    assert parse_batch_advice(content, 4) == {3: "正しい"}
+
+
+def test_parse_drops_duplicated_ids():
+    content = response((1, "上着を"), (1, "半袖で"), (2, "傘を"))
+    assert parse_batch_advice(content, 2) == {1: "傘を"}
+
+
+def test_parse_invalid_documents():
+    assert parse_batch_advice("not json", 1) == {}
+    assert parse_batch_advice(None, 1) == {}
+    assert parse_batch_advice(json.dumps({'answers': []}), 1) == {}
+    assert parse_batch_advice(json.dumps({'advice': "上着を"}), 1) == {}
+    assert parse_batch_advice(json.dumps([1, 2]), 1) == {}
+
+
+def test_parse_respects_max_chars():
+    content = response((1, "あ" * 10))
+    assert parse_batch_advice(content, 1, max_chars=10) == {0: "あ" * 10}
+    assert parse_batch_advice(content, 1, max_chars=9) == {}
+
+
+def test_batch_prompt_numbers_cities():
+    weather_list = [
+        {'name': 'Tokyo', 'main': {'temp': 18.3, 'feels_like': 16.9, 'humidity': 72},
+         'weather': [{'description': '曇りがち'}]},
+        {'name': 'Sapporo', 'main': {'temp': 4.0, 'feels_like': 1.2, 'humidity': 60},
+         'weather': [{'description': '雪'}]},
+    ]
+    prompt = build_batch_prompt(weather_list)
+    assert "[1] Tokyo: 気温 18.3°C" in prompt
+    assert "[2] Sapporo: 気温 4.0°C, 体感温度 1.2°C, 湿度 60%, 天気 雪" in prompt
+    assert f"{ADVICE_MAX_CHARS}文字以内" in prompt
+
+
+def test_batch_max_tokens_grows_per_city():
+    assert batch_max_tokens(1) == BATCH_BASE_TOKENS
+    assert batch_max_tokens(3) == BATCH_BASE_TOKENS + 2 * BATCH_TOKENS_PER_CITY
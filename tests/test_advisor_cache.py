@@ -0,0 +1,277 @@
+"""
+advisor_cache のテスト（天気キャッシュの有効期限・期限切れデータの再利用、アドバイスキャッシュのキー・有効期限・LRU）
+time を手動の時計に差し替えて有効期限を進める
+"""
+
+import os
+import threading
+
+import pytest
+
+import advisor_cache
+from advisor_cache import AdviceCache, JsonFileStore, WeatherCache
+
+TOKYO = {'name': 'Tokyo', 'main': {'temp': 18.3, 'feels_like': 16.9, 'humidity': 72},
+         'weather': [{'id': 803, 'description': '曇りがち'}]}
+
+
+@pytest.fixture
+def clock(monkeypatch, fake_clock):
+    fake_clock.now = 1_700_000_000.0
+    monkeypatch.setattr(advisor_cache, 'time', fake_clock)
+    return fake_clock
+
+
+class Fetcher:
+    """呼ばれた回数を数え、指定した結果を順に返す取得関数"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def test_weather_key_normalizes_city():
+    assert WeatherCache.make_key("  Tokyo ", "metric") == "tokyo|metric"
+
+
+def test_weather_fresh_hit_skips_fetch(tmp_path, clock):
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=600, stale_ttl=3600)
+    fetch = Fetcher(TOKYO)
+    assert cache.get("Tokyo", "metric", fetch) == TOKYO
+
+    clock.advance(599)
+    assert cache.get("Tokyo", "metric", fetch) == TOKYO
+    assert fetch.calls == 1
+    assert (cache.hits, cache.misses, cache.stale) == (1, 1, 0)
+
+
+def test_weather_stale_returns_old_data_and_revalidates(tmp_path, clock):
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=600, stale_ttl=3600)
+    newer = dict(TOKYO, main=dict(TOKYO['main'], temp=21.0))
+    fetch = Fetcher(TOKYO, newer)
+    cache.get("Tokyo", "metric", fetch)
+
+    clock.advance(700)
+    assert cache.get("Tokyo", "metric", fetch) == TOKYO   # 古いデータをすぐ返す
+    cache.wait()                                            # 裏の取り直しが終わるまで待つ
+    assert fetch.calls == 2
+    assert cache.stale == 1
+
+    # 取り直したデータは新鮮なものとして返る
+    assert cache.get("Tokyo", "metric", fetch) == newer
+    assert cache.hits == 1
+
+
+def test_weather_too_old_fetches_inline(tmp_path, clock):
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=600, stale_ttl=3600)
+    fetch = Fetcher(TOKYO, None)
+    cache.get("Tokyo", "metric", fetch)
+
+    clock.advance(600 + 3600)
+    assert cache.get("Tokyo", "metric", fetch) is None    # 取得失敗は保存しない
+    assert fetch.calls == 2
+    assert cache.misses == 2
+
+    # 失敗しても最後に取得できたデータと経過秒数は残っている
+    data, age = cache.last_good("Tokyo", "metric")
+    assert data == TOKYO
+    assert age == pytest.approx(4200)
+
+
+def test_weather_ttl_zero_disables_cache(tmp_path, clock):
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=0)
+    fetch = Fetcher(TOKYO, TOKYO)
+    cache.get("Tokyo", "metric", fetch)
+    cache.get("Tokyo", "metric", fetch)
+    assert fetch.calls == 2
+    assert cache.last_good("Tokyo", "metric") == (None, None)
+
+
+def test_weather_cache_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / "w.json")
+    WeatherCache(path=path).get("Tokyo", "metric", Fetcher(TOKYO))
+
+    restarted = WeatherCache(path=path)
+    fetch = Fetcher()
+    assert restarted.get("Tokyo", "metric", fetch) == TOKYO
+    assert fetch.calls == 0
+
+
+def test_weather_hits_do_not_write_file(tmp_path, clock):
+    path = str(tmp_path / "w.json")
+    cache = WeatherCache(path=path)
+    cache.get("Tokyo", "metric", Fetcher(TOKYO))
+    written = os.stat(path).st_mtime_ns
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    for _ in range(3):
+        cache.get("Tokyo", "metric", Fetcher())
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert os.stat(path).st_mtime_ns == written
+    # 累計はまだ保存していない増分も含めて数え、flush() で1回だけ書き込む
+    assert cache.store.stats() == {'misses': 1, 'hits': 3}
+    cache.store.flush()
+    assert JsonFileStore(path).stats() == {'misses': 1, 'hits': 3}
+    assert "累計 ヒット 3" in WeatherCache(path=path).summary()
+
+
+def test_store_updates_from_two_stores_are_not_lost(tmp_path):
+    # 別々のストア（別プロセスと同じ扱い、スレッドのロックは共有しない）から同時に更新しても消えない
+    path = str(tmp_path / "s.json")
+    stores = [JsonFileStore(path), JsonFileStore(path)]
+
+    def add(data):
+        data['count'] = data.get('count', 0) + 1
+
+    def worker(store):
+        for _ in range(50):
+            store.update(add)
+
+    threads = [threading.Thread(target=worker, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert JsonFileStore(path).load()['count'] == 100
+
+
+def weather(temp, feels_like, humidity, description='曇りがち', name='Tokyo'):
+    return {'name': name, 'main': {'temp': temp, 'feels_like': feels_like, 'humidity': humidity},
+            'weather': [{'id': 803, 'description': description}]}
+
+
+class Generator:
+    """呼ばれた天気データを記録し、指定したアドバイスを返す生成関数"""
+
+    def __init__(self, advice="薄手の上着を"):
+        self.advice = advice
+        self.calls = []
+
+    def __call__(self, weather_data):
+        self.calls.append(weather_data)
+        return self.advice
+
+
+def test_advice_key_quantizes_conditions(tmp_path):
+    cache = AdviceCache(path=str(tmp_path / "a.json"))
+    assert cache.make_key(weather(18.3, 16.9, 72)) == "t18|f16|h70|曇りがち"
+    # 同じ幅に入る天気は同じキー、境界を越えたら別のキー
+    assert cache.make_key(weather(19.9, 17.5, 79)) == cache.make_key(weather(18.0, 16.0, 70))
+    assert cache.make_key(weather(20.0, 16.9, 72)) != cache.make_key(weather(19.9, 16.9, 72))
+    assert cache.make_key(weather(-0.5, -3.1, 40)) == "t-2|f-4|h40|曇りがち"
+    assert cache.make_key(weather(18.3, 16.9, 72, '小雨')) != cache.make_key(weather(18.3, 16.9, 72))
+
+
+def test_advice_get_generates_once(tmp_path, clock):
+    cache = AdviceCache(path=str(tmp_path / "a.json"))
+    generate = Generator()
+    assert cache.get(weather(18.3, 16.9, 72), generate) == "薄手の上着を"
+    assert cache.get(weather(18.9, 17.2, 75), generate) == "薄手の上着を"
+    assert len(generate.calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_advice_failed_generation_is_not_stored(tmp_path, clock):
+    cache = AdviceCache(path=str(tmp_path / "a.json"))
+    assert cache.get(weather(18.3, 16.9, 72), Generator(None)) is None
+    assert cache.last_good(weather(18.3, 16.9, 72)) is None
+    generate = Generator()
+    assert cache.get(weather(18.3, 16.9, 72), generate) == "薄手の上着を"
+    assert len(generate.calls) == 1
+
+
+def test_advice_expires_after_ttl(tmp_path, clock):
+    cache = AdviceCache(path=str(tmp_path / "a.json"), ttl=100)
+    generate = Generator()
+    cache.get(weather(18.3, 16.9, 72), generate)
+    clock.advance(99)
+    cache.get(weather(18.3, 16.9, 72), generate)
+    assert len(generate.calls) == 1
+    clock.advance(1)
+    assert cache.lookup(weather(18.3, 16.9, 72)) is None
+
+    # 期限切れでも、その都市の最後のアドバイスは代用の表示に使える
+    assert cache.last_good(weather(25.0, 25.0, 50)) == "薄手の上着を"
+    assert cache.last_good(weather(18.3, 16.9, 72, name='Osaka')) is None
+
+
+def test_advice_evicts_least_recently_used(tmp_path, clock):
+    cache = AdviceCache(path=str(tmp_path / "a.json"), max_entries=2)
+    cold, mild, warm = weather(4, 2, 50), weather(18, 18, 50), weather(28, 30, 50)
+    cache.get(cold, Generator("コートを"))
+    clock.advance(1)
+    cache.get(mild, Generator("上着を"))
+    clock.advance(1)
+    assert cache.get(cold, Generator()) == "コートを"  # cold を最近使ったことにする
+    clock.advance(1)
+    cache.get(warm, Generator("半袖で"))              # 上限超過: 最も長く使われていない mild を削除
+
+    generate = Generator("上着を")
+    assert cache.get(cold, generate) == "コートを"
+    assert cache.get(warm, generate) == "半袖で"
+    assert cache.get(mild, generate) == "上着を"
+    assert len(generate.calls) == 1
+
+
+def test_advice_hit_defers_lru_touch_until_flush(tmp_path, clock):
+    path = str(tmp_path / "a.json")
+    cache = AdviceCache(path=path, max_entries=2)
+    cold, mild = weather(4, 2, 50), weather(18, 18, 50)
+    cache.store_advice(cold, "コートを")
+    clock.advance(1)
+    cache.store_advice(mild, "上着を")
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    clock.advance(1)
+    assert cache.lookup(cold) == "コートを"
+    with open(path, 'rb') as f:
+        assert f.read() == before  # ヒットでは書き込まない
+    assert cache.store.stats() == {'hits': 1}
+
+    cache.store.flush()
+    saved = JsonFileStore(path).load()
+    assert saved['entries'][cache.make_key(cold)]['used_at'] == clock.now
+    assert saved['stats'] == {'hits': 1}
+
+
+def test_advice_ttl_zero_disables_cache(tmp_path, clock):
+    cache = AdviceCache(path=str(tmp_path / "a.json"), ttl=0)
+    generate = Generator()
+    for _ in range(2):
+        cache.get(weather(18.3, 16.9, 72), generate)
+    assert len(generate.calls) == 2
+
+
+def test_advice_lookup_and_store_advice(tmp_path, clock):
+    # 複数都市の一括生成では、探す・保存するを別々に呼ぶ
+    cache = AdviceCache(path=str(tmp_path / "a.json"))
+    assert cache.lookup(weather(18.3, 16.9, 72)) is None
+    cache.store_advice(weather(18.3, 16.9, 72), None)   # 生成失敗は保存しない
+    assert cache.lookup(weather(18.3, 16.9, 72)) is None
+
+    cache.store_advice(weather(18.3, 16.9, 72), "薄手の上着を")
+    assert cache.lookup(weather(18.9, 17.2, 75)) == "薄手の上着を"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_advice_key_includes_profile_variant(tmp_path, clock):
+    from advice_profiles import advice_options, advice_variant
+
+    path = str(tmp_path / "a.json")
+    standard = AdviceCache(path=path, variant=advice_variant('standard', advice_options('standard')))
+    compact = AdviceCache(path=path, variant=advice_variant('compact', advice_options('compact', 400, 'low')))
+    assert compact.make_key(weather(18.3, 16.9, 72)) == "compact/low/400|t18|f16|h70|曇りがち"
+
+    # プロファイル・推論の深さ・最大トークン数が違えば、同じ天気でも別のアドバイス
+    standard.store_advice(weather(18.3, 16.9, 72), "薄手の上着を")
+    assert compact.lookup(weather(18.3, 16.9, 72)) is None
+    assert standard.lookup(weather(18.3, 16.9, 72)) == "薄手の上着を"
+    longer = AdviceCache(path=path, variant=advice_variant('compact', advice_options('compact', 800, 'low')))
+    assert longer.make_key(weather(18.3, 16.9, 72)) != compact.make_key(weather(18.3, 16.9, 72))
@@ -0,0 +1,129 @@
+"""
+asyncio版のアドバイス生成のテスト（AsyncOpenAI の失敗・タイムアウト時の代用アドバイスと hybrid の裏での生成）
+OpenAIクライアントは決まった応答を返す偽物に差し替える
+"""
+
+import asyncio
+import importlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("dotenv")
+pytest.importorskip("httpx")
+
+from advisor_cache import AdviceCache  # noqa: E402
+from latency_budget import Deadline, hedged_caller  # noqa: E402
+from local_advice import local_advice  # noqa: E402
+
+TOKYO = {'name': 'Tokyo', 'main': {'temp': 18.3, 'feels_like': 16.9, 'humidity': 72},
+         'weather': [{'id': 803, 'description': '曇りがち'}]}
+
+
+@pytest.fixture(scope="module")
+def async_advisor(tmp_path_factory):
+    # フル版の読み込み時にカレントディレクトリへログファイルを作るので、一時ディレクトリで読み込む
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("async"))
+    try:
+        return importlib.import_module("async_advisor")
+    finally:
+        os.chdir(cwd)
+
+
+class FakeAsyncClient:
+    """chat.completions.create() の呼び出しを記録し、用意した応答を返す（例外なら送出、delay秒待つ）"""
+
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.requests = []
+        self.options = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def response(text):
+    usage = SimpleNamespace(total_tokens=30, prompt_tokens=20, completion_tokens=10)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+
+@pytest.fixture
+def make_advisor(async_advisor, tmp_path):
+    full = importlib.import_module("weather_outfit_advisor_full")
+
+    def make(result, engine='llm', delay=0.0, advice_timeout=5.0):
+        advisor = full.WeatherOutfitAdvisor.__new__(full.WeatherOutfitAdvisor)
+        advisor.advice_engine = engine
+        advisor.advice_caller = hedged_caller("advice", failures=3, hedge=False)
+        advisor.advice_cache = AdviceCache(path=str(tmp_path / "advice.json"))
+        advisor.advice_profile = 'standard'
+        advisor.advice_options = {'max_completion_tokens': 1000}
+        advisor.run_budget = 5.0
+
+        wrapper = async_advisor.AsyncWeatherOutfitAdvisor.__new__(async_advisor.AsyncWeatherOutfitAdvisor)
+        wrapper.advisor = advisor
+        wrapper.advice_timeout = advice_timeout
+        wrapper._refining = set()
+        wrapper.client = FakeAsyncClient(result, delay)
+
+        async def get_openai_client():
+            return wrapper.client
+        wrapper.get_openai_client = get_openai_client
+        return wrapper
+    return make
+
+
+def test_generated_advice_is_cached(make_advisor):
+    advisor = make_advisor(response(" 薄手の上着を "))
+    assert asyncio.run(advisor.generate_outfit_advice(TOKYO, Deadline(5.0))) == "薄手の上着を"
+    assert advisor.advisor.advice_cache.lookup(TOKYO) == "薄手の上着を"
+    # 1回の呼び出しは残り時間で打ち切り、ライブラリの自動リトライは使わない
+    options = advisor.client.options[0]
+    assert options['max_retries'] == 0 and 0 < options['timeout'] <= 5.0
+
+
+def test_api_error_falls_back_to_last_good(make_advisor):
+    advisor = make_advisor(ConnectionError("reset"))
+    advisor.advisor.advice_cache.store_advice(dict(TOKYO, main=dict(TOKYO['main'], temp=30.0)),
+                                              "前回のアドバイス")
+    assert asyncio.run(advisor.generate_outfit_advice(TOKYO, Deadline(5.0))) == "前回のアドバイス"
+    assert advisor.advisor.advice_caller.breaker.consecutive == 1
+
+
+def test_api_error_without_history_uses_local_table(make_advisor):
+    advisor = make_advisor(ConnectionError("reset"))
+    assert asyncio.run(advisor.generate_outfit_advice(TOKYO)) == local_advice(TOKYO)
+
+
+def test_timeout_falls_back_to_local_table(make_advisor):
+    advisor = make_advisor(response("間に合わない"), delay=5, advice_timeout=0.05)
+    assert asyncio.run(advisor.generate_outfit_advice(TOKYO, Deadline(5.0))) == local_advice(TOKYO)
+    assert advisor.advisor.advice_cache.lookup(TOKYO) is None
+
+
+def test_hybrid_returns_local_advice_and_refines_in_background(make_advisor):
+    advisor = make_advisor(response("AIのアドバイス"), engine='hybrid')
+
+    async def run():
+        advice = await advisor.generate_outfit_advice(TOKYO)
+        assert len(advisor._refining) == 1
+        await asyncio.gather(*advisor._refining)
+        return advice
+
+    assert asyncio.run(run()) == local_advice(TOKYO)
+    # 裏で生成したアドバイスは次の更新から使う
+    assert advisor.advisor.advice_cache.lookup(TOKYO) == "AIのアドバイス"
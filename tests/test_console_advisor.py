@@ -0,0 +1,101 @@
+"""
+コンソール版のAI生成のテスト（hybrid の裏での生成の持ち時間での打ち切り、プロンプトプロファイル）
+OpenAIクライアントは呼び出しを記録する偽物に差し替える
+"""
+
+import importlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from advice_profiles import advice_messages, advice_options, advice_variant  # noqa: E402
+from advisor_cache import AdviceCache  # noqa: E402
+from latency_budget import Deadline  # noqa: E402
+
+TOKYO = {'name': 'Tokyo', 'main': {'temp': 18.3, 'feels_like': 16.9, 'humidity': 72},
+         'weather': [{'id': 803, 'description': '曇りがち'}]}
+
+
+@pytest.fixture(scope="module")
+def console(tmp_path_factory):
+    # 読み込み時にカレントディレクトリへログファイルを作るので、一時ディレクトリで読み込む
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("console"))
+    try:
+        return importlib.import_module("weather_outfit_advisor_console")
+    finally:
+        os.chdir(cwd)
+
+
+class FakeClient:
+    """chat.completions.create() の呼び出しと with_options() の指定を記録する"""
+
+    def __init__(self, advice="薄手の上着を"):
+        self.advice = advice
+        self.requests = []
+        self.options = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        usage = SimpleNamespace(total_tokens=30, prompt_tokens=20, completion_tokens=10)
+        message = SimpleNamespace(content=self.advice)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+@pytest.fixture
+def advisor(console, tmp_path):
+    advisor = console.WeatherOutfitAdvisorConsole.__new__(console.WeatherOutfitAdvisorConsole)
+    advisor._openai_client = FakeClient()
+    advisor.advice_profile = 'compact'
+    advisor.advice_options = advice_options('compact')
+    advisor.advice_cache = AdviceCache(path=str(tmp_path / "advice.json"),
+                                       variant=advice_variant('compact', advisor.advice_options))
+    advisor.advice_batch = True
+    return advisor
+
+
+def test_refine_is_bounded_by_deadline(advisor):
+    assert advisor._generate_advice([TOKYO], Deadline(5.0)) == ["薄手の上着を"]
+    # 持ち時間の残りをタイムアウトにし、自動リトライはしない
+    options = advisor._openai_client.options[0]
+    assert options['max_retries'] == 0 and 0 < options['timeout'] <= 5.0
+    assert advisor.advice_cache.lookup(TOKYO) == "薄手の上着を"
+
+
+def test_refine_skips_requests_after_deadline(advisor):
+    deadline = Deadline(5.0)
+    deadline.expires_at = deadline.started_at
+    assert advisor._generate_advice([TOKYO], deadline) == [None]
+    assert advisor._openai_client.requests == []
+
+
+def test_without_deadline_has_no_timeout(advisor):
+    advisor._generate_advice([TOKYO])
+    assert advisor._openai_client.options == []
+    assert len(advisor._openai_client.requests) == 1
+
+
+def test_request_uses_profile_prompt_and_options(advisor):
+    advisor._generate_advice([TOKYO])
+    request = advisor._openai_client.requests[0]
+    # フル版と同じプロファイルのプロンプト・パラメータで問い合わせ、キャッシュのキーも同じ
+    assert request['messages'] == advice_messages(TOKYO, 'compact')
+    assert request['max_completion_tokens'] == 400 and request['reasoning_effort'] == 'low'
+    assert advisor.advice_cache.make_key(TOKYO).startswith("compact/low/400|")
+
+
+def test_batch_request_keeps_reasoning_effort(advisor):
+    osaka = dict(TOKYO, name='Osaka')
+    advisor._openai_client.advice = '{"advice": [{"id": 1, "advice": "上着を"}, {"id": 2, "advice": "傘を"}]}'
+    assert advisor._generate_advice([TOKYO, osaka]) == ["上着を", "傘を"]
+    request = advisor._openai_client.requests[0]
+    assert request['reasoning_effort'] == 'low'
+    assert request['max_completion_tokens'] != 400  # 一括生成は都市数に応じた上限
@@ -0,0 +1,94 @@
+"""
+frame_export のテスト（GIF・PNG連番・ページ形式の生データへの書き出し）
+"""
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from frame_export import FrameRecorder, guess_format  # noqa: E402
+from oled_pages import image_to_pages  # noqa: E402
+
+
+def frames(count, width=16, height=16):
+    """1フレームごとに点灯する列がずれていく画像（連続するフレームはすべて異なる）"""
+    images = []
+    for index in range(count):
+        image = Image.new("1", (width, height))
+        for y in range(height):
+            image.putpixel((index % width, y), 1)
+        images.append(image)
+    return images
+
+
+def test_guess_format():
+    assert guess_format("out/scroll.GIF") == 'gif'
+    assert guess_format("scroll.raw") == 'raw'
+    assert guess_format("scroll.bin") == 'raw'
+    assert guess_format("out/frames") == 'png'
+
+
+def test_raw_concatenates_page_buffers(tmp_path):
+    path = tmp_path / "out" / "scroll.raw"
+    recorder = FrameRecorder(str(path), width=16, height=16)
+    images = frames(3)
+    for image in images:
+        recorder.display(image)
+    recorder.close()
+
+    # 実機に送るのと同じページ形式を、ヘッダーなしでフレーム順に連結
+    expected = b"".join(image_to_pages(image) for image in images)
+    assert path.read_bytes() == expected
+    assert recorder.bytes_written == len(expected) == 3 * 16 * 2
+    assert recorder.frames == 3
+
+
+def test_gif_is_written_on_close(tmp_path):
+    path = tmp_path / "scroll.gif"
+    recorder = FrameRecorder(str(path), width=16, height=16, frame_period=0.05)
+    images = frames(3)
+    for image in images:
+        recorder.display(image)
+    assert not path.exists()  # 閉じるまではメモリに保持
+    recorder.close()
+    recorder.close()          # 2回目は何もしない
+
+    with Image.open(path) as gif:
+        assert gif.n_frames == 3
+        assert gif.info['duration'] == 50
+        assert gif.info['loop'] == 0
+        for index, image in enumerate(images):
+            gif.seek(index)
+            assert gif.convert("1").tobytes() == image.tobytes()
+
+
+def test_png_writes_numbered_frames(tmp_path):
+    directory = tmp_path / "frames"
+    recorder = FrameRecorder(str(directory), width=16, height=16)
+    images = frames(2)
+    for image in images:
+        recorder.display(image)
+    recorder.close()
+
+    assert sorted(p.name for p in directory.iterdir()) == ["frame_000000.png", "frame_000001.png"]
+    with Image.open(directory / "frame_000001.png") as png:
+        assert png.convert("1").tobytes() == images[1].tobytes()
+
+
+def test_without_path_only_counts_frames():
+    recorder = FrameRecorder(width=16, height=16)
+    image = frames(1)[0]
+    recorder.display(image)
+    assert recorder.frames == 1
+    assert recorder.image.tobytes() == image.tobytes()
+    recorder.clear()
+    assert recorder.image.getbbox() is None
+    assert recorder.frames == 1  # クリアはフレームとして数えない
+
+
+def test_rejects_wrong_size_and_format(tmp_path):
+    recorder = FrameRecorder(width=16, height=16)
+    with pytest.raises(ValueError):
+        recorder.display(Image.new("1", (32, 16)))
+    with pytest.raises(ValueError):
+        FrameRecorder(str(tmp_path / "x.mp4"), fmt='mp4')
@@ -0,0 +1,132 @@
+"""
+frame_scheduler のテスト（絶対期限での待機・フレームの飛ばし・速度を保つ周期の調整）
+time を手動の時計に差し替え、描画にかかった時間は fake_clock.advance() で表す
+"""
+
+import asyncio
+
+import pytest
+
+import frame_scheduler
+from frame_scheduler import AdaptiveFrameScheduler, FrameScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch, fake_clock):
+    monkeypatch.setattr(frame_scheduler, 'time', fake_clock)
+    return fake_clock
+
+
+def test_wait_sleeps_until_deadline(clock):
+    scheduler = FrameScheduler(0.25)
+    clock.advance(0.125)  # 描画に半周期
+
+    assert scheduler.wait() == 1
+    assert clock.now == pytest.approx(0.25)
+    assert clock.sleeps == [pytest.approx(0.125)]
+    assert scheduler.late_frames == 0
+
+
+def test_deadlines_do_not_drift(clock):
+    scheduler = FrameScheduler(0.25)
+    for _ in range(8):
+        clock.advance(0.1)
+        scheduler.wait()
+    # 処理時間に関係なく、8フレーム目はちょうど 8 × 周期 で始まる
+    assert clock.now == pytest.approx(2.0)
+    assert scheduler.max_jitter == pytest.approx(0.0)
+
+
+def test_late_frame_skips_missed_deadlines(clock):
+    scheduler = FrameScheduler(0.25)
+    scheduler.wait()          # 0.25
+    clock.advance(0.6)        # 0.85: 期限 0.5 と 0.75 を過ぎた
+
+    assert scheduler.wait() == 2
+    assert scheduler.late_frames == 1
+    assert scheduler.skipped_frames == 1
+    assert scheduler.max_jitter == pytest.approx(0.1)
+
+    # 次の期限は 1.0（遅れを引きずらない）
+    assert scheduler.wait() == 1
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_advance_scales_speed_by_steps(clock):
+    scheduler = FrameScheduler(0.25)
+    assert scheduler.advance(2) == 2
+    clock.advance(0.5)
+    assert scheduler.advance(2) == 4
+
+
+def test_non_realtime_never_sleeps(clock):
+    scheduler = FrameScheduler(0.25, realtime=False)
+    clock.advance(10)
+    assert [scheduler.wait() for _ in range(4)] == [1, 1, 1, 1]
+    assert clock.sleeps == []
+    assert scheduler.stats()['frames'] == 4
+    assert scheduler.late_frames == 0
+
+
+def test_advance_async_non_realtime(clock):
+    scheduler = FrameScheduler(0.25, realtime=False)
+
+    async def run():
+        return [await scheduler.advance_async(2) for _ in range(3)]
+
+    assert asyncio.run(run()) == [2, 2, 2]
+    assert clock.sleeps == []
+
+
+def test_stats_reports_fps(clock):
+    scheduler = FrameScheduler(0.25)
+    for _ in range(4):
+        scheduler.wait()
+    stats = scheduler.stats()
+    assert stats['frames'] == 4
+    assert stats['fps'] == pytest.approx(4.0)
+
+
+def test_adaptive_holds_velocity_when_period_grows(clock):
+    scheduler = AdaptiveFrameScheduler(0.25, velocity=8, max_period=1.0, headroom=0.5, smoothing=1.0)
+    assert scheduler.advance(0) == 2          # 軽い: 0.25秒 × 8px/秒
+
+    clock.advance(0.375)                       # 重い: 処理 0.375秒 → 周期 0.75秒
+    assert scheduler.advance(0) == 6           # 0.75秒 × 8px/秒
+    assert scheduler.frame_period == pytest.approx(0.75)
+    assert clock.now == pytest.approx(1.0)     # 1秒で合計8px（速度は一定）
+    assert len(scheduler.decisions) == 1
+    assert scheduler.decision_log() == ["+0.6秒: 4.0fps → 1.3fps（6.0px/フレーム）"]
+
+
+def test_adaptive_period_is_clamped(clock):
+    scheduler = AdaptiveFrameScheduler(0.25, velocity=8, max_period=0.5, headroom=0.5, smoothing=1.0)
+    scheduler.advance(0)
+    clock.advance(2.0)
+    scheduler.advance(0)
+    assert scheduler.frame_period == pytest.approx(0.5)
+
+
+def test_adaptive_returns_to_base_period(clock):
+    scheduler = AdaptiveFrameScheduler(0.25, velocity=8, max_period=1.0, headroom=0.5, smoothing=1.0)
+    scheduler.advance(0)
+    clock.advance(0.375)
+    scheduler.advance(0)
+    clock.advance(0.01)
+    scheduler.advance(0)
+    assert scheduler.frame_period == pytest.approx(0.25)
+    assert len(scheduler.decisions) == 2
+
+
+def test_adaptive_carries_fractional_pixels(clock):
+    scheduler = AdaptiveFrameScheduler(0.25, velocity=3)
+    steps = [scheduler.advance(0) for _ in range(4)]
+    assert steps == [0, 1, 1, 1]               # 0.75px/フレームの端数を繰り越す
+    assert sum(steps) == 3
+
+
+def test_adaptive_non_realtime_keeps_base_period(clock):
+    scheduler = AdaptiveFrameScheduler(0.25, velocity=8, realtime=False)
+    clock.advance(5.0)
+    assert [scheduler.advance(0) for _ in range(3)] == [2, 2, 2]
+    assert scheduler.decisions == []
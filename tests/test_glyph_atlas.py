@@ -0,0 +1,131 @@
+"""
+glyph_atlas のテスト（LRUによるグリフの削除・ストリップの組み立て・ビットマップフォントの書き出しと読み込み）
+フォントファイルが無くても動くよう、FreeTypeフォントの読み込みをPillow内蔵のフォントに差し替える
+"""
+
+import pytest
+
+ImageFont = pytest.importorskip("PIL.ImageFont")
+
+import glyph_atlas  # noqa: E402
+from glyph_atlas import BitmapFont, GlyphAtlas, render_glyph, write_bitmap_font  # noqa: E402
+
+FONT_SIZE = 14
+MISSING_FONT = "/nonexistent/font.otf"
+
+
+@pytest.fixture
+def builtin_font(monkeypatch):
+    font = ImageFont.load_default(size=FONT_SIZE)
+    monkeypatch.setattr(glyph_atlas.ImageFont, 'truetype', lambda path, size: font)
+
+
+@pytest.fixture
+def font():
+    return ImageFont.load_default(size=FONT_SIZE)
+
+
+@pytest.fixture
+def bitmap_font(tmp_path, font):
+    path = str(tmp_path / "test-14.bmf")
+    write_bitmap_font(path, font, "AB ")
+    return BitmapFont(path)
+
+
+def glyph_bytes(*chars):
+    """各文字のグリフが使うバイト数（別のアトラスで測る）"""
+    sizes = []
+    probe = GlyphAtlas("builtin", FONT_SIZE)
+    for char in chars:
+        before = probe.bytes_used
+        probe.glyph(char)
+        sizes.append(probe.bytes_used - before)
+    return sizes
+
+
+def test_atlas_hit_and_miss_counts(builtin_font):
+    atlas = GlyphAtlas("builtin", FONT_SIZE)
+    first = atlas.glyph("A")
+    assert atlas.glyph("A") is first
+    assert (atlas.hits, atlas.misses) == (1, 1)
+
+
+def test_atlas_evicts_least_recently_used(builtin_font):
+    size_a, size_b, size_c = glyph_bytes("A", "B", "C")
+    # 3文字目で上限を超え、2文字ぶんなら収まる上限
+    atlas = GlyphAtlas("builtin", FONT_SIZE, max_bytes=size_a + size_b + size_c - 1)
+    atlas.glyph("A")
+    atlas.glyph("B")
+    atlas.glyph("A")  # A を最近使ったことにする
+    atlas.glyph("C")  # 上限超過: 最も長く使われていない B を削除
+
+    assert atlas.evictions == 1
+    assert atlas.bytes_used == size_a + size_c
+    hits = atlas.hits
+    atlas.glyph("A")
+    atlas.glyph("C")
+    assert atlas.hits == hits + 2
+    misses = atlas.misses
+    atlas.glyph("B")
+    assert atlas.misses == misses + 1
+
+
+def test_atlas_keeps_single_glyph_over_limit(builtin_font):
+    # 上限より大きいグリフでも、1文字だけは保持して描画を続ける
+    atlas = GlyphAtlas("builtin", FONT_SIZE, max_bytes=1)
+    atlas.glyph("A")
+    atlas.glyph("B")
+    assert atlas.evictions == 1
+    atlas.glyph("B")
+    assert atlas.hits == 1
+
+
+def test_atlas_raises_for_missing_font():
+    atlas = GlyphAtlas(MISSING_FONT, FONT_SIZE)
+    with pytest.raises(IOError):
+        atlas.glyph("A")
+
+
+def test_render_strip_adds_screen_width_margins(builtin_font):
+    atlas = GlyphAtlas("builtin", FONT_SIZE)
+    strip, text_width = atlas.render_strip("AB", 32, 16, 0)
+    assert strip.size == (32 + text_width + 32, 16)
+    bbox = strip.getbbox()
+    assert bbox is not None
+    assert 32 <= bbox[0] and bbox[2] <= 32 + text_width
+
+
+def test_bitmap_font_round_trip(tmp_path, font):
+    chars = "AgjQ ."
+    path = str(tmp_path / "round-14.bmf")
+    assert write_bitmap_font(path, font, chars + "A") == len(set(chars))
+
+    loaded = BitmapFont(path)
+    assert len(loaded) == len(set(chars))
+    assert loaded.font_size == FONT_SIZE
+    for char in chars:
+        expected = render_glyph(font, char)
+        glyph = loaded.glyph(char)
+        assert (glyph.left, glyph.top) == (expected.left, expected.top)
+        assert glyph.advance == pytest.approx(expected.advance)
+        if expected.image is None:
+            assert glyph.image is None
+        else:
+            assert glyph.image.size == expected.image.size
+            assert glyph.image.tobytes() == expected.image.tobytes()
+
+
+def test_bitmap_font_missing_char_and_bad_magic(tmp_path, bitmap_font):
+    assert bitmap_font.glyph("Z") is None
+
+    path = tmp_path / "broken.bmf"
+    path.write_bytes(b"NOTAFONT" + bytes(16))
+    with pytest.raises(ValueError):
+        BitmapFont(str(path))
+
+
+def test_atlas_prefers_bitmap_font(bitmap_font):
+    # フォントファイルが無くても、収録済みの文字はビットマップフォントから描画できる
+    atlas = GlyphAtlas(MISSING_FONT, FONT_SIZE, bitmap_font=bitmap_font)
+    assert atlas.glyph("A").image.tobytes() == bitmap_font.glyph("A").image.tobytes()
+    assert (atlas.hits, atlas.misses) == (0, 1)
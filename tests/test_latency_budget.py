@@ -0,0 +1,232 @@
+"""
+latency_budget のテスト（期限・サーキットブレーカー・ヘッジ）
+期限とサーキットブレーカーは手動の時計で進め、ヘッジはイベントで呼び出しの順番を決める
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import latency_budget
+from latency_budget import CircuitBreaker, Deadline, HedgedCaller, LatencyTracker
+
+
+@pytest.fixture
+def clock(monkeypatch, fake_clock):
+    monkeypatch.setattr(latency_budget, 'time', fake_clock)
+    return fake_clock
+
+
+def make_caller(hedge=True, failures=0, initial=0.05):
+    breaker = CircuitBreaker("test", failures=failures, reset_timeout=10) if failures else None
+    return HedgedCaller("test", LatencyTracker("test", initial=initial), breaker, hedge=hedge)
+
+
+def test_deadline_remaining_and_expired(clock):
+    deadline = Deadline(2.0)
+    clock.advance(0.5)
+    assert deadline.remaining() == pytest.approx(1.5)
+    assert not deadline.expired
+    clock.advance(1.5)
+    assert deadline.expired
+    assert deadline.remaining() == 0.0
+    assert deadline.elapsed() == pytest.approx(2.0)
+
+
+def test_deadline_without_budget(clock):
+    deadline = Deadline(0)
+    clock.advance(1e6)
+    assert deadline.remaining() is None
+    assert not deadline.expired
+
+
+def test_tracker_quantile():
+    tracker = LatencyTracker("test", initial=0.7)
+    assert tracker.quantile(0.95) == 0.7
+    for seconds in range(1, 21):
+        tracker.observe(seconds / 10)
+    assert tracker.quantile(0.5) == pytest.approx(1.1)
+    assert tracker.quantile(0.95) == pytest.approx(2.0)
+
+
+def test_breaker_opens_and_recovers(clock):
+    breaker = CircuitBreaker("test", failures=2, reset_timeout=10)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+    clock.advance(10)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()  # half-open で試せるのは同時に1回だけ
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_reopens_after_failed_trial(clock):
+    breaker = CircuitBreaker("test", failures=2, reset_timeout=10)
+    breaker.record(False)
+    breaker.record(False)
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    clock.advance(9)
+    assert not breaker.allow()
+
+
+def test_breaker_disabled_with_zero_failures():
+    breaker = CircuitBreaker("test", failures=0)
+    for _ in range(10):
+        breaker.record(False)
+    assert breaker.state == "closed"
+
+
+def test_call_returns_result_and_records_latency():
+    caller = make_caller()
+    assert caller.call(lambda timeout: "ok") == "ok"
+    assert (caller.calls, caller.hedged, caller.timeouts) == (1, 0, 0)
+    assert len(caller.tracker.samples) == 1
+
+
+def test_call_passes_remaining_budget_as_timeout():
+    caller = make_caller(hedge=False)
+    timeouts = []
+    caller.call(lambda timeout: timeouts.append(timeout) or "ok", Deadline(5.0))
+    assert 0 < timeouts[0] <= 5.0
+    caller.call(lambda timeout: timeouts.append(timeout) or "ok")
+    assert timeouts[1] is None
+
+
+def test_call_hedges_slow_attempt():
+    caller = make_caller(initial=0.05)
+    release = threading.Event()
+    attempts = []
+
+    def func(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            release.wait(5)  # 1本目は返らない
+            return "slow"
+        return "hedge"
+
+    try:
+        assert caller.call(func, Deadline(5.0)) == "hedge"
+    finally:
+        release.set()
+    assert (caller.hedged, caller.hedge_wins) == (1, 1)
+
+
+def test_call_retries_immediate_failure():
+    caller = make_caller(initial=10.0)
+    attempts = []
+
+    def func(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return "second"
+
+    # 1本目がすぐ失敗したら、ヘッジの待ち時間を待たずに2本目を出す
+    assert caller.call(func, Deadline(5.0)) == "second"
+    assert caller.hedged == 1
+
+
+def test_call_gives_up_at_deadline():
+    caller = make_caller(hedge=False, failures=3)
+    release = threading.Event()
+    try:
+        assert caller.call(lambda timeout: release.wait(5) and "late", Deadline(0.05)) is None
+    finally:
+        release.set()
+    assert caller.timeouts == 1
+    assert caller.breaker.consecutive == 1
+
+
+def test_call_expired_deadline_does_not_call(clock):
+    caller = make_caller()
+    deadline = Deadline(1.0)
+    clock.advance(1.0)
+    called = []
+    assert caller.call(lambda timeout: called.append(timeout), deadline) is None
+    assert called == []
+    assert caller.timeouts == 1
+
+
+def test_call_open_breaker_does_not_call():
+    caller = make_caller(hedge=False, failures=2)
+    assert caller.call(lambda timeout: None) is None
+    assert caller.call(lambda timeout: None) is None
+    assert caller.breaker.state == "open"
+
+    called = []
+    assert caller.call(lambda timeout: called.append(timeout) or "ok") is None
+    assert called == []
+    assert caller.rejected == 1
+
+
+def test_admit_and_settle_for_manual_calls(clock):
+    caller = make_caller(failures=1)
+    assert caller.admit(Deadline(1.0))
+    caller.settle(None, timed_out=True)
+    assert caller.timeouts == 1
+    assert caller.breaker.state == "open"
+    assert not caller.admit()
+    assert caller.rejected == 1
+
+    clock.advance(10)
+    assert caller.admit()
+    caller.settle(0.2)
+    assert caller.breaker.state == "closed"
+    assert caller.tracker.samples == [0.2]
+
+
+def test_call_async_hedges_and_cancels_loser():
+    caller = make_caller(initial=0.05)
+    attempts = []
+    cancelled = []
+
+    async def func(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(5)  # 1本目は返らない
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return "hedge"
+
+    assert asyncio.run(caller.call_async(func, Deadline(5.0))) == "hedge"
+    assert (caller.hedged, caller.hedge_wins) == (1, 1)
+    assert cancelled == [True]
+
+
+def test_call_async_gives_up_at_deadline():
+    caller = make_caller(hedge=False, failures=3)
+
+    async def func(timeout):
+        await asyncio.sleep(5)
+        return "late"
+
+    assert asyncio.run(caller.call_async(func, Deadline(0.05))) is None
+    assert caller.timeouts == 1
+    assert caller.breaker.consecutive == 1
+
+
+def test_call_async_retries_immediate_failure():
+    caller = make_caller(initial=10.0)
+    attempts = []
+
+    async def func(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            return None
+        return "second"
+
+    assert asyncio.run(caller.call_async(func, Deadline(5.0))) == "second"
+    assert caller.hedged == 1
@@ -0,0 +1,82 @@
+"""
+local_advice のテスト（気温帯・天気コード・体感温度・湿度の表）
+"""
+
+import pytest
+
+from local_advice import (FEELS_ADVICE, HUMIDITY_ADVICE, TEMP_ADVICE, TEMP_BOUNDS,
+                          local_advice)
+
+
+def weather(temp, feels_like=None, humidity=50, code=803):
+    feels_like = temp if feels_like is None else feels_like
+    return {'main': {'temp': temp, 'feels_like': feels_like, 'humidity': humidity},
+            'weather': [{'id': code, 'description': ''}]}
+
+
+@pytest.mark.parametrize("temp, band", [
+    (-10, 0), (4.9, 0), (5, 1), (9.9, 1), (10, 2), (15, 3), (20, 4), (24.9, 4), (25, 5), (30, 6), (38, 6),
+])
+def test_temperature_bands(temp, band):
+    # 境界ちょうどは上の帯
+    assert local_advice(weather(temp)) == TEMP_ADVICE[band]
+
+
+def test_bounds_and_bands_match():
+    assert len(TEMP_ADVICE) == len(TEMP_BOUNDS) + 1
+
+
+@pytest.mark.parametrize("code, extra", [
+    (211, "雷雨に注意、傘は必須"),
+    (301, "折りたたみ傘があると安心"),
+    (500, "傘を忘れずに"),
+    (502, "大雨、レインコートと防水靴を"),
+    (511, "凍る雨、滑りにくい靴で"),
+    (521, "にわか雨、傘を忘れずに"),
+    (601, "雪、防水で滑りにくい靴を"),
+    (741, "視界が悪いので足元に注意"),
+    (803, None),
+    (0, None),
+])
+def test_condition_codes(code, extra):
+    expected = TEMP_ADVICE[4] + (f"。{extra}" if extra else "")
+    assert local_advice(weather(22, code=code)) == expected
+
+
+def test_clear_sky_only_in_short_sleeve_band():
+    assert local_advice(weather(27, code=800)) == f"{TEMP_ADVICE[5]}。日差し対策も"
+    assert local_advice(weather(22, code=800)) == TEMP_ADVICE[4]
+    assert local_advice(weather(32, code=800)) == TEMP_ADVICE[6]
+
+
+@pytest.mark.parametrize("difference, extra", [
+    (-3.1, FEELS_ADVICE[0]), (-3, None), (2.9, None), (3, FEELS_ADVICE[2]),
+])
+def test_feels_like_difference(difference, extra):
+    expected = TEMP_ADVICE[3] + (f"。{extra}" if extra else "")
+    assert local_advice(weather(17, 17 + difference)) == expected
+
+
+def test_humidity_notes():
+    assert local_advice(weather(22, humidity=30)) == f"{TEMP_ADVICE[4]}。{HUMIDITY_ADVICE[0]}"
+    assert local_advice(weather(22, humidity=31)) == TEMP_ADVICE[4]
+    assert local_advice(weather(22, humidity=80)) == f"{TEMP_ADVICE[4]}。{HUMIDITY_ADVICE[2]}"
+    # 蒸し暑さは気温が低いときは付けない
+    assert local_advice(weather(12, humidity=90)) == TEMP_ADVICE[2]
+
+
+def test_extras_fit_max_chars_in_priority_order():
+    data = weather(2, -3, humidity=20, code=601)
+    full = local_advice(data)
+    assert full == "。".join([TEMP_ADVICE[0], "雪、防水で滑りにくい靴を", FEELS_ADVICE[0], HUMIDITY_ADVICE[0]])
+
+    # 上限に収まらない補足は飛ばし、後の短い補足は入れる
+    limit = len(TEMP_ADVICE[0]) + 1 + len(FEELS_ADVICE[0])
+    assert local_advice(data, max_chars=limit) == f"{TEMP_ADVICE[0]}。{FEELS_ADVICE[0]}"
+    for max_chars in range(len(TEMP_ADVICE[0]), 60):
+        assert len(local_advice(data, max_chars=max_chars)) <= max(max_chars, len(TEMP_ADVICE[0]))
+
+
+def test_missing_weather_block():
+    data = {'main': {'temp': 22, 'feels_like': 22, 'humidity': 50}}
+    assert local_advice(data) == TEMP_ADVICE[4]
@@ -0,0 +1,196 @@
+"""
+oled_pages のテスト（ページ形式への変換・差分転送・ページ形式ストリップ・ハードウェアスクロール）
+"""
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from oled_pages import (DeltaDisplay, HW_SCROLL_ACTIVATE, HW_SCROLL_DEACTIVATE,  # noqa: E402
+                        HW_SCROLL_LEFT, PackedStrip, RecordingSerial, SSD1306_COLUMNADDR,
+                        SSD1306_PAGEADDR, hardware_scroll_offsets, image_to_pages,
+                        start_hardware_scroll)
+
+
+class FakeDevice:
+    """送信したコマンドとデータを記録するだけのSSD1306の代わり"""
+
+    def __init__(self, width=16, height=16):
+        self.width = width
+        self.height = height
+        self.sent = []
+
+    def preprocess(self, image):
+        return image
+
+    def command(self, *cmd):
+        self.sent.append(('command', cmd))
+
+    def data(self, data):
+        self.sent.append(('data', list(data)))
+
+    def clear(self):
+        self.sent.append(('clear', ()))
+
+
+def make_image(width, height, pixels):
+    """指定した座標だけ点灯したモード"1"の画像"""
+    image = Image.new("1", (width, height))
+    for xy in pixels:
+        image.putpixel(xy, 1)
+    return image
+
+
+def test_image_to_pages_bit_order():
+    # 最下位ビットがページの上端、ページ0の全列のあとにページ1の全列が続く
+    image = make_image(4, 16, [(0, 0), (1, 7), (2, 8), (3, 15)])
+    assert image_to_pages(image) == bytes([0x01, 0x80, 0x00, 0x00,
+                                           0x00, 0x00, 0x01, 0x80])
+
+
+def test_image_to_pages_blank_and_full():
+    assert image_to_pages(Image.new("1", (3, 16))) == bytes(6)
+    assert image_to_pages(Image.new("1", (3, 16), 1)) == b"\xff" * 6
+
+
+def test_delta_display_sends_only_dirty_range():
+    device = FakeDevice()
+    display = DeltaDisplay(device)
+
+    # ページ1の列3と列5だけ変化: 列3〜5の範囲を1回だけ送る
+    display.display(make_image(16, 16, [(3, 9), (5, 12)]))
+    assert device.sent == [
+        ('command', (SSD1306_COLUMNADDR, 3, 5, SSD1306_PAGEADDR, 1, 1)),
+        ('data', [0x02, 0x00, 0x10]),
+    ]
+    assert display.bytes_sent == 6 + 3
+    assert display.bytes_full == 6 + 16 * 2
+
+
+def test_delta_display_skips_unchanged_frame():
+    device = FakeDevice()
+    display = DeltaDisplay(device)
+    image = make_image(16, 16, [(0, 0), (15, 15)])
+    display.display(image)
+    device.sent.clear()
+
+    display.display(image)
+    assert device.sent == []
+    assert display.frames == 2
+
+
+def test_delta_display_each_page_has_own_range():
+    device = FakeDevice()
+    display = DeltaDisplay(device)
+    display.display(make_image(16, 16, [(0, 0), (15, 15)]))
+
+    commands = [args for kind, args in device.sent if kind == 'command']
+    assert commands == [
+        (SSD1306_COLUMNADDR, 0, 0, SSD1306_PAGEADDR, 0, 0),
+        (SSD1306_COLUMNADDR, 15, 15, SSD1306_PAGEADDR, 1, 1),
+    ]
+
+
+def test_delta_display_clear_resets_buffer():
+    device = FakeDevice()
+    display = DeltaDisplay(device)
+    image = make_image(16, 16, [(4, 4)])
+    display.display(image)
+    display.clear()
+    device.sent.clear()
+
+    # クリア後は全消灯とみなすので、同じ内容をもう一度送る
+    display.display(image)
+    assert ('command', (SSD1306_COLUMNADDR, 4, 4, SSD1306_PAGEADDR, 0, 0)) in device.sent
+
+
+def test_delta_display_applies_column_offset():
+    device = FakeDevice()
+    device._colstart = 32  # 64x48などのパネル
+    display = DeltaDisplay(device)
+    display.display(make_image(16, 16, [(2, 0)]))
+    assert device.sent[0] == ('command', (SSD1306_COLUMNADDR, 34, 34, SSD1306_PAGEADDR, 0, 0))
+
+
+def test_packed_strip_window_slices_each_page():
+    strip = make_image(40, 16, [(10, 0), (12, 15), (30, 8)])
+    packed = PackedStrip(strip)
+    rows = packed.window(10, 16)
+
+    assert [len(row) for row in rows] == [16, 16]
+    assert all(isinstance(row, memoryview) for row in rows)
+    assert bytes(rows[0])[0] == 0x01   # 列10の上端
+    assert bytes(rows[1])[2] == 0x80   # 列12の下端
+    assert bytes(rows[1]).count(0) == 15
+
+
+def test_packed_strip_window_matches_cropped_image():
+    strip = make_image(48, 16, [(x, (x * 5) % 16) for x in range(48)])
+    packed = PackedStrip(strip)
+    for offset in (0, 7, 32):
+        window = b"".join(bytes(row) for row in packed.window(offset, 16))
+        assert window == image_to_pages(strip.crop((offset, 0, offset + 16, 16)))
+
+
+def test_display_pages_sends_same_as_display():
+    # ストリップの窓をそのまま送っても、切り出した画像を送るのと同じコマンド・データになる
+    strip = make_image(48, 16, [(x, (x * 3) % 16) for x in range(0, 48, 2)])
+    packed = PackedStrip(strip)
+    by_image, by_pages = FakeDevice(), FakeDevice()
+    image_display, pages_display = DeltaDisplay(by_image), DeltaDisplay(by_pages)
+    for offset in (0, 1, 2, 30):
+        image_display.display(strip.crop((offset, 0, offset + 16, 16)))
+        pages_display.display_pages(packed.window(offset, 16))
+
+    assert by_pages.sent == by_image.sent
+    assert pages_display.bytes_sent == image_display.bytes_sent
+
+
+def test_packed_strip_round_trip_and_from_pages():
+    strip = make_image(24, 16, [(1, 1), (2, 14), (23, 8)])
+    packed = PackedStrip(strip)
+    assert packed.to_image().tobytes() == strip.tobytes()
+
+    # 変換済みのバイト列から作っても同じ窓を切り出せる（ストリップキャッシュ用）
+    loaded = PackedStrip.from_pages(bytearray(packed.buffer), 24, 16)
+    assert [bytes(row) for row in loaded.window(5, 8)] == [bytes(row) for row in packed.window(5, 8)]
+
+
+def scroll_stream(window, page_start, page_end, interval=0b111):
+    """1区間ぶんの「停止→書き込み→スクロール設定→開始」のコマンド・データ"""
+    return [
+        ('command', (HW_SCROLL_DEACTIVATE,)),
+        ('command', (SSD1306_COLUMNADDR, 0, 15, SSD1306_PAGEADDR, page_start, page_end)),
+        ('data', window),
+        ('command', (HW_SCROLL_LEFT, 0x00, page_start, interval, page_end, 0x00, 0xFF)),
+        ('command', (HW_SCROLL_ACTIVATE,)),
+    ]
+
+
+def test_hardware_scroll_short_text_is_written_once():
+    # [余白16px][テキスト10px][余白16px]: 末尾を画面右端にそろえた1区間だけ
+    strip = make_image(16 + 10 + 16, 16, [(16, 0), (20, 9), (25, 15)])
+    assert hardware_scroll_offsets(10, 16) == [10]
+
+    serial = RecordingSerial()
+    rows = PackedStrip(strip).window(10, 16)
+    assert start_hardware_scroll(serial, rows, 0, 0b111) == serial.total_bytes
+    assert serial.log == scroll_stream(image_to_pages(strip.crop((10, 0, 26, 16))), 0, 1)
+
+
+def test_hardware_scroll_long_text_rewrites_each_segment():
+    # テキスト40px・画面16px: 先頭から16pxごとの3区間を、区間ごとに停止してから書き込む
+    strip = make_image(16 + 40 + 16, 16, [(x, 8 + x % 8) for x in range(16, 56)])
+    offsets = hardware_scroll_offsets(40, 16)
+    assert offsets == [16, 32, 48]
+
+    serial = RecordingSerial()
+    packed = PackedStrip(strip)
+    for offset in offsets:
+        start_hardware_scroll(serial, packed.window(offset, 16)[1:2], 1, 0b100)
+
+    expected = []
+    for offset in offsets:
+        page1 = image_to_pages(strip.crop((offset, 0, offset + 16, 16)))[16:]
+        expected += scroll_stream(page1, 1, 1, interval=0b100)
+    assert serial.log == expected
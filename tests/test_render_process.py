@@ -0,0 +1,147 @@
+"""
+render_process のテスト（共有メモリでのストリップの受け渡し）
+"""
+
+import multiprocessing
+import struct
+import threading
+import time
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+ImageFont = pytest.importorskip("PIL.ImageFont")
+
+from glyph_atlas import BitmapFont, GlyphAtlas, write_bitmap_font  # noqa: E402
+from oled_pages import PackedStrip  # noqa: E402
+from render_process import SHM_DATA_OFFSET, SHM_HEADER, SharedStrip  # noqa: E402
+from tiled_strip import TiledStrip  # noqa: E402
+
+
+def packed(width, pixels=()):
+    image = Image.new("1", (width, 16))
+    for xy in pixels:
+        image.putpixel(xy, 1)
+    return PackedStrip(image)
+
+
+@pytest.fixture
+def shared():
+    shared = SharedStrip(size=4096)
+    yield shared
+    shared.close(unlink=True)
+
+
+def test_read_before_publish_returns_none(shared):
+    assert shared.sequence == 0
+    assert shared.read() is None
+
+
+def test_publish_and_read_copy(shared):
+    strip = packed(40, [(3, 2), (39, 15)])
+    assert shared.publish(strip, text_width=12) == 2
+
+    sequence, received, text_width = shared.read()
+    assert (sequence, text_width) == (2, 12)
+    assert (received.width, received.height) == (40, 16)
+    assert bytes(received.buffer) == bytes(strip.buffer)
+
+    # 読み出したストリップはコピーなので、次の書き込みで変わらない
+    shared.publish(packed(40), text_width=0)
+    assert bytes(received.buffer) == bytes(strip.buffer)
+
+
+def test_sequence_advances_by_two(shared):
+    shared.publish(packed(8), 0)
+    assert shared.publish(packed(8), 0) == 4
+    assert shared.read()[0] == 4
+
+
+def test_publish_rejects_oversized_strip(shared):
+    with pytest.raises(ValueError):
+        shared.publish(packed(4096), 0)  # 4096px × 2ページ = 8192バイト
+    assert shared.read() is None
+
+
+def test_publish_tiled_strip_matches_full_strip(shared, tmp_path):
+    path = str(tmp_path / "test-14.bmf")
+    write_bitmap_font(path, ImageFont.load_default(size=14), "AB ")
+    atlas = GlyphAtlas("/nonexistent/font.otf", 14, bitmap_font=BitmapFont(path))
+    text = "AB BA " * 12
+    full, text_width = atlas.render_strip(text, 32, 16, 0)
+    # タイル幅で区切って書き込んでも、全幅のストリップと同じ内容になる（最後のタイルは途中まで）
+    tiled = TiledStrip(atlas, text, 32, 16, 0, tile_width=40, max_tiles=2)
+    assert tiled.width % tiled.tile_width
+
+    shared.publish(tiled, text_width)
+    _, received, received_width = shared.read()
+    assert received_width == text_width
+    assert (received.width, received.height) == (full.width, 16)
+    assert bytes(received.buffer) == bytes(PackedStrip(full).buffer)
+
+
+def test_attach_by_name_sees_published_strip(shared):
+    shared.publish(packed(16, [(0, 0)]), text_width=5)
+    reader = SharedStrip(name=shared.name)
+    try:
+        sequence, received, text_width = reader.read()
+        assert (sequence, text_width) == (2, 5)
+        assert bytes(received.buffer)[0] == 0x01
+    finally:
+        reader.close()
+
+
+def test_read_waits_for_writer_to_finish(shared):
+    shared.publish(packed(16), 0)
+    buf = shared.shm.buf
+
+    # publish() の途中の状態を作る: 番号は奇数のまま、データとヘッダーは書きかけ
+    strip = packed(16, [(7, 8)])
+    struct.pack_into("<Q", buf, 0, 3)
+    buf[SHM_DATA_OFFSET:SHM_DATA_OFFSET + 8] = strip.buffer[:8]
+
+    result = {}
+    reader = threading.Thread(target=lambda: result.setdefault('read', shared.read()))
+    reader.start()
+    time.sleep(0.02)
+    assert reader.is_alive()  # 書き込み中は読み出さずに待つ
+
+    # 書き込みを終えて番号を偶数にすると、書き終えた内容だけを返す
+    buf[SHM_DATA_OFFSET:SHM_DATA_OFFSET + len(strip.buffer)] = strip.buffer
+    SHM_HEADER.pack_into(buf, 0, 3, 16, 16, 0, 9, len(strip.buffer))
+    struct.pack_into("<Q", buf, 0, 4)
+    reader.join(timeout=5)
+
+    sequence, received, text_width = result['read']
+    assert (sequence, text_width) == (4, 9)
+    assert bytes(received.buffer) == bytes(strip.buffer)
+
+
+def read_in_child(name, results):
+    """別プロセスから共有メモリに接続して読み出す"""
+    reader = SharedStrip(name=name)
+    sequence, received, text_width = reader.read()
+    results.put((sequence, bytes(received.buffer), text_width))
+    reader.close()
+
+
+def test_handoff_to_other_process(shared):
+    strip = packed(24, [(5, 5), (20, 12)])
+    shared.publish(strip, text_width=7)
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=read_in_child, args=(shared.name, results))
+    child.start()
+    try:
+        assert results.get(timeout=10) == (2, bytes(strip.buffer), 7)
+    finally:
+        child.join(timeout=10)
+    assert child.exitcode == 0
+
+
+def test_status_round_trip(shared):
+    class Scheduler:
+        frames, late_frames, skipped_frames, max_jitter = 120, 3, 1, 0.0042
+
+    shared.write_status(shown=4, loops=2, scheduler=Scheduler)
+    assert shared.status() == {'shown': 4, 'loops': 2, 'frames': 120, 'late_frames': 3,
+                               'skipped_frames': 1, 'max_jitter_ms': pytest.approx(4.2)}
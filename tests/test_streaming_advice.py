@@ -0,0 +1,166 @@
+"""
+フル版のストリーミング応答のテスト（期限・サーキットブレーカーと、失敗時の代用アドバイス）
+OpenAIクライアントは決まったチャンクを返す偽物に差し替える
+"""
+
+import importlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("dotenv")
+
+from advisor_cache import AdviceCache  # noqa: E402
+from double_buffer import StreamingText  # noqa: E402
+from latency_budget import Deadline, hedged_caller  # noqa: E402
+from local_advice import local_advice  # noqa: E402
+
+TOKYO = {'name': 'Tokyo', 'main': {'temp': 18.3, 'feels_like': 16.9, 'humidity': 72},
+         'weather': [{'id': 803, 'description': '曇りがち'}]}
+
+
+@pytest.fixture(scope="module")
+def full(tmp_path_factory):
+    # 読み込み時にカレントディレクトリへログファイルを作るので、一時ディレクトリで読み込む
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("full"))
+    try:
+        return importlib.import_module("weather_outfit_advisor_full")
+    finally:
+        os.chdir(cwd)
+
+
+def chunk(text=None, usage=None):
+    delta = SimpleNamespace(content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)] if text is not None else [], usage=usage)
+
+
+class FakeStream:
+    """チャンクを順に返すストリーミング応答（on_chunk で途中の状態を変えられる）"""
+
+    def __init__(self, chunks, on_chunk=None):
+        self.chunks = chunks
+        self.on_chunk = on_chunk
+        self.closed = False
+
+    def __iter__(self):
+        for index, item in enumerate(self.chunks):
+            yield item
+            if self.on_chunk:
+                self.on_chunk(index)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """chat.completions.create() の呼び出しを記録し、用意した応答を返す（例外なら送出）"""
+
+    def __init__(self, result):
+        self.result = result
+        self.requests = []
+        self.options = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def make_advisor(full, tmp_path):
+    def make(result, failures=3):
+        advisor = full.WeatherOutfitAdvisor.__new__(full.WeatherOutfitAdvisor)
+        advisor._openai_client = FakeClient(result)
+        advisor.advice_caller = hedged_caller("advice", failures=failures)
+        advisor.advice_cache = AdviceCache(path=str(tmp_path / "advice.json"))
+        advisor.advice_profile = 'standard'
+        advisor.advice_options = {'max_completion_tokens': 1000}
+        advisor._llm_tokens = 0
+        return advisor
+    return make
+
+
+def test_stream_appends_chunks(make_advisor):
+    usage = SimpleNamespace(total_tokens=30, prompt_tokens=20, completion_tokens=10)
+    advisor = make_advisor(FakeStream([chunk("薄手の"), chunk("上着を"), chunk(usage=usage)]))
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream, Deadline(5.0))
+
+    assert stream.snapshot() == ("薄手の上着を", True)
+    assert stream.error is None
+    assert advisor._llm_tokens == 30
+    assert advisor._openai_client.requests[0]['stream'] is True
+    # 全体の残り時間をタイムアウトにし、自動リトライはしない
+    options = advisor._openai_client.options[0]
+    assert options['max_retries'] == 0 and 0 < options['timeout'] <= 5.0
+    assert len(advisor.advice_caller.tracker.samples) == 1
+
+
+def test_stream_failure_falls_back_to_last_good(make_advisor):
+    advisor = make_advisor(ConnectionError("reset"))
+    advisor.advice_cache.store_advice(TOKYO, "前回のアドバイス")
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream, Deadline(5.0))
+
+    assert stream.snapshot() == ("前回のアドバイス", True)
+    assert isinstance(stream.error, ConnectionError)
+    assert advisor.advice_caller.breaker.consecutive == 1
+
+
+def test_stream_failure_without_history_uses_local_table(make_advisor):
+    advisor = make_advisor(ConnectionError("reset"))
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream)
+    assert stream.text == local_advice(TOKYO)
+
+
+def test_stream_deadline_keeps_partial_text(make_advisor):
+    deadline = Deadline(5.0)
+
+    def expire(index):
+        deadline.expires_at = deadline.started_at  # 1チャンク目のあとに期限切れ
+
+    response = FakeStream([chunk("薄手の"), chunk("上着を")], on_chunk=expire)
+    advisor = make_advisor(response)
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream, deadline)
+
+    # 届いた文字は残し、応答を閉じて期限切れとして記録
+    assert stream.text == "薄手の"
+    assert isinstance(stream.error, TimeoutError)
+    assert response.closed
+    assert advisor.advice_caller.timeouts == 1
+
+
+def test_stream_expired_deadline_skips_request(make_advisor):
+    advisor = make_advisor(FakeStream([chunk("使われない")]))
+    deadline = Deadline(5.0)
+    deadline.expires_at = deadline.started_at
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream, deadline)
+
+    assert advisor._openai_client.requests == []
+    assert stream.snapshot() == (local_advice(TOKYO), True)
+    assert stream.error is not None
+
+
+def test_stream_open_breaker_skips_request(make_advisor):
+    advisor = make_advisor(ConnectionError("reset"), failures=2)
+    for _ in range(2):
+        advisor._stream_outfit_advice(TOKYO, StreamingText())
+    assert advisor.advice_caller.breaker.state == "open"
+
+    stream = StreamingText()
+    advisor._stream_outfit_advice(TOKYO, stream)
+    assert len(advisor._openai_client.requests) == 2
+    assert advisor.advice_caller.rejected == 1
+    assert stream.text == local_advice(TOKYO)
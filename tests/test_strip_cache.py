@@ -0,0 +1,90 @@
+"""
+strip_cache のテスト（ページ形式ストリップの保存・読み込み・更新時刻によるLRU削除）
+"""
+
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from oled_pages import PackedStrip  # noqa: E402
+from strip_cache import STRIP_HEADER, STRIP_MAGIC, STRIP_SUFFIX, StripCache, strip_key  # noqa: E402
+
+# 40px × 2ページ = 80バイト + ヘッダー
+FILE_BYTES = STRIP_HEADER.size + 40 * 2
+
+
+def packed(column):
+    image = Image.new("1", (40, 16))
+    for y in range(16):
+        image.putpixel((column, y), 1)
+    return PackedStrip(image)
+
+
+def strip_file(tmp_path, key):
+    return str(tmp_path / (key + STRIP_SUFFIX))
+
+
+def test_strip_key_depends_on_all_inputs():
+    key = strip_key("東京 18°C", "/fonts/font.otf", 14, 128, 64, 24)
+    assert key == strip_key("東京 18°C", "/other/font.otf", 14, 128, 64, 24)  # フォントはファイル名だけ
+    assert key != strip_key("東京 19°C", "/fonts/font.otf", 14, 128, 64, 24)
+    assert key != strip_key("東京 18°C", "/fonts/font.otf", 16, 128, 64, 24)
+    assert key != strip_key("東京 18°C", "/fonts/font.otf", 14, 128, 32, 24)
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = StripCache(str(tmp_path))
+    strip = packed(5)
+    cache.put("a", strip, text_width=12)
+
+    loaded, text_width = cache.get("a")
+    assert text_width == 12
+    assert (loaded.width, loaded.height) == (40, 16)
+    assert [bytes(row) for row in loaded.window(0, 40)] == [bytes(row) for row in strip.window(0, 40)]
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used_by_mtime(tmp_path):
+    cache = StripCache(str(tmp_path), max_bytes=2 * FILE_BYTES + 10)
+    cache.put("a", packed(1), 1)
+    cache.put("b", packed(2), 2)
+    os.utime(strip_file(tmp_path, "a"), (1000, 1000))
+    os.utime(strip_file(tmp_path, "b"), (2000, 2000))
+
+    assert cache.get("a") is not None  # 読み込むと更新時刻が新しくなる（a を最近使ったことにする）
+    cache.put("c", packed(3), 3)       # 上限超過: 最も長く使われていない b を削除
+
+    assert cache.evictions == 1
+    assert not os.path.exists(strip_file(tmp_path, "b"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_corrupt_files_are_misses(tmp_path):
+    cache = StripCache(str(tmp_path))
+    cache.put("good", packed(1), 1)
+
+    with open(strip_file(tmp_path, "magic"), "wb") as f:
+        f.write(STRIP_HEADER.pack(b"NOTSTRIP", 40, 16, 0, 1) + bytes(80))
+    with open(strip_file(tmp_path, "short"), "wb") as f:
+        f.write(STRIP_HEADER.pack(STRIP_MAGIC, 40, 16, 0, 1) + bytes(79))  # データが1バイト足りない
+    with open(strip_file(tmp_path, "header"), "wb") as f:
+        f.write(STRIP_MAGIC)                                                # ヘッダーの途中で終わる
+    open(strip_file(tmp_path, "empty"), "wb").close()
+
+    for key in ("magic", "short", "header", "empty"):
+        assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (0, 4)
+    assert cache.get("good") is not None
+
+
+def test_zero_max_bytes_disables_cache(tmp_path):
+    directory = tmp_path / "strips"
+    cache = StripCache(str(directory), max_bytes=0)
+    cache.put("a", packed(1), 1)
+    assert not directory.exists()
+    assert cache.get("a") is None
@@ -0,0 +1,71 @@
+"""
+tiled_strip のテスト（タイル分割で描画したストリップと全幅のストリップの一致・タイルの使い回し）
+フォントファイルが無くても動くよう、Pillow内蔵のフォントで作ったビットマップフォントを使う
+"""
+
+import pytest
+
+ImageFont = pytest.importorskip("PIL.ImageFont")
+
+from glyph_atlas import BitmapFont, GlyphAtlas, write_bitmap_font  # noqa: E402
+from oled_pages import PackedStrip  # noqa: E402
+from tiled_strip import TiledStrip  # noqa: E402
+
+WIDTH, HEIGHT = 32, 16
+TEXT = "AB BA " * 12
+
+
+@pytest.fixture
+def atlas(tmp_path):
+    path = str(tmp_path / "test-14.bmf")
+    write_bitmap_font(path, ImageFont.load_default(size=14), "AB ")
+    return GlyphAtlas("/nonexistent/font.otf", 14, bitmap_font=BitmapFont(path))
+
+
+def test_same_geometry_as_render_strip(atlas):
+    full, text_width = atlas.render_strip(TEXT, WIDTH, HEIGHT, 0)
+    tiled = TiledStrip(atlas, TEXT, WIDTH, HEIGHT, 0)
+    assert tiled.text_width == text_width
+    assert tiled.width == full.width
+    assert tiled.rendered == 0  # 作成時は描画しない
+
+
+def test_crop_and_window_match_full_strip(atlas):
+    full, _ = atlas.render_strip(TEXT, WIDTH, HEIGHT, 0)
+    packed = PackedStrip(full)
+    tiled = TiledStrip(atlas, TEXT, WIDTH, HEIGHT, 0, tile_width=40)
+
+    # タイルの境界をまたぐ位置も含めて、全幅のストリップから切り出したものと同じ
+    for offset in range(0, full.width - WIDTH + 1, 3):
+        box = (offset, 0, offset + WIDTH, HEIGHT)
+        assert tiled.crop(box).tobytes() == full.crop(box).tobytes()
+        assert [bytes(row) for row in tiled.window(offset, WIDTH)] == \
+            [bytes(row) for row in packed.window(offset, WIDTH)]
+
+
+def test_scrolling_renders_each_tile_once(atlas):
+    tiled = TiledStrip(atlas, TEXT, WIDTH, HEIGHT, 0, max_tiles=2)
+    tiles = -(-tiled.width // tiled.tile_width)
+    for offset in range(tiled.width - WIDTH + 1):
+        tiled.window(offset, WIDTH)
+    # 左から右へ1回スクロールする間は、各タイルを1回ずつだけ描画する
+    assert tiled.rendered == tiles
+
+
+def test_tiles_beyond_limit_are_redrawn(atlas):
+    tiled = TiledStrip(atlas, TEXT, WIDTH, HEIGHT, 0, max_tiles=2)
+    for index in (0, 1, 0, 1):
+        tiled.crop((index * WIDTH, 0, (index + 1) * WIDTH, HEIGHT))
+    assert tiled.rendered == 2  # 保持している2枚は描き直さない
+
+    tiled.crop((2 * WIDTH, 0, 3 * WIDTH, HEIGHT))   # 3枚目: 最も長く使われていないタイル0を使い回す
+    tiled.crop((WIDTH, 0, 2 * WIDTH, HEIGHT))
+    assert tiled.rendered == 3
+    tiled.crop((0, 0, WIDTH, HEIGHT))               # タイル0は描き直す
+    assert tiled.rendered == 4
+
+
+def test_tile_width_is_at_least_screen_width(atlas):
+    tiled = TiledStrip(atlas, TEXT, WIDTH, HEIGHT, 0, tile_width=8, max_tiles=1)
+    assert tiled.tile_width == WIDTH
+    assert tiled.max_tiles == 2
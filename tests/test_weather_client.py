@@ -0,0 +1,169 @@
+"""
+weather_client のテスト（asyncio版の並行取得・取得失敗の記録・キャッシュと最後に取得できたデータでの代用）
+httpx の通信は MockTransport、requests のセッションは偽物に差し替え、実際のAPIには接続しない
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import advisor_cache
+
+httpx = pytest.importorskip("httpx")
+
+from advisor_cache import WeatherCache  # noqa: E402
+from latency_budget import Deadline, hedged_caller  # noqa: E402
+from weather_client import AsyncWeatherClient, WeatherClient  # noqa: E402
+
+
+class FakeServer:
+    """都市名ごとの応答を返すOpenWeatherMapの代わり（受けた都市名を記録）"""
+
+    def __init__(self, failing=(), delay=0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.requests = []
+
+    async def __call__(self, request):
+        city = request.url.params['q']
+        self.requests.append(city)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if city in self.failing:
+            return httpx.Response(500, json={'message': 'error'})
+        return httpx.Response(200, json={'name': city, 'main': {'temp': 18.3}})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, 'AsyncClient',
+                        lambda **kwargs: real_client(transport=httpx.MockTransport(server), **kwargs))
+    return server
+
+
+def fetch_all(client, cities, deadline=None):
+    async def run():
+        try:
+            return await client.get_all(cities, deadline)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_get_all_keeps_order(server):
+    server.delay = 0.01
+    client = AsyncWeatherClient("key")
+    results = fetch_all(client, ["Tokyo", "Osaka", "Sapporo"])
+    assert list(results) == ["Tokyo", "Osaka", "Sapporo"]
+    assert [data['name'] for data in results.values()] == ["Tokyo", "Osaka", "Sapporo"]
+    assert sorted(server.requests) == ["Osaka", "Sapporo", "Tokyo"]
+    assert client.errors == {}
+
+
+def test_http_error_is_recorded_per_city(server):
+    server.failing = {"Osaka"}
+    client = AsyncWeatherClient("key")
+    results = fetch_all(client, ["Tokyo", "Osaka"])
+    assert results["Tokyo"]['name'] == "Tokyo"
+    assert results["Osaka"] is None
+    assert list(client.errors) == ["Osaka"]
+    assert "500" in client.errors["Osaka"]
+
+
+def test_fresh_cache_skips_request(server, tmp_path):
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=600)
+    fetch_all(AsyncWeatherClient("key", cache=cache), ["Tokyo"])
+    results = fetch_all(AsyncWeatherClient("key", cache=cache), ["Tokyo"])
+    assert results["Tokyo"]['name'] == "Tokyo"
+    assert server.requests == ["Tokyo"]
+
+
+def test_timeout_is_recorded(server):
+    server.delay = 5
+    client = AsyncWeatherClient("key", timeout=0.05)
+    assert fetch_all(client, ["Tokyo"]) == {"Tokyo": None}
+    assert client.errors["Tokyo"] == "TimeoutError"
+
+
+def test_failure_falls_back_to_last_good(server, tmp_path, monkeypatch, fake_clock):
+    fake_clock.now = 1_700_000_000.0
+    monkeypatch.setattr(advisor_cache, 'time', fake_clock)
+    cache = WeatherCache(path=str(tmp_path / "w.json"), ttl=600, stale_ttl=600)
+    fetch_all(AsyncWeatherClient("key", cache=cache), ["Tokyo"])
+
+    # 古すぎて取り直しが必要なときに失敗したら、最後に取得できたデータで代用する
+    fake_clock.advance(1800)
+    server.failing = {"Tokyo"}
+    client = AsyncWeatherClient("key", cache=cache)
+    results = fetch_all(client, ["Tokyo", "Osaka"])
+    assert results["Tokyo"]['name'] == "Tokyo"
+    assert client.fallbacks == {"Tokyo": pytest.approx(1800)}
+    assert "（失敗、30分前のデータで代用）" in client.summary(["Tokyo", "Osaka"])
+
+
+def test_caller_records_expired_deadline(server):
+    client = AsyncWeatherClient("key", caller=hedged_caller("weather", hedge=False))
+    deadline = Deadline(1.0)
+    deadline.expires_at = deadline.started_at
+    assert fetch_all(client, ["Tokyo"], deadline) == {"Tokyo": None}
+    assert server.requests == []
+    assert client.errors["Tokyo"] == "期限切れまたは遮断中"
+
+
+def test_error_is_cleared_by_next_get(server):
+    server.failing = {"Tokyo"}
+    client = AsyncWeatherClient("key")
+    fetch_all(client, ["Tokyo"])
+    assert "Tokyo" in client.errors
+
+    server.failing = set()
+    assert fetch_all(client, ["Tokyo"])["Tokyo"]['name'] == "Tokyo"
+    assert client.errors == {}
+
+
+class FakeSession:
+    """requests.Session の代わり: 1本目は release まで待ってから失敗し、2本目以降はすぐ成功する"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def get(self, url, params, timeout):
+        import requests
+        self.calls += 1
+        if self.calls == 1:
+            self.release.wait(5)
+            self.finished.set()
+            raise requests.ConnectionError("reset")
+        return FakeResponse({'name': params['q']})
+
+    def close(self):
+        pass
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def test_losing_hedge_failure_is_not_recorded():
+    pytest.importorskip("requests")
+    client = WeatherClient("key", caller=hedged_caller("weather", initial=0.01))
+    session = client._session = FakeSession()
+    try:
+        assert client.get("Tokyo", Deadline(5.0))['name'] == "Tokyo"
+    finally:
+        session.release.set()
+    # 採用されなかった1本目が後から失敗しても、エラーとして残さない
+    assert session.finished.wait(5)
+    assert client.errors == {}
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+タイル分割ストリップライブラリ
+長いテキストのストリップを全幅ぶん確保せず、表示中の位置の前後だけを一定幅のタイルに描画する
+（タイルは使い回すので、テキストの長さによらずメモリ使用量が一定）
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import bisect
+from collections import OrderedDict
+
+from PIL import Image
+
+from oled_pages import PackedStrip
+
+# これより幅の広いストリップはタイル分割で描画する（128×64なら4096pxで約32KiB）
+TILED_STRIP_THRESHOLD = 4096
+# 同時に保持するタイル数（表示中にまたがる2枚 + 使い回し用の余裕）
+TILED_STRIP_TILES = 4
+
+
+class TiledStrip:
+    """
+    GlyphAtlas.render_strip() のストリップと同じ座標で、必要な部分だけをタイルに描画するクラス
+    crop() はストリップ画像、window() は PackedStrip の代わりにそのまま使えます
+    """
+
+    def __init__(self, atlas, text, width, height, y_pos, tile_width=None,
+                 max_tiles=TILED_STRIP_TILES, layout=None):
+        """
+        タイル分割ストリップの初期化（この時点では文字の配置を計算するだけで描画しない）
+
+        Args:
+            atlas (GlyphAtlas): グリフの取得に使うアトラス
+            text (str): 描画するテキスト
+            width (int): 画面幅（前後の余白の幅）
+            height (int): 画面高さ（8の倍数）
+            y_pos (int): テキストのY座標
+            tile_width (int): タイル幅（Noneで画面幅。画面幅より狭くはできない）
+            max_tiles (int): 同時に保持するタイル数（2以上）
+            layout (tuple): atlas.layout(text) の結果（計算済みなら渡すと再計算しない）
+        """
+        placed, self.text_width = layout or atlas.layout(text)
+        self.screen_width = width
+        self.height = height
+        self.width = width + self.text_width + width  # render_strip() と同じストリップ幅
+        self.pages = height // 8
+        self.y_pos = y_pos
+        self.tile_width = max(tile_width or width, width)
+        self.max_tiles = max(max_tiles, 2)
+
+        # 描画する文字だけを、ストリップ上の左端の位置で並べておく（タイルごとに二分探索）
+        self._glyphs = [(width + x + glyph.left, glyph) for x, glyph in placed
+                        if glyph.image is not None]
+        self._starts = [start for start, _ in self._glyphs]
+        self._glyph_width = max((glyph.image.width for _, glyph in self._glyphs), default=0)
+
+        self._tiles = OrderedDict()  # タイル番号 -> [画像, PackedStrip（必要になったら作成）]
+        self.rendered = 0  # 描画したタイル数（テキスト幅 ÷ タイル幅 程度なら使い回しが効いている）
+
+    def _tile(self, index):
+        """
+        タイル番号 index のタイルを取得（無ければ描画、上限を超えたら最も古いタイルを使い回す）
+        """
+        entry = self._tiles.get(index)
+        if entry is not None:
+            self._tiles.move_to_end(index)
+            return entry
+
+        if len(self._tiles) >= self.max_tiles:
+            # 最も長く使われていないタイルの画像を消して使い回す（新しい画像を確保しない）
+            _, entry = self._tiles.popitem(last=False)
+            entry[0].paste(0, (0, 0, self.tile_width, self.height))
+            entry[1] = None
+        else:
+            entry = [Image.new("1", (self.tile_width, self.height)), None]
+
+        # タイルの範囲に掛かる文字だけを貼り付け（はみ出した部分はpasteが切り捨てる）
+        # グリフのleftは文字ごとに少しずれるので、前後にグリフ幅ぶん余裕を持って探す
+        left = index * self.tile_width
+        right = left + self.tile_width
+        first = bisect.bisect_left(self._starts, left - self._glyph_width)
+        last = bisect.bisect_right(self._starts, right + self._glyph_width)
+        image = entry[0]
+        for start, glyph in self._glyphs[first:last]:
+            image.paste(255, (start - left, self.y_pos + glyph.top), glyph.image)
+
+        self._tiles[index] = entry
+        self.rendered += 1
+        return entry
+
+    def crop(self, box):
+        """
+        ストリップから画面幅ぶんを切り出す（Image.crop() と同じ呼び出し方）
+
+        Args:
+            box (tuple): (left, top, right, bottom)（top=0, bottom=画面高さ、幅はタイル幅以下）
+
+        Returns:
+            PIL.Image: 切り出した画像
+        """
+        left, _, right, _ = box
+        index, offset = divmod(left, self.tile_width)
+        image = self._tile(index)[0]
+        if offset + right - left <= self.tile_width:
+            return image.crop((offset, 0, offset + right - left, self.height))
+
+        # 2枚のタイルにまたがる場合は、それぞれの部分をつなげる
+        frame = Image.new("1", (right - left, self.height))
+        split = self.tile_width - offset
+        frame.paste(image.crop((offset, 0, self.tile_width, self.height)), (0, 0))
+        frame.paste(self._tile(index + 1)[0].crop((0, 0, right - left - split, self.height)), (split, 0))
+        return frame
+
+    def window(self, offset, width):
+        """
+        ストリップの offset 列目から width 列ぶんをページごとに取り出す（PackedStrip.window() と同じ）
+
+        Args:
+            offset (int): 画面左端に来るストリップの列
+            width (int): 画面幅（タイル幅以下）
+
+        Returns:
+            list: ページ0から順に、各ページ width バイトのバイト列
+                  （1枚のタイルに収まる場合はコピーなしの memoryview）
+        """
+        index, start = divmod(offset, self.tile_width)
+        first = self._packed(index)
+        if start + width <= self.tile_width:
+            return first.window(start, width)
+
+        # 2枚のタイルにまたがる場合だけ、ページごとに前後をつなげる（1フレーム 幅×ページ数 バイト）
+        split = self.tile_width - start
+        second = self._packed(index + 1)
+        return [bytes(a) + bytes(b) for a, b in zip(first.window(start, split),
+                                                      second.window(0, width - split))]
+
+    def _packed(self, index):
+        """タイルのページ形式（タイルを描画・変換したときに一度だけ作成）"""
+        entry = self._tile(index)
+        if entry[1] is None:
+            entry[1] = PackedStrip(entry[0])
+        return entry[1]
+
+    def summary(self):
+        """
+        ログ出力用のタイル描画の統計
+
+        Returns:
+            str: ストリップ幅・タイル幅・描画したタイル数の要約
+        """
+        return (f"タイル分割描画 {self.width}px（タイル {self.tile_width}px × 最大{self.max_tiles}枚, "
+                f"描画 {self.rendered}回）")
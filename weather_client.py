@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+天気取得クライアントライブラリ
+1つのHTTPセッション（keep-alive接続プール）を使い回し、複数都市の天気を並行して取得する
+要件定義書: 09-003_天気予報＋服装提案掲示板アプリ_要件定義書.md
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# OpenWeatherMap API（現在の天気）のエンドポイント
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+# 同時に取得する都市数の上限（接続プールの大きさも同じにする）
+WEATHER_FETCH_WORKERS = 4
+
+
+def parse_city_names(value, default='Tokyo'):
+    """
+    CITY_NAMEの値を都市名のリストに変換
+
+    Args:
+        value (str): カンマ区切りの都市名（例: "Tokyo, Osaka, Sapporo"）
+        default (str): 空の場合の都市名
+
+    Returns:
+        list: 都市名のリスト（重複は除く、指定順を維持）
+    """
+    cities = []
+    for name in (value or '').split(','):
+        name = name.strip()
+        if name and name not in cities:
+            cities.append(name)
+    return cities or [default]
+
+
+class WeatherClient:
+    """
+    OpenWeatherMapの天気取得クライアント
+    HTTPセッションを使い回すので、2回目以降の取得ではTCP・TLSの接続確立を省略できます
+    """
+
+    def __init__(self, api_key, cache=None, units='metric', lang='ja', timeout=10,
+                 max_workers=WEATHER_FETCH_WORKERS, url=OPENWEATHER_URL, caller=None):
+        """
+        天気取得クライアントの初期化
+
+        Args:
+            api_key (str): OpenWeatherMapのAPIキー
+            cache (WeatherCache): 天気キャッシュ（Noneなら毎回APIを呼ぶ）
+            units (str): 単位（metric=摂氏、imperial=華氏）
+            lang (str): 天気の説明の言語
+            timeout (float): 1リクエストのタイムアウト（秒）
+            max_workers (int): 同時に取得する都市数の上限
+            url (str): APIのエンドポイント
+            caller (HedgedCaller): 期限・ヘッジ・サーキットブレーカーつきで呼ぶ場合に指定
+        """
+        self.api_key = api_key
+        self.cache = cache
+        self.units = units
+        self.lang = lang
+        self.timeout = timeout
+        self.max_workers = max(1, max_workers)
+        self.url = url
+        self.caller = caller
+        self._session = None
+        self.latencies = {}  # 都市名 → 直近の取得時間（秒、キャッシュからの場合も含む）
+        self.errors = {}     # 都市名 → 直近の取得エラー
+        self.fallbacks = {}  # 都市名 → 最後に取得できたデータで代用した場合の、そのデータの経過秒数
+        self.wall_time = 0.0  # 直近の get_all() 全体の所要時間（秒）
+
+    @property
+    def session(self):
+        """HTTPセッション（初回使用時にrequestsをインポートして作成）"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # 並行取得するスレッド数ぶんの接続を保持（足りないと接続が捨てられ再接続になる）
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+
+    def fetch(self, city, timeout=None):
+        """
+        APIから1都市の天気を取得（キャッシュを使わない）
+
+        Args:
+            city (str): 都市名
+            timeout (float): タイムアウト（秒、Noneで self.timeout）
+
+        Returns:
+            tuple: (天気データ, エラー)（成功時のエラーはNone、失敗時の天気データはNone）
+        """
+        params = {
+            'q': city,               # 都市名（例: Tokyo, Osaka）
+            'appid': self.api_key,   # APIキー
+            'units': self.units,     # 温度単位
+            'lang': self.lang        # 言語（ja=日本語）
+        }
+        import requests
+
+        start = time.perf_counter()
+        try:
+            if timeout is not None:
+                timeout = max(min(timeout, self.timeout), 0.001)  # 全体の残り時間が短ければそれに合わせる
+            response = self.session.get(self.url, params=params, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except requests.RequestException as e:
+            metrics.WEATHER_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="error")
+            return None, str(e)
+        metrics.WEATHER_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+        return data, None
+
+    def get(self, city, deadline=None):
+        """
+        1都市の天気を取得（キャッシュが有効ならAPIを呼ばない）
+        取得に失敗・期限切れの場合は、キャッシュに残っている最後のデータを古さに関係なく返す
+
+        Args:
+            city (str): 都市名
+            deadline (Deadline): 全体の期限（caller を指定した場合のみ使う）
+
+        Returns:
+            dict: 天気データ（取得失敗かつ保存済みのデータも無い場合はNone）
+        """
+        start = time.perf_counter()
+        self.errors.pop(city, None)
+        self.fallbacks.pop(city, None)
+        # この呼び出しの試行のエラー（採用しなかったヘッジ・裏での取り直しのエラーは errors に残さない）
+        failures = []
+
+        def attempt(timeout=None):
+            data, error = self.fetch(city, timeout)
+            if error:
+                failures.append(error)
+            return data
+
+        if self.caller is not None:
+            def fetch():
+                return self.caller.call(attempt, deadline)
+        else:
+            fetch = attempt
+
+        if self.cache is not None:
+            data = self.cache.get(city, self.units, fetch)
+            if data is None:
+                self._record_failure(city, failures)
+                data, age = self.cache.last_good(city, self.units)
+                if data is not None:
+                    self.fallbacks[city] = age
+        else:
+            data = fetch()
+            if data is None:
+                self._record_failure(city, failures)
+        self.latencies[city] = time.perf_counter() - start
+        return data
+
+    def _record_failure(self, city, failures):
+        """取得に失敗した都市のエラーを記録（試行のエラーが無ければ期限切れか遮断中）"""
+        self.errors[city] = failures[-1] if failures else "期限切れまたは遮断中"
+
+    def get_all(self, cities, deadline=None):
+        """
+        複数都市の天気を並行して取得
+
+        Args:
+            cities (list): 都市名のリスト
+            deadline (Deadline): 全体の期限（caller を指定した場合のみ使う）
+
+        Returns:
+            dict: 都市名 → 天気データ（取得失敗はNone、指定順を維持）
+        """
+        start = time.perf_counter()
+        if len(cities) == 1:
+            results = [self.get(cities[0], deadline)]
+        else:
+            self.session  # スレッドから同時に作成しないよう先に用意
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(cities)),
+                                    thread_name_prefix='weather-fetch') as pool:
+                results = list(pool.map(lambda city: self.get(city, deadline), cities))
+        self.wall_time = time.perf_counter() - start
+        return dict(zip(cities, results))
+
+    def summary(self, cities):
+        """
+        ログ出力用の取得時間の要約を作成
+
+        Args:
+            cities (list): 表示する都市名のリスト
+
+        Returns:
+            str: 都市ごとの取得時間と全体の所要時間
+        """
+        parts = []
+        for city in cities:
+            latency = self.latencies.get(city)
+            text = f"{city} {latency * 1000:.0f}ms" if latency is not None else f"{city} -"
+            if city in self.fallbacks:
+                text += f"（失敗、{self.fallbacks[city] / 60:.0f}分前のデータで代用）"
+            elif city in self.errors:
+                text += "（失敗）"
+            parts.append(text)
+        total = sum(self.latencies.get(city, 0.0) for city in cities)
+        return (f"天気取得 {len(cities)}都市 全体 {self.wall_time * 1000:.0f}ms "
+                f"（都市ごとの合計 {total * 1000:.0f}ms）: {', '.join(parts)}")
+
+    def close(self):
+        """
+        HTTPセッションを閉じる（保持している接続を解放）
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class AsyncWeatherClient(WeatherClient):
+    """
+    WeatherClient のasyncio版（httpx.AsyncClient の接続プールを使い回す）
+    スレッドを使わず、1つのイベントループで複数都市の取得を並行して待ちます
+    """
+
+    @property
+    def session(self):
+        """非同期HTTPクライアント（初回使用時にhttpxをインポートして作成）"""
+        if self._session is None:
+            import httpx
+
+            # 同時に取得する都市数ぶんの接続を保持（keep-alive）
+            limits = httpx.Limits(max_connections=self.max_workers,
+                                  max_keepalive_connections=self.max_workers)
+            self._session = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        return self._session
+
+    async def fetch(self, city, timeout=None):
+        """
+        APIから1都市の天気を取得（キャッシュを使わない）
+
+        Args:
+            city (str): 都市名
+            timeout (float): この呼び出し全体のタイムアウト（秒、Noneで self.timeout）
+
+        Returns:
+            tuple: (天気データ, エラー)（成功時のエラーはNone、失敗・タイムアウト時の天気データはNone）
+        """
+        params = {
+            'q': city,               # 都市名（例: Tokyo, Osaka）
+            'appid': self.api_key,   # APIキー
+            'units': self.units,     # 温度単位
+            'lang': self.lang        # 言語（ja=日本語）
+        }
+        import httpx
+
+        start = time.perf_counter()
+        if timeout is not None:
+            timeout = max(min(timeout, self.timeout), 0.001)  # 全体の残り時間が短ければそれに合わせる
+        try:
+            response = await asyncio.wait_for(self.session.get(self.url, params=params),
+                                              timeout or self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as e:
+            metrics.WEATHER_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="error")
+            return None, str(e) or type(e).__name__
+        metrics.WEATHER_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+        return data, None
+
+    async def get(self, city, deadline=None):
+        """
+        1都市の天気を取得（キャッシュが有効ならAPIを呼ばない）
+        取得に失敗・期限切れの場合は、キャッシュに残っている最後のデータを古さに関係なく返す
+
+        Args:
+            city (str): 都市名
+            deadline (Deadline): 全体の期限（caller を指定した場合のみ使う）
+
+        Returns:
+            dict: 天気データ（取得失敗かつ保存済みのデータも無い場合はNone）
+        """
+        start = time.perf_counter()
+        self.errors.pop(city, None)
+        self.fallbacks.pop(city, None)
+        failures = []  # この呼び出しの試行のエラー（get() と同じ）
+
+        async def attempt(timeout=None):
+            data, error = await self.fetch(city, timeout)
+            if error:
+                failures.append(error)
+            return data
+
+        if self.caller is not None:
+            def fetch():
+                return self.caller.call_async(attempt, deadline)
+        else:
+            fetch = attempt
+
+        if self.cache is not None:
+            data = await self.cache.get_async(city, self.units, fetch)
+            if data is None:
+                # 取得失敗・タイムアウト: 最後に取得できたデータで代用
+                self._record_failure(city, failures)
+                data, age = self.cache.last_good(city, self.units)
+                if data is not None:
+                    self.fallbacks[city] = age
+        else:
+            data = await fetch()
+            if data is None:
+                self._record_failure(city, failures)
+        self.latencies[city] = time.perf_counter() - start
+        return data
+
+    async def get_all(self, cities, deadline=None):
+        """
+        複数都市の天気を並行して取得
+
+        Args:
+            cities (list): 都市名のリスト
+            deadline (Deadline): 全体の期限（caller を指定した場合のみ使う）
+
+        Returns:
+            dict: 都市名 → 天気データ（取得失敗はNone、指定順を維持）
+        """
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self.get(city, deadline) for city in cities))
+        self.wall_time = time.perf_counter() - start
+        return dict(zip(cities, results))
+
+    async def aclose(self):
+        """
+        非同期HTTPクライアントを閉じる（保持している接続を解放）
+        """
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
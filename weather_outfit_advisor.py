@@ -6,10 +6,17 @@
 
 import os
 import sys
-import requests
-import openai
+import time
+import threading
 from dotenv import load_dotenv
+import metrics
 from scroll_oled import OLEDScroller
+from advisor_cache import WeatherCache, AdviceCache
+from weather_client import WeatherClient, parse_city_names, OPENWEATHER_URL
+from latency_budget import Deadline
+from advice_profiles import advice_messages, advice_options, advice_variant, check_profile
+from local_advice import local_advice
+# requests・openai は読み込みが重いため、使う直前にインポートする
 
 # === 設定定数 ===
 FONT_PATH = "./assets/fonts/NotoSansCJKjp-Regular.otf"
@@ -30,15 +37,31 @@ class WeatherOutfitAdvisor:
         """APIキー取得とOLED初期化"""
         self.weather_api_key = os.getenv('WEATHER_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.city_name = os.getenv('CITY_NAME', 'Tokyo')
-
-        if not self.weather_api_key or not self.openai_api_key:
-            print("[エラー] APIキーが設定されていません")
-            print("ヒント: .envファイルにWEATHER_API_KEYとOPENAI_API_KEYを設定")
-            sys.exit(1)
-
-        self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
-
+        self.city_names = parse_city_names(os.getenv('CITY_NAME'))  # カンマ区切りで複数指定可
+        self._openai_client = None  # 初回使用時に作成
+        # プロンプトプロファイル（フル版と同じ ADVICE_PROFILE・ADVICE_MAX_TOKENS・ADVICE_REASONING_EFFORT）
+        self.advice_profile = os.getenv('ADVICE_PROFILE', 'standard').lower()
+        reasoning_effort = os.getenv('ADVICE_REASONING_EFFORT', '').lower()
+        check_profile(self.advice_profile, reasoning_effort)
+        self.advice_options = advice_options(self.advice_profile,
+                                             max_tokens=int(os.getenv('ADVICE_MAX_TOKENS', '0')),
+                                             reasoning_effort=reasoning_effort)
+        self.weather_cache = WeatherCache()  # 10分以内の天気データは再利用
+        # ほぼ同じ天気ならアドバイスを再利用（プロファイルごとに別のアドバイス）
+        self.advice_cache = AdviceCache(variant=advice_variant(self.advice_profile, self.advice_options))
+        self.weather_client = WeatherClient(self.weather_api_key, cache=self.weather_cache,
+                                            url=os.getenv('WEATHER_API_URL', OPENWEATHER_URL))
+        # アドバイスの作り方（hybrid: 表ですぐに表示しAIの生成は裏で行う, llm: AIを待つ, local: AIなし）
+        self.advice_engine = os.getenv('ADVICE_ENGINE', 'hybrid').lower()
+        if self.advice_engine not in ('hybrid', 'llm', 'local'):
+            raise ValueError(f"ADVICE_ENGINE must be hybrid, llm or local: {self.advice_engine}")
+        self.run_budget = float(os.getenv('RUN_BUDGET_SEC', '20'))  # hybrid の裏でのAI生成の持ち時間（秒）
+        self._refine_pending = []  # AIのアドバイスがキャッシュに無い都市（hybrid、run() でまとめて生成）
+        # メトリクスの公開（METRICS_TEXTFILE: Prometheus形式のファイル, METRICS_PORT: /metrics のポート）
+        metrics.start_exporter(textfile=os.getenv('METRICS_TEXTFILE'),
+                               port=int(os.getenv('METRICS_PORT', '0')))
+
+        # OLEDを先に初期化（APIキーのエラーもOLEDに表示できる）
         try:
             self.scroller = OLEDScroller(
                 font_path=FONT_PATH,
@@ -51,76 +74,124 @@ class WeatherOutfitAdvisor:
             print(f"[OLED初期化エラー] {e}")
             self.scroller = None
 
-    def get_weather_data(self):
-        """OpenWeatherMap APIから天気データを取得"""
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {
-            'q': self.city_name,
-            'appid': self.weather_api_key,
-            'units': 'metric',
-            'lang': 'ja'
-        }
+        # ADVICE_ENGINE=local ならOpenAIのキーは不要
+        if not self.weather_api_key or (self.advice_engine != 'local' and not self.openai_api_key):
+            print("[エラー] APIキーが設定されていません")
+            print("ヒント: .envファイルにWEATHER_API_KEYとOPENAI_API_KEYを設定")
+            if self.scroller:
+                self.scroller.scroll("APIキー未設定", loops=1)
+                self.scroller.clear()
+            sys.exit(1)
 
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"[天気取得エラー] {e}")
-            return None
+    @property
+    def openai_client(self):
+        """OpenAIクライアント（初回使用時にopenaiをインポートして作成）"""
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+
+    def get_weather_data(self):
+        """全都市の天気データを並行して取得（キャッシュが有効ならAPIを呼ばない）"""
+        results = self.weather_client.get_all(self.city_names)
+        for city, error in self.weather_client.errors.items():
+            print(f"[天気取得エラー] {city}: {error}")
+        print(f"[天気取得] {self.weather_client.summary(self.city_names)}")
+        print(f"[キャッシュ] {self.weather_cache.summary()}")
+        return results
 
     def generate_outfit_advice(self, weather_data):
-        """OpenAI APIで服装アドバイスを生成"""
+        """OpenAI APIで服装アドバイスを生成（hybrid・localは表のアドバイスをすぐに返す）"""
         if not weather_data:
             return "天気情報を取得できませんでした。"
-
-        temp = weather_data['main']['temp']
-        feels_like = weather_data['main']['feels_like']
-        humidity = weather_data['main']['humidity']
-        desc = weather_data['weather'][0]['description']
-
-        prompt = f"""今日の天気: 気温{temp}°C, 体感{feels_like}°C, 湿度{humidity}%, {desc}
-この天気に合う服装を50文字以内で提案してください。"""
-
+        if self.advice_engine == 'local':
+            return local_advice(weather_data)
+        if self.advice_engine == 'hybrid':
+            advice = self.advice_cache.lookup(weather_data)
+            if advice is None:
+                # AIの生成は run() で全都市まとめて裏のスレッドに任せる（次回の実行から表示）
+                self._refine_pending.append(weather_data)
+                return local_advice(weather_data)
+            return advice
+
+        advice = self.advice_cache.get(weather_data, self._request_outfit_advice)
+        print(f"[キャッシュ] {self.advice_cache.summary()}")
+        return advice or "服装アドバイスを生成できませんでした。"
+
+    def _refine_advice(self, weather_list):
+        """
+        裏のスレッドでAIのアドバイスを生成してキャッシュに保存（ADVICE_ENGINE=hybrid）
+        daemonにしないので、プロセス終了前に保存まで完了する（時間は RUN_BUDGET_SEC で打ち切る）
+        """
+        def worker():
+            deadline = Deadline(self.run_budget)
+            for weather_data in weather_list:
+                if deadline.expired:
+                    print("[AI生成] 持ち時間切れのため、残りの都市は次回に生成")
+                    break
+                self.advice_cache.store_advice(weather_data,
+                                               self._request_outfit_advice(weather_data, deadline))
+
+        threading.Thread(target=worker, name="advice-refine").start()
+
+    def _request_outfit_advice(self, weather_data, deadline=None):
+        """AIにアドバイスを問い合わせ（失敗時はNone、deadline があれば残り時間で打ち切る）"""
         try:
-            response = self.openai_client.chat.completions.create(
+            client = self.openai_client
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None:
+                # 自動リトライは持ち時間を超えるので使わない
+                client = client.with_options(timeout=max(remaining, 0.001), max_retries=0)
+            start = time.perf_counter()
+            response = client.chat.completions.create(
                 model="gpt-5-mini",
-                messages=[
-                    {"role": "system", "content": "服装アドバイザーです。簡潔に回答してください。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=1000
+                messages=advice_messages(weather_data, self.advice_profile),
+                **self.advice_options  # 最大トークン数（推論+レスポンス）と推論の深さ
             )
+            metrics.observe_llm("single", time.perf_counter() - start, response.usage)
             return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"[AI生成エラー] {e}")
-            return "服装アドバイスを生成できませんでした。"
+            return None
 
     def run(self, loop_count=3):
         """メイン処理: 天気取得→アドバイス生成→OLED表示"""
-        # 天気データ取得
-        weather_data = self.get_weather_data()
-        if not weather_data:
+        # 天気データ取得（複数都市は並行して取得）
+        all_weather = self.get_weather_data()
+        self._refine_pending = []
+        texts = []
+        for weather_data in all_weather.values():
+            if not weather_data:
+                continue
+
+            # 服装アドバイス生成
+            advice = self.generate_outfit_advice(weather_data)
+
+            # 表示テキスト作成
+            temp = weather_data['main']['temp']
+            desc = weather_data['weather'][0]['description']
+            city = weather_data['name']
+            texts.append(f"{city}: {temp}°C {desc} | {advice}")
+
+        if self._refine_pending:
+            self._refine_advice(self._refine_pending)
+
+        if not texts:
             if self.scroller:
                 self.scroller.scroll("天気データ取得失敗", loops=1)
                 self.scroller.clear()
             return
 
-        # 服装アドバイス生成
-        advice = self.generate_outfit_advice(weather_data)
-
-        # 表示テキスト作成
-        temp = weather_data['main']['temp']
-        desc = weather_data['weather'][0]['description']
-        city = weather_data['name']
-        text = f"{city}: {temp}°C {desc} | {advice}"
-
-        # OLED表示
+        # OLED表示（複数都市は1回ずつ順番に切り替えて loop_count 周）
         if self.scroller:
-            self.scroller.scroll(text, speed=SCROLL_SPEED, delay=FRAME_DELAY, loops=loop_count)
+            rounds, loops = (1, loop_count) if len(texts) == 1 else (loop_count, 1)
+            for _ in range(rounds):
+                for text in texts:
+                    self.scroller.scroll(text, speed=SCROLL_SPEED, delay=FRAME_DELAY, loops=loops)
             self.scroller.clear()
         else:
-            print(f"[表示テキスト] {text}")
+            for text in texts:
+                print(f"[表示テキスト] {text}")
 
 
 def main():
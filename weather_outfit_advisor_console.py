@@ -12,13 +12,21 @@ import os
 import sys
 import time
 import logging
-import requests
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
+# requests・openai は読み込みが重いため、使う直前にインポートする
 try:
-    import openai
     from dotenv import load_dotenv
+    import metrics
+    from advisor_cache import WeatherCache, AdviceCache, WEATHER_CACHE_PATH, ADVICE_CACHE_PATH
+    from weather_client import WeatherClient, parse_city_names, OPENWEATHER_URL
+    from advice_batch import (SYSTEM_PROMPT, BATCH_RESPONSE_FORMAT, build_batch_prompt,
+                              batch_max_tokens, parse_batch_advice)
+    from latency_budget import Deadline
+    from advice_profiles import advice_messages, advice_options, advice_variant, check_profile
+    from local_advice import local_advice
 except ImportError as e:
     print(f"Required library not installed: {e}")
     print("Please run: pip install openai python-dotenv requests")
@@ -45,93 +53,218 @@ class WeatherOutfitAdvisorConsole:
         # 環境変数からAPIキーと都市名を取得
         self.weather_api_key = os.getenv('WEATHER_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.city_name = os.getenv('CITY_NAME', 'Tokyo')
+        self.city_names = parse_city_names(os.getenv('CITY_NAME'))  # カンマ区切りで複数指定可
+        self.city_name = self.city_names[0]
+
+        # 天気データのキャッシュ（TTL内ならAPIを呼ばない）
+        self.weather_cache = WeatherCache(
+            path=os.getenv('WEATHER_CACHE_PATH', WEATHER_CACHE_PATH),
+            ttl=float(os.getenv('WEATHER_CACHE_TTL_SEC', '600')),
+            stale_ttl=float(os.getenv('WEATHER_CACHE_STALE_SEC', '3600'))
+        )
+        # プロンプトプロファイル（standard, compact, minimal）と、推論の深さ・最大トークン数の上書き
+        self.advice_profile = os.getenv('ADVICE_PROFILE', 'standard').lower()
+        reasoning_effort = os.getenv('ADVICE_REASONING_EFFORT', '').lower()
+        check_profile(self.advice_profile, reasoning_effort)
+        self.advice_options = advice_options(self.advice_profile,
+                                             max_tokens=int(os.getenv('ADVICE_MAX_TOKENS', '0')),
+                                             reasoning_effort=reasoning_effort)
+        # 服装アドバイスのキャッシュ（気温・湿度がほぼ同じならAIを呼ばない、プロファイルごとに別のアドバイス）
+        self.advice_cache = AdviceCache(
+            path=os.getenv('ADVICE_CACHE_PATH', ADVICE_CACHE_PATH),
+            ttl=float(os.getenv('ADVICE_CACHE_TTL_SEC', '21600')),
+            max_entries=int(os.getenv('ADVICE_CACHE_MAX_ENTRIES', '200')),
+            temp_step=float(os.getenv('ADVICE_TEMP_STEP', '2')),
+            humidity_step=int(os.getenv('ADVICE_HUMIDITY_STEP', '10')),
+            variant=advice_variant(self.advice_profile, self.advice_options)
+        )
+        # 天気取得クライアント（HTTPセッションを使い回し、複数都市は並行取得）
+        self.weather_client = WeatherClient(
+            self.weather_api_key, cache=self.weather_cache,
+            max_workers=int(os.getenv('WEATHER_FETCH_WORKERS', '4')),
+            url=os.getenv('WEATHER_API_URL', OPENWEATHER_URL)
+        )
+        # 複数都市のアドバイスを1回のリクエストでまとめて生成するか
+        self.advice_batch = os.getenv('ADVICE_BATCH', 'true').lower() == 'true'
+        # アドバイスの作り方（hybrid: 表ですぐに表示しAIの生成は裏で行う, llm: AIを待つ, local: AIなし）
+        self.advice_engine = os.getenv('ADVICE_ENGINE', 'hybrid').lower()
+        if self.advice_engine not in ('hybrid', 'llm', 'local'):
+            raise ValueError(f"ADVICE_ENGINE must be hybrid, llm or local: {self.advice_engine}")
+        # hybrid の裏でのAI生成の持ち時間（秒、0で無制限）
+        self.run_budget = float(os.getenv('RUN_BUDGET_SEC', '20'))
+
+        # メトリクスの公開（Prometheus形式: ファイル出力とローカルHTTP）
+        metrics.start_exporter(textfile=os.getenv('METRICS_TEXTFILE'),
+                               port=int(os.getenv('METRICS_PORT', '0')))
 
         # APIキーが設定されていない場合はエラーを発生
         if not self.weather_api_key:
             raise ValueError("WEATHER_API_KEY not found in environment variables")
-        if not self.openai_api_key:
+        if self.advice_engine != 'local' and not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
 
-        # OpenAI クライアントの初期化
-        self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        # OpenAI クライアントは初回使用時に作成（openaiのインポートを遅らせる）
+        self._openai_client = None
 
         logger.info("Console version initialized (no LCD required)")
 
-    def get_weather_data(self) -> Optional[Dict[str, Any]]:
-        """OpenWeatherMap APIから天気データを取得"""
-        base_url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {
-            'q': self.city_name,
-            'appid': self.weather_api_key,
-            'units': 'metric',
-            'lang': 'ja'
-        }
-
-        try:
-            response = requests.get(base_url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch weather data: {e}")
-            return None
+    @property
+    def openai_client(self):
+        """OpenAIクライアント（初回アクセス時にopenaiをインポートして作成）"""
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+
+    def get_weather_data(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """全都市の天気データを並行して取得（キャッシュが有効ならAPIを呼ばずに返す）"""
+        results = self.weather_client.get_all(self.city_names)
+        for city, error in self.weather_client.errors.items():
+            logger.error(f"Failed to fetch weather data ({city}): {error}")
+        logger.info(self.weather_client.summary(self.city_names))
+        logger.info(self.weather_cache.summary())
+        return results
 
     def generate_outfit_advice(self, weather_data: Dict[str, Any]) -> str:
         """OpenAI APIを使って天気に基づいた服装アドバイスを生成"""
         if not weather_data:
             return "天気情報を取得できませんでした。"
+        if self.advice_engine != 'llm':
+            return self._local_first_advice([weather_data])[0]
 
-        # 天気データから必要な情報を抽出
-        temperature = weather_data['main']['temp']
-        feels_like = weather_data['main']['feels_like']
-        humidity = weather_data['main']['humidity']
-        weather_desc = weather_data['weather'][0]['description']
-
-        # OpenAI APIに送るプロンプトを作成
-        prompt = f"""
-今日の天気情報：
-- 気温: {temperature}°C
-- 体感温度: {feels_like}°C
-- 湿度: {humidity}%
-- 天気: {weather_desc}
-
-上記の天気情報を基に、今日の服装アドバイスを日本語で簡潔に(50文字以内で)提案してください。
-例：「薄手のジャケットがおすすめです」「傘を忘れずに」など
-"""
+        # 同じような天気のアドバイスが保存されていれば再利用
+        advice = self.advice_cache.get(weather_data, self._request_outfit_advice)
+        logger.info(self.advice_cache.summary())
+        if advice is None:
+            return "服装アドバイスを生成できませんでした。"
+        return advice
 
+    def _request_outfit_advice(self, weather_data: Dict[str, Any],
+                               deadline: Optional[Deadline] = None) -> Optional[str]:
+        """OpenAI APIに服装アドバイスを問い合わせ（失敗時はNone、deadline があれば残り時間で打ち切る）"""
         try:
-            # OpenAI APIを呼び出して服装アドバイスを生成
-            # gpt-5-mini: GPT-5の軽量モデル（推論機能付き）
-            # 参考実装: https://github.com/Murasan201/09-001-gpt-response-minimal
-            response = self.openai_client.chat.completions.create(
-                model="gpt-5-mini",  # GPT-5の軽量モデル
-                messages=[
-                    {"role": "system", "content": "あなたは天気に基づいた服装アドバイザーです。簡潔で実用的なアドバイスを提供してください。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=1000  # 推論トークン+レスポンストークンの合計
+            response, _, _ = self._create_completion(
+                advice_messages(weather_data, self.advice_profile),  # ADVICE_PROFILE のプロンプト
+                deadline=deadline,
+                **self.advice_options  # 最大トークン数（推論+レスポンス）と推論の深さ
             )
-
             advice = response.choices[0].message.content.strip()
-
-            # トークン使用状況をログ出力（GPT-5の推論トークンを含む）
-            usage = response.usage
             logger.info(f"Generated outfit advice: {advice}")
-            logger.info(f"Token usage - Total: {usage.total_tokens}, "
-                       f"Input: {usage.prompt_tokens}, "
-                       f"Output: {usage.completion_tokens}")
-
-            # GPT-5では推論トークン数も確認可能（存在する場合）
-            if hasattr(usage, 'completion_tokens_details'):
-                details = usage.completion_tokens_details
-                if hasattr(details, 'reasoning_tokens'):
-                    logger.info(f"Reasoning tokens: {details.reasoning_tokens}")
-
             return advice
 
         except Exception as e:
             logger.error(f"Failed to generate outfit advice: {e}")
-            return "服装アドバイスを生成できませんでした。"
+            return None
+
+    def generate_outfit_advice_batch(self, weather_list: List[Dict[str, Any]]) -> List[str]:
+        """複数都市の服装アドバイスを1回のリクエストでまとめて生成（不正な応答の都市だけ個別に生成）"""
+        if self.advice_engine != 'llm':
+            return self._local_first_advice(weather_list)
+        if len(weather_list) == 1 or not self.advice_batch:
+            return [self.generate_outfit_advice(weather_data) for weather_data in weather_list]
+
+        results = [self.advice_cache.lookup(weather_data) for weather_data in weather_list]
+        pending = [i for i, advice in enumerate(results) if advice is None]
+        if pending:
+            generated = self._generate_advice([weather_list[i] for i in pending])
+            for i, advice in zip(pending, generated):
+                results[i] = advice
+
+        logger.info(self.advice_cache.summary())
+        return [advice or "服装アドバイスを生成できませんでした。" for advice in results]
+
+    def _generate_advice(self, weather_list: List[Dict[str, Any]],
+                         deadline: Optional[Deadline] = None) -> List[Optional[str]]:
+        """
+        キャッシュに無い都市のアドバイスをAIで生成して保存（2都市以上は一括生成、失敗した都市はNone）
+        deadline があれば残り時間で打ち切り、期限切れ後の都市は生成しない
+        """
+        batch_advice = {}
+        tokens, elapsed = 0, 0.0
+        batch = len(weather_list) > 1 and self.advice_batch
+        if batch:
+            try:
+                response, tokens, elapsed = self._create_completion(
+                    [
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": build_batch_prompt(weather_list)}
+                    ],
+                    **dict(self.advice_options, max_completion_tokens=batch_max_tokens(len(weather_list))),
+                    response_format=BATCH_RESPONSE_FORMAT,  # 都市ごとのアドバイスをJSONで受け取る
+                    kind="batch",
+                    deadline=deadline
+                )
+                batch_advice = parse_batch_advice(response.choices[0].message.content, len(weather_list))
+            except Exception as e:
+                logger.error(f"Failed to generate batch outfit advice: {e}")
+
+        results = []
+        for position, weather_data in enumerate(weather_list):
+            advice = batch_advice.get(position)
+            if advice is None and not (deadline is not None and deadline.expired):
+                # 一括生成の応答が不正だった都市（1都市だけの場合も）は個別に生成
+                advice = self._request_outfit_advice(weather_data, deadline)
+            self.advice_cache.store_advice(weather_data, advice)
+            results.append(advice)
+
+        if batch:
+            logger.info(f"Batch advice: {len(weather_list)} cities in 1 request, {tokens} tokens, "
+                        f"{elapsed:.2f}s ({len(weather_list) - len(batch_advice)} retried individually)")
+        return results
+
+    def _local_first_advice(self, weather_list: List[Dict[str, Any]]) -> List[str]:
+        """
+        ローカルの表でアドバイスをすぐに作成（ADVICE_ENGINE=hybrid, local）
+        hybrid では、AIのアドバイスがキャッシュにある都市はそれを使い、無い都市は裏のスレッドで
+        AIに生成させてキャッシュに保存（次回の実行から表示）
+        """
+        if self.advice_engine == 'hybrid':
+            results = [self.advice_cache.lookup(weather_data) for weather_data in weather_list]
+        else:
+            results = [None] * len(weather_list)
+        pending = [weather_data for weather_data, advice in zip(weather_list, results) if advice is None]
+        results = [advice or local_advice(weather_data) for weather_data, advice in zip(weather_list, results)]
+
+        if pending and self.advice_engine == 'hybrid':
+            logger.info(self.advice_cache.summary())
+            # daemonにしないので、プロセス終了前にキャッシュへの保存まで完了する（RUN_BUDGET_SEC で打ち切る）
+            threading.Thread(target=self._generate_advice, args=(pending, Deadline(self.run_budget)),
+                             name="advice-refine").start()
+        return results
+
+    def _create_completion(self, messages: List[Dict[str, str]], kind: str = "single",
+                           deadline: Optional[Deadline] = None, **kwargs):
+        """OpenAI APIを呼び出し、トークン使用状況と所要時間をログ出力・メトリクスに記録（応答, トークン数, 秒）"""
+        client = self.openai_client
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None:
+            # 持ち時間の残りで打ち切る（自動リトライは持ち時間を超えるので使わない）
+            client = client.with_options(timeout=max(remaining, 0.001), max_retries=0)
+        # gpt-5-mini: GPT-5の軽量モデル（推論機能付き）
+        # 参考実装: https://github.com/Murasan201/09-001-gpt-response-minimal
+        start = time.perf_counter()
+        response = client.chat.completions.create(
+            model="gpt-5-mini",  # GPT-5の軽量モデル
+            messages=messages,
+            **kwargs
+        )
+        elapsed = time.perf_counter() - start
+
+        # トークン使用状況をログ出力（GPT-5の推論トークンを含む）
+        usage = response.usage
+        logger.info(f"Token usage - Total: {usage.total_tokens}, "
+                   f"Input: {usage.prompt_tokens}, "
+                   f"Output: {usage.completion_tokens}, "
+                   f"Time: {elapsed:.2f}s")
+
+        # GPT-5では推論トークン数も確認可能（存在する場合）
+        if hasattr(usage, 'completion_tokens_details'):
+            details = usage.completion_tokens_details
+            if hasattr(details, 'reasoning_tokens'):
+                logger.info(f"Reasoning tokens: {details.reasoning_tokens}")
+
+        metrics.observe_llm(kind, elapsed, usage)
+        return response, usage.total_tokens, elapsed
 
     def format_display_text(self, weather_data: Dict[str, Any], outfit_advice: str) -> str:
         """表示用のテキストを整形"""
@@ -185,24 +318,27 @@ class WeatherOutfitAdvisorConsole:
 
         # ステップ1: 天気データの取得
         logger.info("Fetching weather data...")
-        weather_data = self.get_weather_data()
+        all_weather = self.get_weather_data()
+        cities = [city for city, data in all_weather.items() if data]
 
-        if not weather_data:
+        if not cities:
             error_msg = "天気データ取得失敗"
             print(f"\n[ERROR] {error_msg}")
             logger.error("Failed to get weather data")
             return
 
-        # ステップ2: 服装アドバイスの生成
-        logger.info("Generating outfit advice...")
-        outfit_advice = self.generate_outfit_advice(weather_data)
+        # ステップ2: 服装アドバイスの生成（複数都市は1回のリクエストでまとめて生成）
+        logger.info(f"Generating outfit advice... ({', '.join(cities)})")
+        weather_list = [all_weather[city] for city in cities]
+        outfit_advice_list = self.generate_outfit_advice_batch(weather_list)
 
-        # ステップ3: 表示用テキストの整形
-        display_text = self.format_display_text(weather_data, outfit_advice)
-        logger.info(f"Display text: {display_text}")
+        for weather_data, outfit_advice in zip(weather_list, outfit_advice_list):
+            # ステップ3: 表示用テキストの整形
+            display_text = self.format_display_text(weather_data, outfit_advice)
+            logger.info(f"Display text: {display_text}")
 
-        # ステップ4: コンソール表示
-        self.display_console_text(display_text, scroll_delay=0.3, duration=display_duration)
+            # ステップ4: コンソール表示（都市ごとに順番に表示）
+            self.display_console_text(display_text, scroll_delay=0.3, duration=display_duration)
 
         # ステップ5: 終了処理
         print("\n" + "=" * 50)
@@ -6,20 +6,40 @@ OpenWeatherMap APIで天気を取得し、OpenAI APIで服装アドバイスを
 """
 
 # === 必要なライブラリのインポート ===
+# openai・requests・luma は読み込みに時間がかかるため、実際に使う直前にインポートする
+# （OLEDの初期化やエラー表示を、ネットワーク関連のライブラリを読み込む前に行える）
 import os
 import sys
 import time
+import signal
 import logging
-import requests
+import argparse
+import importlib
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 try:
-    import openai
     from dotenv import load_dotenv
-    from luma.core.interface.serial import i2c
-    from luma.oled.device import ssd1306
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
+    from glyph_atlas import GlyphAtlas, BitmapFont, bitmap_font_path
+    from frame_scheduler import FrameScheduler, AdaptiveFrameScheduler
+    import metrics
+    from oled_pages import DeltaDisplay, RecordingSerial, PackedStrip, send_pages
+    from frame_export import FrameRecorder
+    from strip_cache import StripCache, strip_key, STRIP_CACHE_PATH
+    from tiled_strip import TiledStrip, TILED_STRIP_THRESHOLD
+    from render_process import RenderProcess, JitterProbe
+    from advisor_cache import (JsonFileStore, WeatherCache, AdviceCache,
+                               WEATHER_CACHE_PATH, ADVICE_CACHE_PATH)
+    from latency_budget import (Deadline, HedgedCaller, LatencyTracker, hedged_caller,
+                                LATENCY_STATS_PATH)
+    from weather_client import WeatherClient, parse_city_names, OPENWEATHER_URL
+    from double_buffer import DoubleBuffer, StreamingText
+    from advice_batch import (SYSTEM_PROMPT, BATCH_RESPONSE_FORMAT, build_batch_prompt,
+                              batch_max_tokens, parse_batch_advice)
+    from local_advice import local_advice
+    from advice_profiles import advice_messages, advice_options, advice_variant, check_profile
 except ImportError as e:
     print(f"Required library not installed: {e}")
     print("Please run: pip install -r requirements.txt")
@@ -50,53 +70,203 @@ class WeatherOutfitAdvisor:
         """
         天気予報＋服装提案アドバイザーの初期化
 
-        環境変数(.env)からAPIキーと設定を読み込み、OpenAI APIクライアントと
-        SSD1306 OLEDディスプレイを初期化します
+        環境変数(.env)からAPIキーと設定を読み込み、SSD1306 OLEDディスプレイを初期化します
+        （OpenAI APIクライアントは初回使用時に作成）
         """
         # 環境変数からAPIキーと都市名を取得
         self.weather_api_key = os.getenv('WEATHER_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        self.city_name = os.getenv('CITY_NAME', 'Tokyo')  # デフォルトはTokyo
+        # 都市名（カンマ区切りで複数指定すると順番に表示、デフォルトはTokyo）
+        self.city_names = parse_city_names(os.getenv('CITY_NAME'))
+        self.city_name = self.city_names[0]
+
+        # 天気データのキャッシュ（現在の天気は約10分ごとにしか更新されないため再利用する）
+        self.weather_cache = WeatherCache(
+            path=os.getenv('WEATHER_CACHE_PATH', WEATHER_CACHE_PATH),      # 保存先（再起動後も有効）
+            ttl=float(os.getenv('WEATHER_CACHE_TTL_SEC', '600')),          # 新鮮とみなす秒数（0で無効）
+            stale_ttl=float(os.getenv('WEATHER_CACHE_STALE_SEC', '3600'))  # 期限切れでも裏で取り直しつつ使う秒数
+        )
+        # プロンプトプロファイル（standard, compact, minimal）と、推論の深さ・最大トークン数の上書き
+        # 比較は bench_prompts.py で計測できます
+        self.advice_profile = os.getenv('ADVICE_PROFILE', 'standard').lower()
+        reasoning_effort = os.getenv('ADVICE_REASONING_EFFORT', '').lower()
+        check_profile(self.advice_profile, reasoning_effort)
+        self.advice_options = advice_options(self.advice_profile,
+                                             max_tokens=int(os.getenv('ADVICE_MAX_TOKENS', '0')),
+                                             reasoning_effort=reasoning_effort)
+        # 服装アドバイスのキャッシュ（気温・湿度がほぼ同じならAIを呼ばずに再利用）
+        self.advice_cache = AdviceCache(
+            path=os.getenv('ADVICE_CACHE_PATH', ADVICE_CACHE_PATH),         # 保存先（再起動後も有効）
+            ttl=float(os.getenv('ADVICE_CACHE_TTL_SEC', '21600')),          # 再利用する秒数（0で無効）
+            max_entries=int(os.getenv('ADVICE_CACHE_MAX_ENTRIES', '200')),  # 保存件数の上限（LRUで削除）
+            temp_step=float(os.getenv('ADVICE_TEMP_STEP', '2')),            # 気温・体感温度をまとめる幅（°C）
+            humidity_step=int(os.getenv('ADVICE_HUMIDITY_STEP', '10')),     # 湿度をまとめる幅（%）
+            variant=advice_variant(self.advice_profile, self.advice_options)  # プロファイルごとに別のアドバイス
+        )
+        # 1回の更新（天気取得→アドバイス生成）全体の持ち時間（秒、0で無制限）
+        # 使い切ったら、取得できなかった都市は最後に取得・生成できた天気とアドバイスで表示する
+        self.run_budget = float(os.getenv('RUN_BUDGET_SEC', '20'))
+        # p95を過ぎても返らない呼び出しには2本目を出し（ヘッジ）、失敗が続く接続先はしばらく呼ばない
+        latency_store = JsonFileStore(os.getenv('LATENCY_STATS_PATH', LATENCY_STATS_PATH))  # 応答時間の記録
+        hedge = os.getenv('HEDGE_REQUESTS', 'true').lower() == 'true'
+        quantile = float(os.getenv('HEDGE_QUANTILE', '0.95'))
+        failures = int(os.getenv('CIRCUIT_FAILURES', '3'))           # 連続失敗で遮断（0で無効）
+        reset_timeout = float(os.getenv('CIRCUIT_RESET_SEC', '60'))  # 遮断してから再び試すまでの秒数
+        self.weather_caller = hedged_caller('weather', latency_store, initial=1.0, hedge=hedge,
+                                            quantile=quantile, failures=failures, reset_timeout=reset_timeout)
+        self.advice_caller = hedged_caller('advice', latency_store, initial=8.0, hedge=hedge,
+                                           quantile=quantile, failures=failures, reset_timeout=reset_timeout)
+        # 一括生成は応答時間が違うので別に記録（接続先は同じなのでサーキットブレーカーは共有）
+        self.advice_batch_caller = HedgedCaller(
+            'advice_batch', LatencyTracker('advice_batch', latency_store, initial=15.0),
+            self.advice_caller.breaker, quantile=quantile, hedge=hedge)
+        # 天気取得クライアント（1つのHTTPセッションを使い回し、複数都市は並行取得）
+        self.weather_client = WeatherClient(
+            self.weather_api_key, cache=self.weather_cache,
+            max_workers=int(os.getenv('WEATHER_FETCH_WORKERS', '4')),  # 同時に取得する都市数
+            url=os.getenv('WEATHER_API_URL', OPENWEATHER_URL),           # APIのエンドポイント（計測時の代替サーバー用）
+            caller=self.weather_caller
+        )
+        # アドバイスの作り方: hybrid=ローカルの表ですぐに表示し、AIの生成は裏で行って次の更新から使う
+        # llm=AIの生成を待って表示、local=AIを使わない（OPENAI_API_KEY不要・完全オフライン）
+        self.advice_engine = os.getenv('ADVICE_ENGINE', 'hybrid').lower()
+        if self.advice_engine not in ('hybrid', 'llm', 'local'):
+            raise ValueError(f"ADVICE_ENGINE must be hybrid, llm or local: {self.advice_engine}")
+        self._refine_thread = None  # AIでアドバイスを生成し直しているスレッド（hybrid）
+        # 複数都市のアドバイスを1回のリクエストでまとめて生成するか
+        self.advice_batch = os.getenv('ADVICE_BATCH', 'true').lower() == 'true'
+        # 1都市のとき、アドバイスの生成完了を待たずにスクロールを始め、届いた文字から追加表示するか
+        self.advice_stream = os.getenv('ADVICE_STREAM', 'true').lower() == 'true'
+        # 一括生成の後、比較のため都市ごとの個別生成も実行して所要時間・トークン数を記録（費用が増えるので計測時のみ）
+        self.advice_batch_compare = os.getenv('ADVICE_BATCH_COMPARE', 'false').lower() == 'true'
 
         # OLEDディスプレイ設定（.envファイルから読み込み）
         self.oled_width = int(os.getenv('OLED_WIDTH', '128'))      # 画面幅（通常128）
         self.oled_height = int(os.getenv('OLED_HEIGHT', '64'))     # 画面高さ（64または32）
         self.oled_i2c_address = int(os.getenv('OLED_I2C_ADDRESS', '0x3C'), 16)  # I²Cアドレス（通常0x3Cまたは0x3D）
+        self.oled_delta = os.getenv('OLED_DELTA', 'true').lower() == 'true'  # 変化したページだけ送信
+        self.oled_backend = os.getenv('OLED_BACKEND', 'i2c')  # i2c=実機, mock/dummy=送信内容を記録するだけ（実機なし）
+        # export=画面なしでフレームをファイルに書き出す（待機なしで全速描画、.gif/.raw/それ以外はPNG連番のディレクトリ）
+        self.oled_export_path = os.getenv('OLED_EXPORT_PATH') or None
 
         # フォント設定
         self.font_path = os.getenv('FONT_PATH', './assets/fonts/NotoSansCJKjp-Regular.otf')  # 日本語フォントのパス
         self.font_size = int(os.getenv('FONT_SIZE', '14'))         # フォントサイズ（14推奨）
+        self.glyph_cache_bytes = int(os.getenv('GLYPH_CACHE_KB', '256')) * 1024  # グリフキャッシュ上限
+        # 描画済みストリップのディスクキャッシュ（再起動後も同じテキストはFreeTypeを使わずに表示）
+        self.strip_cache = StripCache(
+            path=os.getenv('STRIP_CACHE_PATH', STRIP_CACHE_PATH),              # 保存先ディレクトリ
+            max_bytes=int(os.getenv('STRIP_CACHE_KB', '4096')) * 1024        # 合計サイズの上限（0で無効）
+        )
+        # 事前描画済みビットマップフォント（build_bitmap_font.py で作成、無ければOTFのみ使用）
+        self.bitmap_font_path = os.getenv('BITMAP_FONT_PATH', bitmap_font_path(self.font_path, self.font_size))
 
         # スクロール設定
         self.scroll_speed = int(os.getenv('SCROLL_SPEED_PX', '2'))      # スクロール速度（ピクセル/フレーム）
-        self.frame_delay = float(os.getenv('FRAME_DELAY_SEC', '0.05'))  # フレーム間隔（秒）
-
-        # APIキーが設定されていない場合はエラーを発生
+        self.frame_delay = float(os.getenv('FRAME_DELAY_SEC', '0.05'))  # フレーム周期（秒、描画・転送込み）
+        # スクロール速度をピクセル/秒で保つ（0で無効: SCROLL_SPEED_PX と FRAME_DELAY_SEC で固定）
+        # 負荷が高いときはフレーム周期を FRAME_DELAY_SEC〜SCROLL_MAX_FRAME_DELAY_SEC の間で延ばし、1フレームの移動量を増やす
+        self.scroll_velocity = float(os.getenv('SCROLL_VELOCITY_PX_SEC', '0'))
+        self.scroll_max_frame_delay = float(os.getenv('SCROLL_MAX_FRAME_DELAY_SEC', '0.2'))
+        self.scroll_prerender = os.getenv('SCROLL_PRERENDER', 'true').lower() == 'true'  # ストリップ事前描画
+        # 事前描画したストリップをSSD1306のページ形式に一括変換し、フレームはそのスライスを直接送信
+        self.scroll_packed = os.getenv('SCROLL_PACKED', 'true').lower() == 'true'
+        # これより幅の広いストリップ（長いアドバイス・複数都市）は表示位置の周辺だけをタイルに描画
+        self.scroll_strip_max_px = int(os.getenv('SCROLL_STRIP_MAX_PX', str(TILED_STRIP_THRESHOLD)))
+
+        # メトリクスの公開（Prometheus形式: ファイル出力とローカルHTTP、どちらも未設定なら記録のみ）
+        metrics.start_exporter(
+            textfile=os.getenv('METRICS_TEXTFILE'),         # 例: /var/lib/node_exporter/textfile/advisor.prom
+            port=int(os.getenv('METRICS_PORT', '0'))        # 例: 9101 → http://127.0.0.1:9101/metrics
+        )
+
+        # OLEDディスプレイの初期化（APIキーのエラーもOLEDに表示できるよう先に行う）
+        self._init_oled()
+
+        # APIキーが設定されていない場合はエラーを発生（ADVICE_ENGINE=local ならOpenAIのキーは不要）
+        openai_key_required = self.advice_engine != 'local'
+        if not self.weather_api_key or (openai_key_required and not self.openai_api_key):
+            self.show_message("APIキー未設定")
+            time.sleep(5)
         if not self.weather_api_key:
             raise ValueError("WEATHER_API_KEY not found in environment variables")
-        if not self.openai_api_key:
+        if openai_key_required and not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
 
-        # OpenAI クライアントの初期化
-        self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        # OpenAI クライアントは初回使用時に作成（openaiのインポートを遅らせる）
+        self._openai_client = None
+        self._llm_tokens = 0  # このプロセスで使用したトークン数の累計
+
+    @property
+    def openai_client(self):
+        """
+        OpenAI APIクライアント（初回アクセス時にopenaiをインポートして作成）
+        """
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+
+    def _init_oled(self):
+        """
+        SSD1306 OLEDディスプレイとフォントを初期化（失敗時は self.oled = None）
+        """
+        self.oled = None
+        self.oled_serial = None  # 使用中のシリアルインターフェース（mock/dummyでは送信バイト数を確認できる）
+        self.atlas = None
+
+        if self.oled_backend == 'export':
+            # 画面なし: 表示されるはずの1ビットのフレームをそのままファイルに書き出す（I²C・luma.oledは不要）
+            try:
+                self.oled = FrameRecorder(self.oled_export_path, self.oled_width, self.oled_height,
+                                          self.frame_delay)
+            except (OSError, ValueError) as e:
+                logger.error(f"[フレーム書き出し初期化]エラー: {e}")
+                logger.error("ヒント: OLED_EXPORT_PATH の書き込み先を確認してください")
+                return
+            logger.info(f"OLEDバックエンド: export（{self.oled.summary()}）")
+            self._init_font()
+            return
+
+        # luma.oled はここで初めてインポートする
+        try:
+            from luma.core.interface.serial import i2c
+            from luma.oled.device import ssd1306
+        except ImportError as e:
+            logger.error(f"Required library not installed: {e}")
+            logger.error("Please run: pip install -r requirements.txt")
+            return
 
-        # OLEDディスプレイの初期化
         # I²Cインターフェース初期化（Raspberry Pi 5ではポート1: GPIO2=SDA, GPIO3=SCL）
         try:
-            serial = i2c(port=1, address=self.oled_i2c_address)
-            logger.info(f"I²C初期化完了: アドレス 0x{self.oled_i2c_address:02X}, ポート 1")
+            if self.oled_backend in ('mock', 'dummy'):
+                # 実機なしで動作確認・計測するためのシリアル（送信バイト数だけ集計）
+                serial = RecordingSerial(record=False)
+                logger.info(f"OLEDバックエンド: {self.oled_backend}（実機には送信しません）")
+            else:
+                serial = i2c(port=1, address=self.oled_i2c_address)
+                logger.info(f"I²C初期化完了: アドレス 0x{self.oled_i2c_address:02X}, ポート 1")
         except Exception as e:
             logger.error(f"[I²C初期化]エラー: {e}")
             logger.error("対処方法: I²C設定と配線を確認してください")
             logger.error("ヒント: raspi-config で I²C を有効化")
             logger.error("ヒント: i2cdetect -y 1 でデバイスを確認")
-            self.oled = None
-            self.font = None
             return
 
         # SSD1306デバイスの初期化
         try:
-            self.oled = ssd1306(serial, width=self.oled_width, height=self.oled_height)
+            if self.oled_backend == 'dummy':
+                # lumaのダミーデバイス: SSD1306ドライバのページ変換・送信を通さず、表示内容を保持するだけ
+                from luma.core.device import dummy
+                self.oled = dummy(width=self.oled_width, height=self.oled_height, mode='1',
+                                  serial_interface=serial)
+            else:
+                self.oled = ssd1306(serial, width=self.oled_width, height=self.oled_height)
+            self.oled_serial = serial
+            if self.oled_delta:
+                # 差分転送ラッパー: 前回と変化したページ・列範囲だけをI²Cで送る
+                # （128×64の全画面は1KiB。テキスト行が変わるのは2〜3ページ程度）
+                self.oled = DeltaDisplay(self.oled)
             self.oled.contrast(255)  # コントラストを最大に設定（明るさ調整）
             logger.info(f"OLED初期化完了: {self.oled_width}×{self.oled_height}")
             logger.info("コントラスト設定: 255 (最大)")
@@ -105,112 +275,448 @@ class WeatherOutfitAdvisor:
             logger.error("対処方法: デバイスとの通信を確認してください")
             logger.error("ヒント: I²C配線確認（SDA=GPIO2, SCL=GPIO3, VCC=3.3V, GND）")
             self.oled = None
-            self.font = None
             return
 
+        self._init_font()
+
+    def _init_font(self):
+        """
+        日本語フォントとグリフアトラスを初期化（失敗時は self.atlas = None）
+        """
         # 日本語フォントの読み込み
+        # 描画済みの文字（グリフ）はアトラスにキャッシュし、次回からは貼り付けだけで描画する
+        # ビットマップフォントがあればメモリマップで即座に読み込み、OTFは収録外の文字が出たときだけ読む
+        bitmap_font = None
+        if os.path.exists(self.bitmap_font_path):
+            try:
+                bitmap_font = BitmapFont(self.bitmap_font_path)
+                if bitmap_font.font_size != self.font_size:
+                    logger.warning(f"ビットマップフォントのサイズ({bitmap_font.font_size})が"
+                                   f"FONT_SIZE({self.font_size})と異なるため使用しません")
+                    bitmap_font = None
+                else:
+                    logger.info(f"ビットマップフォント読み込み完了: {self.bitmap_font_path}（{len(bitmap_font)}文字）")
+            except (OSError, ValueError) as e:
+                logger.warning(f"[ビットマップフォント読み込み]エラー: {e}")
+                logger.warning("ヒント: python build_bitmap_font.py で作り直してください")
+                bitmap_font = None
+
+        self.atlas = GlyphAtlas(self.font_path, self.font_size,
+                                max_bytes=self.glyph_cache_bytes, bitmap_font=bitmap_font)
+        if bitmap_font is not None:
+            return
+
         try:
-            self.font = ImageFont.truetype(self.font_path, self.font_size)
+            self.atlas.font  # OTFを読み込んで存在を確認
             logger.info(f"フォント読み込み完了: {self.font_path}, サイズ {self.font_size}")
         except IOError as e:
             logger.error(f"[フォント読み込み]エラー: {e}")
             logger.error(f"対処方法: フォントファイルを {self.font_path} に配置してください")
             logger.error("ヒント: Noto Sans CJK JP などの OFL ライセンスフォントを使用")
             logger.error("ヒント: 相対パスの場合、スクリプト実行ディレクトリからのパスを確認")
-            self.font = None
+            self.atlas = None
 
-    def get_weather_data(self) -> Optional[Dict[str, Any]]:
+    def get_weather_data(self, city: Optional[str] = None,
+                         deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
         """
-        OpenWeatherMap APIから天気データを取得
+        天気データを取得（キャッシュが有効ならAPIを呼ばずに返す）
+
+        Args:
+            city (str): 都市名（省略時はCITY_NAMEの先頭の都市）
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
 
         Returns:
             dict: 天気データ（気温、湿度、天気など）を含む辞書
-                  取得失敗時はNoneを返す
+                  取得失敗時は最後に取得できたデータ、それも無ければNoneを返す
         """
-        # OpenWeatherMap API のエンドポイント
-        base_url = "https://api.openweathermap.org/data/2.5/weather"
-
-        # APIリクエストパラメータ
-        params = {
-            'q': self.city_name,                # 都市名（例: Tokyo, Osaka）
-            'appid': self.weather_api_key,      # APIキー
-            'units': 'metric',                  # 温度単位（metric=摂氏、imperial=華氏）
-            'lang': 'ja'                        # 言語（ja=日本語）
-        }
+        city = city or self.city_name
+        weather_data = self.weather_client.get(city, deadline)
+        if city in self.weather_client.errors:
+            logger.error(f"Failed to fetch weather data ({city}): {self.weather_client.errors[city]}")
+        if city in self.weather_client.fallbacks:
+            logger.warning(f"{self.weather_client.fallbacks[city] / 60:.0f}分前の天気データで代用: {city}")
+        logger.info(self.weather_cache.summary())
+        return weather_data
+
+    def get_all_weather_data(self, deadline: Optional[Deadline] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        CITY_NAMEの全都市の天気データを並行して取得
 
-        try:
-            response = requests.get(base_url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Failed to fetch weather data: {e}")
-            return None
+        Args:
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
 
-    def generate_outfit_advice(self, weather_data: Dict[str, Any]) -> str:
+        Returns:
+            dict: 都市名 → 天気データ（取得失敗は最後に取得できたデータかNone、CITY_NAMEの順）
+        """
+        results = self.weather_client.get_all(self.city_names, deadline)
+        for city, error in self.weather_client.errors.items():
+            if city in results:
+                logger.error(f"Failed to fetch weather data ({city}): {error}")
+        logger.info(self.weather_client.summary(self.city_names))
+        logger.info(self.weather_cache.summary())
+        return results
+
+    def generate_outfit_advice(self, weather_data: Dict[str, Any],
+                               deadline: Optional[Deadline] = None) -> str:
         """
         OpenAI APIを使って天気に基づいた服装アドバイスを生成
 
         Args:
             weather_data (dict): get_weather_data()から取得した天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
 
         Returns:
             str: 服装アドバイスの文字列（50文字以内）
-                 エラー時はエラーメッセージを返す
+                 生成できなかった場合はその都市の前回のアドバイス、それも無ければエラーメッセージを返す
         """
         if not weather_data:
             return "天気情報を取得できませんでした。"
+        if self.advice_engine != 'llm':
+            return self._local_first_advice([weather_data])[0]
+
+        # 同じような天気のアドバイスが保存されていれば、AIを呼ばずに再利用
+        advice = self.advice_cache.get(weather_data, lambda data: self._request_outfit_advice(data, deadline))
+        logger.info(self.advice_cache.summary())
+        if advice is None:
+            return self._fallback_advice(weather_data)
+        return advice
+
+    def _request_outfit_advice(self, weather_data: Dict[str, Any],
+                               deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        OpenAI APIを呼び出して服装アドバイスを生成（キャッシュにない場合のみ呼ばれる）
+        期限・ヘッジ・サーキットブレーカーつきで呼び出す（advice_caller）
 
-        # 天気データから必要な情報を抽出
-        temperature = weather_data['main']['temp']          # 気温（摂氏）
-        feels_like = weather_data['main']['feels_like']    # 体感温度（摂氏）
-        humidity = weather_data['main']['humidity']        # 湿度（%）
-        weather_desc = weather_data['weather'][0]['description']  # 天気の説明（日本語）
-
-        # OpenAI APIに送るプロンプトを作成
-        prompt = f"""
-今日の天気情報：
-- 気温: {temperature}°C
-- 体感温度: {feels_like}°C
-- 湿度: {humidity}%
-- 天気: {weather_desc}
-
-上記の天気情報を基に、今日の服装アドバイスを日本語で簡潔に(50文字以内で)提案してください。
-例：「薄手のジャケットがおすすめです」「傘を忘れずに」など
-"""
+        Args:
+            weather_data (dict): 天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+
+        Returns:
+            str: 服装アドバイス（失敗・期限切れ時はNone。エラーメッセージはキャッシュしない）
+        """
+        def request(timeout):
+            try:
+                response, _, _ = self._create_completion(
+                    self._advice_messages(weather_data),
+                    timeout=timeout,
+                    **self.advice_options  # 最大トークン数（推論+レスポンス）と推論の深さ
+                )
+            except Exception as e:
+                logger.error(f"Failed to generate outfit advice: {e}")
+                return None
+            advice = response.choices[0].message.content.strip()
+            logger.info(f"Generated outfit advice: {advice}")
+            return advice
+
+        return self.advice_caller.call(request, deadline)
+
+    def _fallback_advice(self, weather_data: Dict[str, Any]) -> str:
+        """
+        アドバイスを生成できなかった都市の表示用アドバイス（その都市で最後に生成できたアドバイス）
+
+        Args:
+            weather_data (dict): 天気データ
+
+        Returns:
+            str: 前回のアドバイス（無ければエラーメッセージ）
+        """
+        advice = self.advice_cache.last_good(weather_data)
+        if advice is None:
+            logger.warning(f"アドバイスを生成できないため、ローカルの表で作成: {weather_data.get('name')}")
+            return local_advice(weather_data)
+        logger.warning(f"アドバイスを生成できないため、前回のアドバイスで代用: {weather_data.get('name')}")
+        return advice
+
+    def _local_first_advice(self, weather_list: List[Dict[str, Any]]) -> List[str]:
+        """
+        ローカルの表でアドバイスをすぐに作成（ADVICE_ENGINE=hybrid, local）
+
+        hybrid では、AIのアドバイスがキャッシュにある都市はそれを使い、無い都市はローカルの
+        アドバイスで表示しつつ、裏のスレッドでAIに生成させてキャッシュに保存します（次の更新から表示）
+
+        Args:
+            weather_list (list): 都市ごとの天気データ
+
+        Returns:
+            list: 都市ごとの服装アドバイス（weather_listと同じ順）
+        """
+        start = time.perf_counter()
+        if self.advice_engine == 'hybrid':
+            results = [self.advice_cache.lookup(weather_data) for weather_data in weather_list]
+        else:
+            results = [None] * len(weather_list)
+        pending = [weather_data for weather_data, advice in zip(weather_list, results) if advice is None]
+        results = [advice or local_advice(weather_data) for weather_data, advice in zip(weather_list, results)]
+        logger.info(f"ローカルのアドバイス {len(pending)}都市（{(time.perf_counter() - start) * 1000:.2f}ms）")
+
+        if pending and self.advice_engine == 'hybrid':
+            logger.info(self.advice_cache.summary())
+            self._refine_advice(pending)
+        return results
+
+    def _refine_advice(self, weather_list: List[Dict[str, Any]]):
+        """
+        裏のスレッドでAIのアドバイスを生成してキャッシュに保存（ADVICE_ENGINE=hybrid）
+        （daemonにしないので、cronの1回実行でもプロセス終了前に保存まで完了する。
+        時間は RUN_BUDGET_SEC で打ち切る）
+
+        Args:
+            weather_list (list): AIのアドバイスがキャッシュに無い都市の天気データ
+        """
+        if self._refine_thread is not None and self._refine_thread.is_alive():
+            return  # 前回の生成中（終わったら次の更新で残りを生成）
+
+        def worker():
+            deadline = Deadline(self.run_budget)
+            batch_advice = {}
+            if len(weather_list) > 1 and self.advice_batch:
+                batch_advice, _, _ = self._request_outfit_advice_batch(weather_list, deadline)
+            for position, weather_data in enumerate(weather_list):
+                advice = batch_advice.get(position) or self._request_outfit_advice(weather_data, deadline)
+                self.advice_cache.store_advice(weather_data, advice)
+            logger.info(f"AIのアドバイスを保存（{len(weather_list)}都市、次の更新から表示）: "
+                        f"{self.latency_summary(deadline)}")
+
+        self._refine_thread = threading.Thread(target=worker, name="advice-refine")
+        self._refine_thread.start()
+
+    def _advice_messages(self, weather_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        1都市ぶんの服装アドバイスを依頼するチャットメッセージを作成（ADVICE_PROFILE のプロンプト）
+
+        Args:
+            weather_data (dict): 天気データ
+
+        Returns:
+            list: チャットメッセージ
+        """
+        return advice_messages(weather_data, self.advice_profile)
+
+    def _stream_outfit_advice(self, weather_data: Dict[str, Any], stream: StreamingText,
+                              deadline: Optional[Deadline] = None):
+        """
+        OpenAI APIのストリーミング応答で服装アドバイスを生成し、届いた文字から stream に追加
+        （表示とは別のスレッドで実行）
+
+        1都市ぶんの呼び出しと同じく、期限とサーキットブレーカー（advice_caller）の対象です。
+        文字が届く前に失敗・期限切れになった場合は、前回のアドバイス（無ければローカルの表）を追加します
+
+        Args:
+            weather_data (dict): 天気データ
+            stream (StreamingText): アドバイスの追加先（終了時に finish() する。代用のアドバイスは error つき）
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
+        """
+        error = None
+        usage = None
+        start = time.monotonic()
+        timed_out = False
+        if not self.advice_caller.admit(deadline):
+            error = RuntimeError("期限切れまたは遮断中のため生成しません")
+            stream.append(self._fallback_advice(weather_data))
+            stream.finish(error)
+            return
 
         try:
-            # OpenAI APIを呼び出して服装アドバイスを生成
-            # gpt-5-mini: GPT-5の軽量モデル（推論機能付き）
-            # 参考実装: https://github.com/Murasan201/09-001-gpt-response-minimal
-            response = self.openai_client.chat.completions.create(
+            client = self.openai_client
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None:
+                # 全体の残り時間で打ち切る（自動リトライは期限を超えるので使わない）
+                client = client.with_options(timeout=max(remaining, 0.001), max_retries=0)
+            response = client.chat.completions.create(
                 model="gpt-5-mini",  # GPT-5の軽量モデル
-                messages=[
-                    {"role": "system", "content": "あなたは天気に基づいた服装アドバイザーです。簡潔で実用的なアドバイスを提供してください。"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=1000  # 推論トークン+レスポンストークンの合計
+                messages=self._advice_messages(weather_data),
+                **self.advice_options,  # 最大トークン数（推論+レスポンス）と推論の深さ
+                stream=True,
+                stream_options={"include_usage": True}  # 最後のチャンクでトークン使用状況を受け取る
             )
+            for chunk in response:
+                if deadline is not None and deadline.expired:
+                    # タイムアウトはチャンクごとの待ち時間なので、全体の期限はここで確認する
+                    response.close()
+                    timed_out = True
+                    raise TimeoutError("ストリーミング応答が期限までに終わりませんでした")
+                if chunk.choices and chunk.choices[0].delta.content:
+                    stream.append(chunk.choices[0].delta.content)
+                if chunk.usage:
+                    usage = chunk.usage
+                    logger.info(f"Token usage - Total: {chunk.usage.total_tokens}, "
+                               f"Input: {chunk.usage.prompt_tokens}, "
+                               f"Output: {chunk.usage.completion_tokens}")
+                    self._llm_tokens += chunk.usage.total_tokens
+            logger.info(f"Generated outfit advice: {stream.text.strip()}")
+        except Exception as e:
+            logger.error(f"Failed to generate outfit advice: {e}")
+            error = e
+            if not stream.text:
+                stream.append(self._fallback_advice(weather_data))
+        finally:
+            self.advice_caller.settle(time.monotonic() - start if error is None else None,
+                                      timed_out=timed_out or (deadline is not None and deadline.expired))
+            stream.finish(error)
+            metrics.observe_llm("stream", stream.finished_at - stream.started_at, usage)
+
+    def generate_outfit_advice_batch(self, weather_list: List[Dict[str, Any]],
+                                     deadline: Optional[Deadline] = None) -> List[str]:
+        """
+        複数都市の服装アドバイスを1回のリクエストでまとめて生成
 
-            advice = response.choices[0].message.content.strip()
+        キャッシュにある都市は再利用し、残りの都市をJSON形式（構造化出力）で一括生成します。
+        応答の検証に通らなかった都市だけ、個別のリクエストで生成し直します
 
-            # トークン使用状況をログ出力（GPT-5の推論トークンを含む）
-            usage = response.usage
-            logger.info(f"Generated outfit advice: {advice}")
-            logger.info(f"Token usage - Total: {usage.total_tokens}, "
-                       f"Input: {usage.prompt_tokens}, "
-                       f"Output: {usage.completion_tokens}")
+        Args:
+            weather_list (list): 都市ごとの天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
 
-            # GPT-5では推論トークン数も確認可能（存在する場合）
-            if hasattr(usage, 'completion_tokens_details'):
-                details = usage.completion_tokens_details
-                if hasattr(details, 'reasoning_tokens'):
-                    logger.info(f"Reasoning tokens: {details.reasoning_tokens}")
+        Returns:
+            list: 都市ごとの服装アドバイス（weather_listと同じ順、失敗した都市は前回のアドバイスかエラーメッセージ）
+        """
+        if self.advice_engine != 'llm':
+            return self._local_first_advice(weather_list)
+        if len(weather_list) == 1 or not self.advice_batch:
+            return [self.generate_outfit_advice(weather_data, deadline) for weather_data in weather_list]
+
+        results = [self.advice_cache.lookup(weather_data) for weather_data in weather_list]
+        pending = [i for i, advice in enumerate(results) if advice is None]
+
+        if len(pending) > 1:
+            pending_weather = [weather_list[i] for i in pending]
+            batch_advice, batch_tokens, batch_time = self._request_outfit_advice_batch(pending_weather, deadline)
+
+            fallback_tokens = 0
+            fallback_time = 0.0
+            for position, i in enumerate(pending):
+                advice = batch_advice.get(position)
+                if advice is None:
+                    # 一括生成の応答が不正だった都市だけ個別に生成
+                    logger.warning(f"一括生成の応答が不正なため個別に生成: {weather_list[i].get('name')}")
+                    start_tokens = self._llm_tokens
+                    start = time.perf_counter()
+                    advice = self._request_outfit_advice(weather_list[i], deadline)
+                    fallback_time += time.perf_counter() - start
+                    fallback_tokens += self._llm_tokens - start_tokens
+                self.advice_cache.store_advice(weather_list[i], advice)
+                results[i] = advice
+
+            logger.info(f"一括生成: {len(pending)}都市を1リクエスト, {batch_tokens}トークン, {batch_time:.2f}秒"
+                        f"（個別に生成し直し {len(pending) - len(batch_advice)}都市, "
+                        f"{fallback_tokens}トークン, {fallback_time:.2f}秒）")
+            if self.advice_batch_compare:
+                self._compare_single_requests(pending_weather, batch_tokens + fallback_tokens,
+                                              batch_time + fallback_time)
+        elif pending:
+            i = pending[0]
+            results[i] = self._request_outfit_advice(weather_list[i], deadline)
+            self.advice_cache.store_advice(weather_list[i], results[i])
+
+        logger.info(self.advice_cache.summary())
+        return [advice or self._fallback_advice(weather_data)
+                for weather_data, advice in zip(weather_list, results)]
+
+    def _request_outfit_advice_batch(self, weather_list: List[Dict[str, Any]],
+                                     deadline: Optional[Deadline] = None):
+        """
+        複数都市のアドバイスを1回のリクエストで生成し、応答を検証して分割
+        期限・ヘッジ・サーキットブレーカーつきで呼び出す（advice_batch_caller）
 
-            return advice
+        Args:
+            weather_list (list): 都市ごとの天気データ
+            deadline (Deadline): 1回の更新全体の期限（Noneなら期限なし）
 
-        except Exception as e:
-            logger.error(f"Failed to generate outfit advice: {e}")
-            return "服装アドバイスを生成できませんでした。"
+        Returns:
+            tuple: (位置 → アドバイス の辞書（検証に通った都市のみ）, 使用トークン数, 所要時間（秒）)
+        """
+        def request(timeout):
+            try:
+                return self._create_completion(
+                    [
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": build_batch_prompt(weather_list)}
+                    ],
+                    timeout=timeout,
+                    kind="batch",
+                    # 推論の深さはプロファイルと同じ、最大トークン数は都市数に合わせる
+                    **dict(self.advice_options, max_completion_tokens=batch_max_tokens(len(weather_list))),
+                    response_format=BATCH_RESPONSE_FORMAT  # 都市ごとのアドバイスをJSONで受け取る
+                )
+            except Exception as e:
+                logger.error(f"Failed to generate batch outfit advice: {e}")
+                return None
+
+        result = self.advice_batch_caller.call(request, deadline)
+        if result is None:
+            return {}, 0, 0.0
+        response, tokens, elapsed = result
+
+        batch_advice = parse_batch_advice(response.choices[0].message.content, len(weather_list))
+        for position, advice in sorted(batch_advice.items()):
+            logger.info(f"Generated outfit advice ({weather_list[position].get('name')}): {advice}")
+        return batch_advice, tokens, elapsed
+
+    def _compare_single_requests(self, weather_list: List[Dict[str, Any]], batch_tokens: int,
+                                 batch_time: float):
+        """
+        比較用に都市ごとの個別リクエストを実行し、一括生成とのトークン数・所要時間を記録
+
+        Args:
+            weather_list (list): 一括生成した都市の天気データ
+            batch_tokens (int): 一括生成（個別の生成し直しを含む）の使用トークン数
+            batch_time (float): 一括生成（個別の生成し直しを含む）の所要時間（秒）
+        """
+        start_tokens = self._llm_tokens
+        start = time.perf_counter()
+        for weather_data in weather_list:
+            self._request_outfit_advice(weather_data)
+        single_time = time.perf_counter() - start
+        single_tokens = self._llm_tokens - start_tokens
+        logger.info(f"一括生成と個別生成の比較（{len(weather_list)}都市）: "
+                    f"一括 {batch_tokens}トークン {batch_time:.2f}秒 / "
+                    f"個別 {single_tokens}トークン {single_time:.2f}秒")
+
+    def _create_completion(self, messages: List[Dict[str, str]], kind: str = "single",
+                           timeout: Optional[float] = None, **kwargs):
+        """
+        OpenAI APIを呼び出し、トークン使用状況と所要時間をログ出力・メトリクスに記録
+
+        Args:
+            messages (list): チャットメッセージ
+            kind (str): メトリクスのリクエスト種別（single, batch）
+            timeout (float): タイムアウト（秒、Noneでライブラリの既定。指定時は自動リトライなし）
+            **kwargs: max_completion_tokens, response_format など
+
+        Returns:
+            tuple: (APIの応答, 使用トークン数, 所要時間（秒）)
+        """
+        client = self.openai_client
+        if timeout is not None:
+            # 全体の残り時間で打ち切る（ライブラリの自動リトライは期限を超えるので使わず、再試行はヘッジに任せる）
+            client = client.with_options(timeout=max(timeout, 0.001), max_retries=0)
+
+        # gpt-5-mini: GPT-5の軽量モデル（推論機能付き）
+        # 参考実装: https://github.com/Murasan201/09-001-gpt-response-minimal
+        start = time.perf_counter()
+        response = client.chat.completions.create(
+            model="gpt-5-mini",  # GPT-5の軽量モデル
+            messages=messages,
+            **kwargs
+        )
+        elapsed = time.perf_counter() - start
+
+        # トークン使用状況をログ出力（GPT-5の推論トークンを含む）
+        usage = response.usage
+        logger.info(f"Token usage - Total: {usage.total_tokens}, "
+                   f"Input: {usage.prompt_tokens}, "
+                   f"Output: {usage.completion_tokens}, "
+                   f"Time: {elapsed:.2f}s")
+
+        # GPT-5では推論トークン数も確認可能（存在する場合）
+        if hasattr(usage, 'completion_tokens_details'):
+            details = usage.completion_tokens_details
+            if hasattr(details, 'reasoning_tokens'):
+                logger.info(f"Reasoning tokens: {details.reasoning_tokens}")
+
+        metrics.observe_llm(kind, elapsed, usage)
+        self._llm_tokens += usage.total_tokens
+        return response, usage.total_tokens, elapsed
 
     def format_display_text(self, weather_data: Dict[str, Any], outfit_advice: str) -> str:
         """
@@ -236,70 +742,357 @@ class WeatherOutfitAdvisor:
         display_text = f"{city}: {temperature}°C {weather_desc} | {outfit_advice}"
         return display_text
 
-    def display_scrolling_text(self, text: str, loop_count: int = 3):
+    def display_scrolling_text(self, text: str, loop_count: int = 3, verbose: bool = True,
+                               stream: Optional[StreamingText] = None) -> bool:
         """
         OLEDに横スクロールでテキストを表示
 
         Args:
-            text (str): スクロール表示するテキスト
+            text (str): スクロール表示するテキスト（streamを指定した場合は先頭の固定部分）
             loop_count (int): スクロールループ回数（デフォルト: 3回）
+            verbose (bool): Falseなら開始・統計のログをDEBUGレベルで出力（常駐モードで使用）
+            stream (StreamingText): 生成中のアドバイス（届いた文字をtextの後ろに追加しながら表示）
+
+        Returns:
+            bool: ユーザー割り込みで停止した場合False
 
         参照実装: 06-004-ssd1306-oled-jp-display/src/scroll_oled.py
         """
-        if not self.oled or not self.font:
+        if not self.oled or not self.atlas:
+            if stream is not None:
+                stream.wait()
+                text += stream.text
             logger.info(f"OLED利用不可。表示予定テキスト: {text}")
-            return
+            return True
 
-        # テキストの幅を事前に計算
-        # getbbox() はテキストの境界ボックスを返す（left, top, right, bottom）
-        dummy_image = Image.new("1", (1, 1))
-        dummy_draw = ImageDraw.Draw(dummy_image)
-        bbox = dummy_draw.textbbox((0, 0), text, font=self.font)
-        text_width = bbox[2] - bbox[0]  # right - left = テキストの幅
+        log = logger.info if verbose else logger.debug
+        packed = self._scroll_packed(self.oled)
 
-        # テキストを垂直中央に配置
-        margin_y = (self.oled_height - self.font_size) // 2
+        prefix = text
+        strip, pages, text_width = self._prepare_strip(text, packed)
+        # ストリーミング表示の計測用（最初のフレーム、アドバイスの最初の文字が画面に入った時刻）
+        first_frame_at = None
+        advice_x = None
+        advice_visible_at = None
 
-        logger.info(f"スクロール開始: テキスト幅 {text_width}px")
-        logger.info(f"スクロール速度: {self.scroll_speed}px/フレーム, 間隔: {self.frame_delay}秒")
-        logger.info(f"ループ回数: {loop_count}回")
+        log(f"スクロール開始: テキスト幅 {text_width}px")
+        log(f"スクロール速度: {self.scroll_speed}px/フレーム, 間隔: {self.frame_delay}秒")
+        log(f"ループ回数: {loop_count}回")
 
         # スクロール表示のメインループ
         x_position = self.oled_width  # 画面右端から開始
         loop_counter = 0
 
+        # フレーム描画時間の計測用（OLED転送時間は含まない）
+        render_total = 0.0
+        render_max = 0.0
+        frame_count = 0
+
+        headless = isinstance(self.oled, FrameRecorder)
+        scheduler = self._frame_scheduler(self.oled)
+        if isinstance(self.oled, DeltaDisplay):
+            self.oled.reset_stats()
+
         try:
             while loop_counter < loop_count:
-                # 新しい画像を作成（毎フレーム再描画）
-                image = Image.new("1", (self.oled_width, self.oled_height))
-                draw = ImageDraw.Draw(image)
-
-                # 現在位置にテキストを描画
-                draw.text((x_position, margin_y), text, font=self.font, fill=255)
+                render_start = time.perf_counter()
+                stream_done = True
+                if stream is not None:
+                    # 生成中のアドバイスに新しい文字が届いていれば、ストリップを作り直して後ろに追加
+                    advice, stream_done = stream.snapshot()
+                    if prefix + advice != text:
+                        text = prefix + advice
+                        strip, pages, text_width = self._prepare_strip(text, packed, cache=stream_done)
+                        if advice_x is None:
+                            # アドバイス1文字目のテキスト先頭からの位置
+                            advice_x = self.atlas.layout(text)[0][len(prefix)][0]
+
+                frame = self._render_frame(text, x_position, strip, pages, packed)
+                render_time = time.perf_counter() - render_start
+                render_total += render_time
+                render_max = max(render_max, render_time)
+                frame_count += 1
+                metrics.FRAME_RENDER_SECONDS.observe(render_time)
 
                 # OLEDに表示
-                self.oled.display(image)
-
-                # スクロール位置を更新（右→左へ移動）
-                x_position -= self.scroll_speed
+                display_start = time.perf_counter()
+                self._send_frame(self.oled, frame, packed)
+                metrics.FRAME_DISPLAY_SECONDS.observe(time.perf_counter() - display_start)
+                if stream is not None:
+                    now = time.perf_counter()
+                    if first_frame_at is None:
+                        first_frame_at = now
+                    if advice_visible_at is None and advice_x is not None \
+                            and x_position + advice_x < self.oled_width:
+                        advice_visible_at = now
+
+                # 次フレームの期限まで待機して、スクロール位置を更新（右→左へ移動）
+                # 描画・転送が遅れて期限を過ぎた場合は、飛ばしたフレーム分まとめて進めて追いつく
+                x_position -= scheduler.advance(self.scroll_speed)
 
                 # テキストが完全に画面外に出たら右端に戻す
                 # テキスト全体が左端を通過したら（x + text_width < 0）リセット
                 if x_position + text_width < 0:
                     x_position = self.oled_width
-                    loop_counter += 1
-
-                # フレーム間隔待機
-                time.sleep(self.frame_delay)
-
-            logger.info(f"スクロール完了: {loop_counter}回")
+                    if stream_done:
+                        loop_counter += 1  # アドバイスの生成中に流れた周回は数えない
+
+            log(f"スクロール完了: {loop_counter}回")
+            log(f"フレーム統計: {scheduler.summary()}")
+            if isinstance(scheduler, AdaptiveFrameScheduler):
+                for decision in scheduler.decision_log():
+                    log(f"速度調整: {decision}")
+            metrics.observe_scroll(scheduler)
+            if isinstance(self.oled, DeltaDisplay):
+                log(f"転送量: {self.oled.summary()}")
+            if headless:
+                log(f"書き出し: {self.oled.summary()}")
+            if frame_count:
+                mode = "ページ形式スライス" if packed else \
+                    "ストリップ切り出し" if self.scroll_prerender else "毎フレーム描画"
+                log(f"描画時間（{mode}）: 平均 {render_total / frame_count * 1000:.3f}ms, "
+                    f"最大 {render_max * 1000:.3f}ms / {frame_count}フレーム")
+            log(self.atlas.summary())
+            log(self.strip_cache.summary())
+            if isinstance(strip, TiledStrip):
+                log(strip.summary())
+            if stream is not None:
+                self._log_stream_latency(stream, first_frame_at, advice_visible_at)
 
         except KeyboardInterrupt:
             logger.info("スクロール停止: ユーザー割り込み")
             self.oled.clear()
+            return False
         except Exception as e:
             logger.error(f"[スクロール表示]エラー: {e}")
             logger.error("対処方法: デバイス接続を確認してください")
+        return True
+
+    def _scroll_packed(self, device) -> bool:
+        """
+        フレームをページ形式のまま送れるか（SSD1306・差分転送ラッパー経由を含む）
+        lumaのダミーデバイス・フレーム書き出しは画像で受け取る
+
+        Args:
+            device: 表示先
+
+        Returns:
+            bool: ページ形式で送るならTrue
+        """
+        return self.scroll_packed and self.scroll_prerender and \
+            (isinstance(device, DeltaDisplay) or
+             (device is self.oled and self.oled_backend in ('i2c', 'mock')))
+
+    def _prepare_strip(self, text: str, packed: bool, cache: bool = True):
+        """
+        スクロール用のストリップを用意（SCROLL_PRERENDER・ストリップキャッシュ・SCROLL_STRIP_MAX_PX に従う）
+
+        Args:
+            text (str): 表示するテキスト
+            packed (bool): ページ形式で送るか（_scroll_packed() の結果）
+            cache (bool): Falseならストリップキャッシュに保存しない（生成途中のアドバイス）
+
+        Returns:
+            tuple: (ストリップ画像, ページ形式ストリップ, テキスト幅)
+                   幅の広いテキストはどちらも TiledStrip、事前描画なしは (None, None, テキスト幅)
+        """
+        # テキストを垂直中央に配置
+        margin_y = (self.oled_height - self.font_size) // 2
+        if self.scroll_prerender:
+            # 保存済みのストリップがあればメモリマップするだけ（FreeType・グリフの処理なし）
+            key = None
+            if cache:
+                key = strip_key(text, self.font_path, self.font_size,
+                                self.oled_width, self.oled_height, margin_y)
+                cached = self.strip_cache.get(key)
+                if cached is not None:
+                    pages, text_width = cached
+                    return (None, pages, text_width) if packed else \
+                        (pages.to_image(), None, text_width)
+            layout = self.atlas.layout(text)
+            if self.oled_width * 2 + layout[1] > self.scroll_strip_max_px:
+                # 全幅のストリップは確保せず、表示位置の周辺だけタイルに描画（キャッシュにも保存しない）
+                tiled = TiledStrip(self.atlas, text, self.oled_width, self.oled_height, margin_y,
+                                   layout=layout)
+                return tiled, tiled if packed else None, tiled.text_width
+            # キャッシュ済みグリフを貼り付けて横長のストリップ画像を一度だけ組み立てる
+            # （新しい文字だけFreeTypeで描画、既出の仮名・漢字は貼り付けのみ）
+            strip, text_width = self.atlas.render_strip(text, self.oled_width, self.oled_height,
+                                                        margin_y, layout=layout)
+            pages = PackedStrip(strip) if packed or key else None
+            if key:
+                self.strip_cache.put(key, pages, text_width)
+            return strip, pages if packed else None, text_width
+        # テキストの幅を事前に計算
+        # getbbox() はテキストの境界ボックスを返す（left, top, right, bottom）
+        dummy_image = Image.new("1", (1, 1))
+        dummy_draw = ImageDraw.Draw(dummy_image)
+        bbox = dummy_draw.textbbox((0, 0), text, font=self.atlas.font)
+        return None, None, bbox[2] - bbox[0]  # right - left = テキストの幅
+
+    def _frame_scheduler(self, device):
+        """
+        スクロール用のフレームスケジューラを作成
+
+        絶対期限でフレームを刻む（Piの機種によらず同じ速度で流れる）。表示先が FrameRecorder なら
+        待機せず全速で描画し、SCROLL_VELOCITY_PX_SEC 指定時は重くなったらフレームレートを下げて
+        1フレームの移動量を増やす
+
+        Args:
+            device: 表示先
+
+        Returns:
+            FrameScheduler: スケジューラ
+        """
+        headless = isinstance(device, FrameRecorder)
+        if self.scroll_velocity > 0:
+            return AdaptiveFrameScheduler(self.frame_delay, self.scroll_velocity,
+                                          max_period=self.scroll_max_frame_delay, realtime=not headless)
+        return FrameScheduler(self.frame_delay, realtime=not headless)
+
+    def _render_frame(self, text: str, x_position: int, strip, pages, packed: bool):
+        """
+        スクロール位置 x_position の1フレームを作成
+
+        Args:
+            text (str): 表示するテキスト（事前描画なしの場合に使う）
+            x_position (int): テキスト先頭の画面上の位置
+            strip: _prepare_strip() のストリップ画像
+            pages: _prepare_strip() のページ形式ストリップ
+            packed (bool): ページ形式で送るか
+
+        Returns:
+            ページごとのバイト列のリスト（packed）、または画面サイズの画像
+        """
+        if packed:
+            # ページ形式のストリップから画面幅ぶんをスライスするだけ（コピー・変換なし）
+            return pages.window(self.oled_width - x_position, self.oled_width)
+        if self.scroll_prerender:
+            # ストリップから画面幅ぶんを切り出すだけ（再描画なし）
+            offset = self.oled_width - x_position
+            return strip.crop((offset, 0, offset + self.oled_width, self.oled_height))
+        # 新しい画像を作成し、現在位置にテキストを描画（毎フレーム再描画）
+        image = Image.new("1", (self.oled_width, self.oled_height))
+        draw = ImageDraw.Draw(image)
+        draw.text((x_position, (self.oled_height - self.font_size) // 2), text, font=self.atlas.font, fill=255)
+        return image
+
+    def _send_frame(self, device, frame, packed: bool):
+        """
+        _render_frame() のフレームを表示先に送る
+
+        Args:
+            device: 表示先
+            frame: _render_frame() の戻り値
+            packed (bool): ページ形式で送るか
+        """
+        if not packed:
+            device.display(frame)
+        elif isinstance(device, DeltaDisplay):
+            device.display_pages(frame)
+        else:
+            send_pages(device, frame, getattr(device, '_colstart', 0))
+
+    def _log_stream_latency(self, stream: StreamingText, first_frame_at: Optional[float],
+                            advice_visible_at: Optional[float]):
+        """
+        ストリーミング表示の体感待ち時間をログ出力（いずれもリクエスト開始からの時間）
+
+        Args:
+            stream (StreamingText): 生成したアドバイス
+            first_frame_at (float): 最初のフレームを表示した時刻（perf_counter）
+            advice_visible_at (float): アドバイスの最初の文字が画面に入った時刻（perf_counter）
+        """
+        def since_start(at):
+            return f"{(at - stream.started_at) * 1000:.0f}ms" if at is not None else "-"
+
+        logger.info(f"ストリーミング表示: 最初のフレーム {since_start(first_frame_at)}, "
+                    f"最初のトークン {since_start(stream.first_token_at)}, "
+                    f"アドバイスの最初の画素 {since_start(advice_visible_at)}, "
+                    f"生成完了 {since_start(stream.finished_at)}")
+
+    def display_rotation(self, texts: List[str], loop_count: int = 3):
+        """
+        複数都市のテキストを1つずつ順番にスクロール表示（1都市なら通常のスクロール表示）
+
+        Args:
+            texts (list): 都市ごとの表示テキスト
+            loop_count (int): 各都市を表示する回数
+        """
+        if len(texts) == 1:
+            self.display_scrolling_text(texts[0], loop_count=loop_count)
+            return
+
+        # 都市A→都市B→…を1周として、loop_count周する
+        for _ in range(loop_count):
+            for text in texts:
+                if not self.display_scrolling_text(text, loop_count=1):
+                    return  # ユーザー割り込み
+
+    def show_message(self, message: str):
+        """
+        OLEDに短いメッセージを静止表示（エラー表示など）
+
+        Args:
+            message (str): 表示するメッセージ（画面幅に収まる長さ）
+        """
+        if not self.oled or not self.atlas:
+            logger.info(f"OLED利用不可。表示予定メッセージ: {message}")
+            return
+
+        # 左端から10pxの位置に、キャッシュ済みグリフで描画
+        strip, _ = self.atlas.render_strip(
+            message, self.oled_width, self.oled_height, self.oled_height // 2)
+        image = strip.crop((self.oled_width - 10, 0, self.oled_width * 2 - 10, self.oled_height))
+        self.oled.display(image)
+
+    def build_display_texts(self) -> List[str]:
+        """
+        天気取得→アドバイス生成→表示テキストの整形を行い、都市ごとの表示テキストを作成
+
+        Returns:
+            list: 都市ごとの表示テキスト（天気を取得できた都市のみ、全都市失敗なら空）
+        """
+        # 天気取得とアドバイス生成で1つの持ち時間を共有（使い切ったら前回のデータで表示）
+        deadline = Deadline(self.run_budget)
+
+        # ステップ1: 天気データの取得（複数都市は並行して取得）
+        logger.info(f"天気データを取得中... ({', '.join(self.city_names)})")
+        all_weather = self.get_all_weather_data(deadline)
+        cities = [city for city, data in all_weather.items() if data]
+
+        if not cities:
+            logger.error("Failed to get weather data")
+            return []
+
+        # ステップ2: 服装アドバイスの生成（複数都市は1回のリクエストでまとめて生成）
+        logger.info(f"服装アドバイスを生成中... ({', '.join(cities)})")
+        weather_list = [all_weather[city] for city in cities]
+        outfit_advice_list = self.generate_outfit_advice_batch(weather_list, deadline)
+        logger.info(self.latency_summary(deadline))
+
+        # ステップ3: 表示用テキストの整形
+        display_texts = []
+        for weather_data, outfit_advice in zip(weather_list, outfit_advice_list):
+            display_text = self.format_display_text(weather_data, outfit_advice)
+            logger.info(f"表示テキスト: {display_text}")
+            display_texts.append(display_text)
+        return display_texts
+
+    def latency_summary(self, deadline: Deadline) -> str:
+        """
+        ログ出力用の、1回の更新の所要時間と接続先ごとの呼び出し統計
+
+        Args:
+            deadline (Deadline): 1回の更新の期限
+
+        Returns:
+            str: 所要時間・持ち時間とヘッジ・期限切れ・遮断の回数
+        """
+        budget = f"{deadline.budget:.0f}秒" if deadline.expires_at is not None else "無制限"
+        callers = (self.weather_caller, self.advice_caller, self.advice_batch_caller)
+        calls = " / ".join(caller.summary() for caller in callers if caller.calls)
+        return f"更新の所要時間 {deadline.elapsed():.2f}秒（持ち時間 {budget}）: {calls or 'API呼び出しなし'}"
 
     def run(self, loop_count: int = 3):
         """
@@ -310,40 +1103,248 @@ class WeatherOutfitAdvisor:
         """
         logger.info("Starting Weather Outfit Advisor")
 
-        # ステップ1: 天気データの取得
-        logger.info("天気データを取得中...")
-        weather_data = self.get_weather_data()
+        # 天気取得の通信待ちの間に、バックグラウンドでopenaiを読み込んでおく
+        if self.advice_engine != 'local':
+            threading.Thread(target=importlib.import_module, args=('openai',), daemon=True).start()
 
-        if not weather_data:
+        if self.advice_stream and self.advice_engine == 'llm' and len(self.city_names) == 1:
+            # ストリーミングモード: 天気を取得したらすぐにスクロールを始め、アドバイスは届いた文字から追加
+            self.run_streaming(loop_count=loop_count)
+            if self.oled:
+                self.oled.clear()
+            metrics.flush()
+            logger.info("天気予報＋服装提案アドバイザー完了")
+            return
+
+        # ステップ1〜3: 天気取得→アドバイス生成→表示テキストの整形
+        display_texts = self.build_display_texts()
+
+        if not display_texts:
             error_msg = "天気データ取得失敗"
             if self.oled:
                 # エラーメッセージを表示
-                image = Image.new("1", (self.oled_width, self.oled_height))
-                draw = ImageDraw.Draw(image)
-                draw.text((10, self.oled_height // 2), error_msg, font=self.font, fill=255)
-                self.oled.display(image)
+                self.show_message(error_msg)
                 time.sleep(5)
                 self.oled.clear()
-            logger.error("Failed to get weather data")
             return
 
-        # ステップ2: 服装アドバイスの生成
-        logger.info("服装アドバイスを生成中...")
-        outfit_advice = self.generate_outfit_advice(weather_data)
-
-        # ステップ3: 表示用テキストの整形
-        display_text = self.format_display_text(weather_data, outfit_advice)
-        logger.info(f"表示テキスト: {display_text}")
-
-        # ステップ4: OLEDに横スクロール表示
-        self.display_scrolling_text(display_text, loop_count=loop_count)
+        # ステップ4: OLEDに横スクロール表示（複数都市は順番に切り替え）
+        self.display_rotation(display_texts, loop_count=loop_count)
 
         # ステップ5: 終了処理（画面をクリア）
         if self.oled:
             self.oled.clear()
 
+        metrics.flush()
         logger.info("天気予報＋服装提案アドバイザー完了")
 
+    def run_streaming(self, loop_count: int = 3):
+        """
+        ストリーミングモード：アドバイスの生成完了を待たずにスクロール表示を始める
+
+        "都市名: 気温 天気 | " をすぐに流し始め、OpenAI APIから届いたアドバイスの文字を
+        スクロール中のストリップの後ろに追加していきます（キャッシュにあれば通常表示）
+
+        Args:
+            loop_count (int): 生成完了後のスクロール回数
+        """
+        # 天気取得とアドバイスのストリーミングで1つの持ち時間を共有
+        deadline = Deadline(self.run_budget)
+        weather_data = self.get_weather_data(deadline=deadline)
+        if not weather_data:
+            if self.oled:
+                self.show_message("天気データ取得失敗")
+                time.sleep(5)
+            return
+
+        prefix = self.format_display_text(weather_data, "")
+        advice = self.advice_cache.lookup(weather_data)
+        logger.info(self.advice_cache.summary())
+        if advice is not None:
+            self.display_scrolling_text(prefix + advice, loop_count=loop_count)
+            return
+
+        # 生成は別スレッドで行い、表示側は届いた文字を毎フレーム確認する
+        stream = StreamingText()
+        worker = threading.Thread(target=self._stream_outfit_advice, args=(weather_data, stream, deadline),
+                                  name="advice-stream", daemon=True)
+        worker.start()
+        self.display_scrolling_text(prefix, loop_count=loop_count, stream=stream)
+
+        if stream.wait(timeout=0) and stream.error is None:
+            self.advice_cache.store_advice(weather_data, stream.text.strip())
+
+    def run_daemon(self, refresh_interval: float = 600, render_process: bool = False):
+        """
+        常駐モード：スクロール表示を止めずに、天気とアドバイスをバックグラウンドで定期的に更新
+
+        更新スレッドが作った表示テキストはダブルバッファに登録し、表示側はスクロール1周の
+        区切りで入れ替えます（通信中も表示中のテキストを流し続けるので、画面が空になりません）
+
+        Args:
+            refresh_interval (float): 天気・アドバイスを更新する間隔（秒）
+            render_process (bool): Trueならフレームループを別プロセスで動かす
+                                   （通信・JSON解析とGILを取り合わないので、スクロールが乱れない）
+        """
+        logger.info(f"Starting Weather Outfit Advisor (daemon, 更新間隔 {refresh_interval:.0f}秒"
+                    f"{', 描画プロセス' if render_process else ''})")
+
+        # systemctl stop などのSIGTERMもCtrl+Cと同じく画面をクリアして終了
+        def handle_sigterm(signum, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+        texts_buffer = DoubleBuffer()
+        stop = threading.Event()
+
+        def refresh_worker():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    display_texts = self.build_display_texts()
+                except Exception as e:
+                    logger.error(f"[バックグラウンド更新]エラー: {e}")
+                    display_texts = []
+
+                if display_texts:
+                    texts_buffer.publish(display_texts)
+                    logger.info(f"表示テキストを更新（{time.perf_counter() - start:.1f}秒、次の区切りで切り替え）")
+                elif texts_buffer.published == 0:
+                    # まだ何も表示していなければエラーを流す（成功したら次の区切りで切り替わる）
+                    texts_buffer.publish(["天気データ取得失敗"])
+                else:
+                    logger.warning("更新に失敗したため、表示中のテキストを継続します")
+                stop.wait(refresh_interval)
+
+        if render_process and self.oled and self.atlas:
+            # 描画プロセスを先に起動してから更新スレッドを始める
+            try:
+                self._run_render_process(texts_buffer, refresh_worker)
+            except KeyboardInterrupt:
+                logger.info("常駐モード停止: ユーザー割り込み")
+            finally:
+                stop.set()
+            logger.info("天気予報＋服装提案アドバイザー（常駐モード）終了")
+            return
+
+        worker = threading.Thread(target=refresh_worker, name="advisor-refresh", daemon=True)
+        worker.start()
+
+        # 最初のテキストが用意できるまではメッセージを表示しておく
+        self.show_message("天気を取得中...")
+        index = 0
+        try:
+            while True:
+                # スクロール1周の区切りで、新しいテキストがあれば入れ替える
+                if texts_buffer.swap():
+                    logger.info(f"表示テキストを切り替え（{texts_buffer.swapped}回目）")
+                    if not self.oled or not self.atlas:
+                        for text in texts_buffer.front:
+                            logger.info(f"OLED利用不可。表示予定テキスト: {text}")
+
+                display_texts = texts_buffer.front
+                if display_texts is None:
+                    texts_buffer.wait_ready(1.0)  # 最初の更新を待つ
+                    continue
+                if not self.oled or not self.atlas:
+                    time.sleep(1.0)  # 表示できない場合は更新内容のログ出力だけ続ける
+                    continue
+
+                # 都市を1つずつ順番に、1回ずつスクロール
+                text = display_texts[index % len(display_texts)]
+                index += 1
+                if not self.display_scrolling_text(text, loop_count=1, verbose=False):
+                    break  # ユーザー割り込み（画面はクリア済み）
+                metrics.flush()  # スクロール1周ごとにメトリクスのファイルを更新
+
+        except KeyboardInterrupt:
+            logger.info("常駐モード停止: ユーザー割り込み")
+        finally:
+            stop.set()
+            if self.oled:
+                self.oled.clear()
+
+        logger.info("天気予報＋服装提案アドバイザー（常駐モード）終了")
+
+    def _run_render_process(self, texts_buffer: DoubleBuffer, refresh_worker):
+        """
+        常駐モードの表示を描画プロセスに任せる（このプロセスはストリップを作って共有メモリに登録するだけ）
+
+        描画プロセスは新しいストリップをスクロール1周の区切りで切り替えるので、表示中のストリップが
+        流れ始めたら、すぐに次のテキストのストリップを登録しておきます
+
+        Args:
+            texts_buffer (DoubleBuffer): 更新スレッドが表示テキストを登録するダブルバッファ
+            refresh_worker (callable): 天気・アドバイスの更新スレッドの本体
+        """
+        if not self.scroll_prerender:
+            # 描画プロセスへはストリップを共有メモリで渡すので、毎フレーム描画はできない
+            logger.warning("描画プロセスではストリップを事前描画します（SCROLL_PRERENDER=false は無視）")
+            self.scroll_prerender = True
+        # OLEDは描画プロセスが開き直すので、このプロセスからはもう送信しない
+        self.oled.clear()
+        if isinstance(self.oled, FrameRecorder):
+            self.oled.close()  # 書き出し先は描画プロセスが開き直す
+        renderer = RenderProcess({
+            'backend': self.oled_backend if self.oled_backend in ('mock', 'dummy', 'export') else 'i2c',
+            'export_path': self.oled_export_path,
+            'width': self.oled_width,
+            'height': self.oled_height,
+            'address': self.oled_i2c_address,
+            'delta': self.oled_delta,
+            'frame_delay': self.frame_delay,
+            'speed': self.scroll_speed,
+            'velocity': self.scroll_velocity,
+            'max_frame_delay': self.scroll_max_frame_delay,
+        }, size=int(os.getenv('RENDER_SHM_KB', '256')) * 1024)
+        logger.info(f"描画プロセス起動: PID {renderer.process.pid}, 共有メモリ {renderer.shared.capacity // 1024}KiB")
+        # このプロセスの処理の遅れ（通信・JSON解析の影響）を測り、描画プロセスのジッタと比べる
+        probe = JitterProbe(self.frame_delay)
+
+        worker = threading.Thread(target=refresh_worker, name="advisor-refresh", daemon=True)
+        worker.start()
+
+        # 最初のテキストが用意できるまではメッセージを流しておく
+        # ストリップは _prepare_strip() で用意（キャッシュを使い、幅の広いテキストはタイルのまま書き込む）
+        renderer.publish(*self._prepare_strip("天気を取得中...", packed=True)[1:])
+        index = 0
+        shown = None
+        try:
+            while renderer.process.is_alive():
+                if texts_buffer.swap():
+                    logger.info(f"表示テキストを切り替え（{texts_buffer.swapped}回目）")
+                    logger.info(f"ジッタ: {renderer.summary()} / {probe.summary()}")
+                display_texts = texts_buffer.front
+                if display_texts is None:
+                    texts_buffer.wait_ready(1.0)  # 最初の更新を待つ
+                    continue
+
+                text = display_texts[index % len(display_texts)]
+                if text == shown:
+                    # 1都市だけでテキストも変わらなければ登録し直さない（更新を待つ）
+                    time.sleep(1.0)
+                    continue
+                try:
+                    sequence = renderer.publish(*self._prepare_strip(text, packed=True)[1:])
+                except ValueError as e:
+                    logger.error(f"[描画プロセス]エラー: {e}")
+                    logger.error("ヒント: RENDER_SHM_KB を大きくしてください")
+                    index += 1
+                    time.sleep(1.0)
+                    continue
+                # 描画プロセスが流し始めたら次のテキストへ（次の1周の区切りで切り替わる）
+                renderer.wait_shown(sequence)
+                shown = text if len(display_texts) == 1 else None
+                index += 1
+                metrics.flush()
+            if not renderer.process.is_alive():
+                logger.error(f"描画プロセスが終了しました（終了コード {renderer.process.exitcode}）")
+        finally:
+            logger.info(f"ジッタ: {renderer.summary()} / {probe.summary()}")
+            probe.stop()
+            renderer.stop()
+            self.oled.clear()  # 描画プロセスがSIGTERMで後片付けせずに終了した場合に備えて
+
 # === プログラムのエントリーポイント ===
 def main():
     """
@@ -352,12 +1353,27 @@ def main():
     WeatherOutfitAdvisorクラスのインスタンスを作成し、
     天気予報と服装アドバイスの取得・表示を実行します
     """
+    # コマンドライン引数の設定
+    parser = argparse.ArgumentParser(description="天気予報＋服装提案掲示板アプリ")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常駐モード（スクロールを続けながら天気とアドバイスを定期更新）")
+    parser.add_argument('--refresh-sec', type=float,
+                        default=float(os.getenv('DAEMON_REFRESH_SEC', '600')),
+                        help="常駐モードの更新間隔（秒、既定: .envのDAEMON_REFRESH_SEC）")
+    parser.add_argument('--render-process', action='store_true',
+                        default=os.getenv('RENDER_PROCESS', 'false').lower() == 'true',
+                        help="常駐モードのフレームループを別プロセスで実行（既定: .envのRENDER_PROCESS）")
+    args = parser.parse_args()
+
     try:
         # WeatherOutfitAdvisorクラスのインスタンス作成
         advisor = WeatherOutfitAdvisor()
 
         # メイン処理の実行
-        advisor.run()
+        if args.daemon:
+            advisor.run_daemon(refresh_interval=args.refresh_sec, render_process=args.render_process)
+        else:
+            advisor.run()
 
     except KeyboardInterrupt:
         # Ctrl+Cで中断された場合